@@ -0,0 +1,140 @@
+"""
+End-to-end benchmarks of cli commands against a local stand-in API.
+
+Each command runs as a fresh `python -m wellets_cli` process (so startup and
+imports are part of the measure) against `wellets_cli.fake_api` serving a
+synthetic account. Besides wall time, every benchmark records the requests
+the command sent and the peak RSS of the process in `extra_info`.
+
+Run with `make bench` or `pytest benchmarks/ --dataset-size medium`.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+
+import wellets_cli
+from wellets_cli.fake_api import FakeAPI, generate
+
+ROOT = Path(wellets_cli.__file__).parents[1]
+
+# wallets, transactions per wallet, years of prices
+SIZES = {
+    "small": dict(wallets=5, transactions=100, years=1),
+    "medium": dict(wallets=20, transactions=1000, years=3),
+    "large": dict(wallets=50, transactions=5000, years=5),
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--dataset-size",
+        choices=list(SIZES),
+        default=os.environ.get("WELLETS_BENCH_SIZE", "small"),
+        help="Size of the synthetic account.",
+    )
+
+
+@pytest.fixture(scope="session")
+def dataset(request):
+    return generate(**SIZES[request.config.getoption("--dataset-size")], seed=0)
+
+
+@pytest.fixture(scope="session")
+def fake_api(dataset):
+    with FakeAPI(dataset) as server:
+        yield server
+
+
+@pytest.fixture
+def cli_env(fake_api, tmp_path):
+    """
+    Environment of an isolated, logged in cli process.
+    """
+    token = tmp_path / "home" / ".config" / "wellets_cli" / "token.json"
+    token.parent.mkdir(parents=True)
+    token.write_text(
+        json.dumps(
+            {
+                "id": fake_api.server.dataset.user_id,
+                "email": "bench@wellets.local",
+                "token": "bench",
+                "created_at": "2024-01-01T00:00:00Z",
+                "updated_at": "2024-01-01T00:00:00Z",
+            }
+        )
+    )
+
+    return {
+        **os.environ,
+        "HOME": str(tmp_path / "home"),
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [str(ROOT), os.getenv("PYTHONPATH")])
+        ),
+        "WELLETS_API_URL": fake_api.url,
+        "WELLETS_CACHE_DIR": str(tmp_path / "cache"),
+        "WELLETS_STATE_DIR": str(tmp_path / "state"),
+        "WELLETS_NO_DAEMON": "1",
+        "WELLETS_SAVE_CHARTS": "1",
+        "MPLBACKEND": "Agg",
+    }
+
+
+class Measure:
+    def __init__(self):
+        self.peak_rss = 0
+        self.requests = 0
+
+
+def run_process(args: List[str], env: dict, cwd: str, measure: Measure) -> None:
+    process = subprocess.Popen(
+        args,
+        env=env,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    stderr = process.stderr.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    if process.returncode:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{stderr.decode()}")
+
+    measure.peak_rss = max(measure.peak_rss, usage.ru_maxrss * 1024)
+
+
+@pytest.fixture
+def run_cli(benchmark, fake_api, cli_env, tmp_path):
+    """
+    Benchmark `wellets_cli *args`, `setup` (if any) running before each round.
+    """
+
+    def run(*args: str, rounds: int = 5, setup=None):
+        measure = Measure()
+        argv = [sys.executable, "-m", "wellets_cli", *args]
+
+        def target():
+            before = sum(fake_api.requests.values())
+            run_process(argv, cli_env, str(tmp_path), measure)
+            measure.requests = sum(fake_api.requests.values()) - before
+
+        def pedantic_setup():
+            if setup:
+                setup()
+
+        start = time.perf_counter()
+        benchmark.pedantic(target, setup=pedantic_setup, rounds=rounds, iterations=1)
+
+        benchmark.extra_info["requests"] = measure.requests
+        benchmark.extra_info["peak_rss_mb"] = round(measure.peak_rss / 2**20, 1)
+        benchmark.extra_info["total_s"] = round(time.perf_counter() - start, 2)
+
+    return run
@@ -0,0 +1,67 @@
+import csv
+import shutil
+import subprocess
+import sys
+
+
+def test_import_time(benchmark, cli_env):
+    def target():
+        subprocess.run(
+            [sys.executable, "-c", "import wellets_cli.cli"], env=cli_env, check=True
+        )
+
+    benchmark.pedantic(target, rounds=5, iterations=1)
+
+
+def test_dashboard(run_cli):
+    run_cli("dashboard")
+
+
+def test_wallet_list(run_cli):
+    run_cli("wallet", "list")
+
+
+def test_transaction_list(run_cli, dataset):
+    run_cli("transaction", "list", "--wallet-id", dataset.wallets[0]["id"])
+
+
+def test_asset_visualize(run_cli, dataset, cli_env):
+    cache = cli_env["WELLETS_CACHE_DIR"]
+
+    # cold klines cache every round
+    run_cli(
+        "asset",
+        "visualize",
+        "--asset-id",
+        dataset.assets[0]["id"],
+        setup=lambda: shutil.rmtree(cache, ignore_errors=True),
+    )
+
+
+def test_export_all_transactions(run_cli, tmp_path):
+    run_cli(
+        "export",
+        "--output-dir",
+        str(tmp_path / "export"),
+        setup=lambda: shutil.rmtree(tmp_path / "export", ignore_errors=True),
+    )
+
+
+def test_bulk_import(run_cli, dataset, cli_env, tmp_path):
+    wallet = dataset.wallets[0]
+    path = tmp_path / "transactions.csv"
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["wallet_id", "value", "description", "created_at"])
+        for i in range(200):
+            writer.writerow([wallet["id"], 1, f"bench {i}", "2023-06-01 12:00"])
+
+    state = cli_env["WELLETS_STATE_DIR"]
+
+    def fresh_import():
+        # forget the checkpoint and the idempotency journal of the last round
+        (tmp_path / "transactions.csv.checkpoint").unlink(missing_ok=True)
+        shutil.rmtree(state, ignore_errors=True)
+
+    run_cli("transaction", "import", str(path), setup=fresh_import)
@@ -0,0 +1,24 @@
+import pytest
+from click.testing import CliRunner
+
+from wellets_cli.commands.asset import show_asset_history
+from wellets_cli.commands.wallet import show_wallet_history
+from wellets_cli.fake_api import FakeAPI, generate
+
+
+@pytest.mark.parametrize("command", [show_asset_history, show_wallet_history])
+def test_remote_history_rejects_intervals_the_server_lacks(
+    command, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+
+    with FakeAPI(generate(wallets=1, transactions=0)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+
+        result = CliRunner().invoke(
+            command, ["--remote", "--interval", "6h", "--auth-token", "t"]
+        )
+
+    assert result.exit_code == 2
+    assert "only supports 1d and 1w intervals, not '6h'" in result.stderr
+    assert not server.requests
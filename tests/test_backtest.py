@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import wellets_cli.backtest as backtest_module
+from wellets_cli.backtest import Plan, backtest, dca
+from wellets_cli.model import Currency
+
+
+def test_dca_reduces_each_plan():
+    plan_pos = np.array([0, 0, 1])
+    quote = np.array([100.0, 100.0, 50.0])
+    entry_price = np.array([10.0, 40.0, 20.0])
+
+    entries, invested, units, average_price, value, returns = dca(
+        plan_pos, quote, entry_price, end_price=20.0, n_plans=3
+    )
+
+    assert entries.tolist() == [2, 1, 0]
+    assert invested.tolist() == [200.0, 50.0, 0.0]
+    assert units.tolist() == pytest.approx([12.5, 2.5, 0.0])
+    assert average_price[:2].tolist() == pytest.approx([16.0, 20.0])
+    assert returns[:2].tolist() == pytest.approx([0.25, 0.0])
+    assert np.isnan(average_price[2]) and np.isnan(returns[2])
+
+
+def test_backtest_invests_the_quote_in_dollars(monkeypatch):
+    usd_prices = {"BTC": 100.0, "EUR": 2.0}
+    monkeypatch.setattr(
+        backtest_module,
+        "currency_price_history",
+        lambda currency, index, headers, interval: np.full(
+            len(index), usd_prices[currency.acronym]
+        ),
+    )
+    btc, eur = (
+        Currency(
+            id=acronym,
+            acronym=acronym,
+            alias=acronym,
+            dollar_rate=1 / price,
+            created_at=datetime(2024, 1, 1),
+            updated_at=datetime(2024, 1, 1),
+        )
+        for acronym, price in usd_prices.items()
+    )
+
+    result = backtest(
+        [Plan("1d", 100.0, 3)],
+        datetime(2024, 1, 1),
+        datetime(2024, 1, 10),
+        btc,
+        eur,
+        {},
+    )
+
+    # USD 100 buys 1 BTC and costs EUR 50 at each entry
+    assert result.units.tolist() == [3.0]
+    assert result.invested.tolist() == [150.0]
+    assert result.end_price == 50.0
@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from wellets_cli.batch import parse, run
+
+SCRIPT = """
+# reads
+wallet list &
+asset list &
+
+transaction create --wallet-id 'a b'
+wallet list
+"""
+
+
+def test_parse_groups_parallel_lines():
+    groups = parse(SCRIPT.splitlines())
+
+    assert [[c.args for c in g] for g in groups] == [
+        [["wallet", "list"], ["asset", "list"]],
+        [["transaction", "create", "--wallet-id", "a b"]],
+        [["wallet", "list"]],
+    ]
+    assert groups[1][0].line == 6
+
+    with pytest.raises(ValueError, match="line 1"):
+        parse(["shell"])
+
+
+def test_run_keeps_script_order_and_stops_on_failure(capsys):
+    def invoke(args):
+        # the first parallel command finishes last
+        time.sleep(0.05 if args[0] == "wallet" else 0)
+        print(" ".join(args))
+        return 2 if args[0] == "transaction" else 0
+
+    results = run(parse(SCRIPT.splitlines()), invoke)
+
+    assert [r.code for r in results] == [0, 0, 2]
+    assert capsys.readouterr().out == (
+        "wallet list\nasset list\ntransaction create --wallet-id a b\n"
+    )
@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import wellets_cli.api as api
+import wellets_cli.cache as cache
+from wellets_cli.history import asset_history, time_index
+from wellets_cli.model import Asset, AssetEntry, Currency, KLines
+
+TODAY = datetime.now(timezone.utc).date()
+
+
+@pytest.fixture
+def fetched(monkeypatch, tmp_path):
+    """
+    Ranges fetched from a fake server, whose prices are the day of month.
+    """
+    monkeypatch.setenv("WELLETS_CACHE_DIR", str(tmp_path / "cache"))
+    ranges = []
+
+    def get_currency_history(params, headers):
+        start = date.fromisoformat(params["start_time"])
+        end = date.fromisoformat(params["end_time"])
+        ranges.append((start, end))
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        return [
+            KLines(
+                open_time=datetime(d.year, d.month, d.day, tzinfo=timezone.utc),
+                open_price=d.day,
+                high_price=d.day,
+                low_price=d.day,
+                close_price=d.day + len(ranges) / 10,  # tells fetches apart
+                volume=1,
+            )
+            for d in days
+        ]
+
+    monkeypatch.setattr(api, "get_currency_history", get_currency_history)
+    return ranges
+
+
+def get(start: date, end: date):
+    params = {"currency_id": "c", "start_time": start, "end_time": end}
+    return cache.get_currency_history(params, headers={})
+
+
+def test_fetches_only_missing_ranges(fetched):
+    d = date(2023, 1, 1)
+
+    assert len(get(d + timedelta(days=10), d + timedelta(days=20))) == 11
+    assert len(get(d + timedelta(days=10), d + timedelta(days=20))) == 11
+    assert len(get(d, d + timedelta(days=30))) == 31
+
+    assert fetched == [
+        (d + timedelta(days=10), d + timedelta(days=20)),
+        (d, d + timedelta(days=10)),
+        (d + timedelta(days=20), d + timedelta(days=30)),
+    ]
+
+
+def test_refetches_open_candles(fetched):
+    start = TODAY - timedelta(days=5)
+
+    get(start, TODAY)
+    klines = get(start, TODAY)
+
+    # today is fetched again, days already closed are not
+    assert fetched[1] == (TODAY - timedelta(days=1), TODAY)
+    assert klines[-1].close_price == TODAY.day + 0.2
+    assert klines[0].close_price == start.day + 0.1
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_asset_history():
+    currency = Currency(
+        id="c",
+        acronym="BTC",
+        alias="Bitcoin",
+        dollar_rate=1,
+        created_at=utc(2024, 1, 1),
+        updated_at=utc(2024, 1, 1),
+    )
+
+    def entry(day, value):
+        return AssetEntry(
+            id=str(day),
+            value=value,
+            dollar_rate=1,
+            asset_id="a",
+            created_at=utc(2024, 1, day, 12),
+            updated_at=utc(2024, 1, day, 12),
+        )
+
+    asset = Asset(
+        id="a",
+        balance=4,
+        entries=[entry(2, 3), entry(4, -1), entry(1, 2)],
+        user_id="u",
+        currency_id="c",
+        created_at=utc(2024, 1, 1),
+        updated_at=utc(2024, 1, 1),
+        currency=currency,
+    )
+
+    index = time_index(utc(2024, 1, 1), utc(2024, 1, 5), "1d")
+
+    assert np.array_equal(asset_history([asset], index), [[0, 2, 5, 5, 4]])
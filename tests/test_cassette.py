@@ -0,0 +1,53 @@
+import pytest
+
+import wellets_cli.api as api
+from wellets_cli.cassette import CassetteMiss
+from wellets_cli.fake_api import FakeAPI, generate
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    with FakeAPI(generate(wallets=2, transactions=30)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        yield server
+
+
+def fetch(wallet_id):
+    wallets = api.get_wallets(headers={"Authorization": "Bearer a"})
+    transactions = list(api.iter_transactions({"wallet_id": wallet_id}, {}, 20))
+    return [w.id for w in wallets], [t.id for t in transactions]
+
+
+def test_replays_recorded_traffic(fake_api, monkeypatch, tmp_path):
+    cassette = tmp_path / "cassette.jsonl.gz"
+    wallet_id = fake_api.server.dataset.wallets[0]["id"]
+
+    monkeypatch.setenv("WELLETS_RECORD", str(cassette))
+    recorded = fetch(wallet_id)
+    monkeypatch.delenv("WELLETS_RECORD")
+
+    sent = sum(fake_api.requests.values())
+    monkeypatch.setenv("WELLETS_API_URL", "http://elsewhere.invalid")
+    monkeypatch.setenv("WELLETS_REPLAY", str(cassette))
+
+    assert fetch(wallet_id) == recorded
+    assert sum(fake_api.requests.values()) == sent
+    with pytest.raises(CassetteMiss):
+        api.get_assets({})
+
+
+def test_keeps_credentials_out_of_the_cassette(fake_api, monkeypatch, tmp_path):
+    cassette = tmp_path / "cassette.jsonl"
+    monkeypatch.setenv("WELLETS_RECORD", str(cassette))
+
+    session = api.login("someone@example.com", "hunter2")
+    api.get_wallets(headers={"Authorization": f"Bearer {session.token}"})
+
+    recorded = cassette.read_text()
+    assert session.token not in recorded
+    assert "hunter2" not in recorded
+    assert "Bearer" not in recorded
+
+    monkeypatch.delenv("WELLETS_RECORD")
+    monkeypatch.setenv("WELLETS_REPLAY", str(cassette))
+    assert api.login("someone@example.com", "other").token == "REDACTED"
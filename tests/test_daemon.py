@@ -0,0 +1,189 @@
+import io
+import os
+import socket
+import threading
+import time
+
+import click
+import pytest
+from click.testing import CliRunner
+
+import wellets_cli.cli as cli
+import wellets_cli.client as client
+import wellets_cli.daemon as daemon
+import wellets_cli.transport as transport
+from wellets_cli.commands.daemon import show_daemon_status, stop_daemon
+from wellets_cli.fake_api import FakeAPI, generate
+
+
+def test_run_invocation(monkeypatch, tmp_path):
+    monkeypatch.setenv("WELLETS_DATE_FORMAT", "%Y")
+    seen = {}
+
+    def invoke(argv):
+        seen.update(argv=argv, cwd=os.getcwd(), env=dict(os.environ))
+        click.echo(f"hello {input()}")
+        click.echo("oops", err=True)
+        return 3
+
+    monkeypatch.setattr(cli, "invoke", invoke)
+
+    reply = daemon.run_invocation(
+        {
+            "argv": ["wallet", "list"],
+            "cwd": str(tmp_path),
+            "env": {"WELLETS_API_URL": "http://api"},
+            "stdin": "world\n",
+        }
+    )
+
+    assert reply == {"code": 3, "stdout": "hello world\n", "stderr": "oops\n"}
+    assert seen["argv"] == ["wallet", "list"]
+    assert seen["cwd"] == str(tmp_path)
+    # the invocation's WELLETS_* environment replaces the daemon's one...
+    assert seen["env"]["WELLETS_API_URL"] == "http://api"
+    assert "WELLETS_DATE_FORMAT" not in seen["env"]
+    # ...for that invocation only
+    assert os.environ["WELLETS_DATE_FORMAT"] == "%Y"
+    assert "WELLETS_API_URL" not in os.environ
+
+
+def test_run_invocation_falls_back_on_prompts():
+    @cli.cli.command(name="prompt")
+    def prompt():
+        click.prompt("Name")
+
+    try:
+        assert daemon.run_invocation({"argv": ["prompt"]}) == {"fallback": True}
+    finally:
+        del cli.cli.commands["prompt"]
+
+
+@pytest.fixture
+def state_dir(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO(""))
+    # unix socket paths are short, tmp_path may be too long
+    path = f"/tmp/wellets-test-{os.getpid()}"
+    monkeypatch.setenv("WELLETS_STATE_DIR", path)
+    yield path
+    if os.path.exists(f"{path}/daemon.sock"):
+        os.unlink(f"{path}/daemon.sock")
+
+
+def test_forward_to_daemon(state_dir, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "invoke", lambda argv: click.echo(argv) or 0)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+    while not client.socket_path().exists():
+        time.sleep(0.01)
+
+    try:
+        assert client.forward(["wallet", "list"]) == 0
+        assert capsys.readouterr().out == "['wallet', 'list']\n"
+    finally:
+        client.send({"command": "stop"}, timeout=5)
+        thread.join(5)
+
+
+def test_forward_falls_back_when_the_daemon_is_stuck(state_dir, monkeypatch):
+    monkeypatch.setattr(client, "ACCEPT_TIMEOUT", 0.1)
+    os.makedirs(state_dir, exist_ok=True)
+
+    # accepts connections but never answers
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stuck:
+        stuck.bind(str(client.socket_path()))
+        stuck.listen()
+
+        start = time.monotonic()
+        assert client.forward(["wallet", "list"]) is None
+        assert time.monotonic() - start < 5
+
+
+def test_charts_and_long_commands_run_locally(state_dir):
+    os.makedirs(state_dir, exist_ok=True)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listening:
+        listening.bind(str(client.socket_path()))
+        listening.listen()
+
+        assert client.forward(["wallet", "history", "--interval", "1d"]) is None
+        assert client.forward(["--trace", "accumulation", "run"]) is None
+        assert client.is_local(["transaction", "import", "file.csv"])
+        assert not client.is_local(["wallet", "list"])
+        assert not client.is_local(["transaction", "list", "--wallet-id", "run"])
+
+
+def test_local_writes_clear_the_daemon_cache(state_dir, monkeypatch):
+    monkeypatch.setattr(cli, "invoke", lambda argv: 0)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+    while not client.socket_path().exists():
+        time.sleep(0.01)
+
+    try:
+        transport._cache[("GET", "/wallets")] = (time.monotonic(), None)
+        monkeypatch.setattr(transport, "_wrote", False)
+        client.clear_daemon_cache()
+        assert transport._cache  # nothing written yet
+
+        monkeypatch.setattr(transport, "_wrote", True)
+        client.clear_daemon_cache()
+        assert not transport._cache
+    finally:
+        transport.clear_cache()
+        client.send({"command": "stop"}, timeout=5)
+        thread.join(5)
+
+
+def test_daemon_answers_control_commands_while_busy(state_dir, monkeypatch):
+    running, done = threading.Event(), threading.Event()
+
+    def invoke(argv):
+        running.set()
+        done.wait(5)
+        return 0
+
+    monkeypatch.setattr(cli, "invoke", invoke)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+    while not client.socket_path().exists():
+        time.sleep(0.01)
+
+    try:
+        forwarded = threading.Thread(target=client.forward, args=(["wallet", "list"],))
+        forwarded.start()
+        running.wait(5)
+
+        assert "pid" in client.send({"command": "ping"}, timeout=1)
+        done.set()
+        forwarded.join(5)
+    finally:
+        done.set()
+        client.send({"command": "stop"}, timeout=5)
+        thread.join(5)
+
+
+def test_daemon_keeps_responses_between_invocations(state_dir, monkeypatch, capsys):
+    monkeypatch.setattr(transport, "_cache_ttl", None)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+
+    with FakeAPI(generate(wallets=2, transactions=0)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        thread.start()
+        while not client.socket_path().exists():
+            time.sleep(0.01)
+
+        try:
+            assert "Running" in CliRunner().invoke(show_daemon_status).output
+
+            args = ["wallet", "list", "--auth-token", "t"]
+            assert client.forward(args) == client.forward(args) == 0
+            assert server.requests[("GET", "/wallets")] == 1
+        finally:
+            stopped = CliRunner().invoke(stop_daemon)
+            thread.join(5)
+            transport.clear_cache()
+
+    assert "Daemon stopped" in stopped.output
+    alias = server.server.dataset.wallets[0]["alias"]
+    assert capsys.readouterr().out.count(f"  {alias}  ") == 2
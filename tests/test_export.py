@@ -0,0 +1,76 @@
+import csv
+import json
+from datetime import datetime, timezone
+
+import pytest
+from click.testing import CliRunner
+
+from wellets_cli.commands.export import export
+from wellets_cli.export import COLUMNS, FORMATS, export_collection, record
+from wellets_cli.fake_api import FakeAPI, generate
+from wellets_cli.model import Wallet
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+wallets = [
+    Wallet(
+        id=f"w{i}",
+        alias=f"wallet {i}",
+        balance=10.5 * i,
+        currency_id="c",
+        created_at=NOW,
+        updated_at=NOW,
+    )
+    for i in range(3)
+]
+
+
+def read(path, fmt):
+    if fmt == "jsonl":
+        return [json.loads(line) for line in path.read_text().splitlines()]
+    if fmt == "csv":
+        with open(path, newline="") as f:
+            return list(csv.DictReader(f))
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path).to_pylist()
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_export_round_trip(tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    rows = [record(w, COLUMNS["wallets"]) for w in wallets]
+
+    assert export_collection("wallets", iter(rows), tmp_path, fmt) == 3
+
+    exported = read(tmp_path / f"wallets.{fmt}", fmt)
+    assert [list(r) for r in exported] == [[c for c, _ in COLUMNS["wallets"]]] * 3
+    assert [r["alias"] for r in exported] == ["wallet 0", "wallet 1", "wallet 2"]
+    assert [float(r["balance"]) for r in exported] == [0, 10.5, 21]
+
+    created_at = exported[0]["created_at"]
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    assert created_at == NOW
+
+
+def test_export_command_streams_every_collection(tmp_path, monkeypatch):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+
+    with FakeAPI(generate(wallets=2, transactions=45)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        dataset = server.server.dataset
+
+        result = CliRunner().invoke(
+            export, ["-o", str(tmp_path / "out"), "--auth-token", "t"]
+        )
+
+    assert result.exit_code == 0, result.output
+    assert {p.name for p in (tmp_path / "out").iterdir()} == {
+        f"{name}.jsonl" for name in COLUMNS
+    }
+
+    exported = read(tmp_path / "out" / "transactions.jsonl", "jsonl")
+    assert len(exported) == sum(len(t) for t in dataset.transactions.values())
+    assert len(read(tmp_path / "out" / "wallets.jsonl", "jsonl")) == 2
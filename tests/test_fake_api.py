@@ -0,0 +1,68 @@
+import pytest
+import requests
+
+import wellets_cli.api as api
+from wellets_cli.fake_api import FakeAPI, Faults, generate
+
+
+def test_generate_is_seeded():
+    a = generate(wallets=3, transactions=10, seed=1)
+    b = generate(wallets=3, transactions=10, seed=1)
+
+    assert a.wallets == b.wallets
+    assert a.transactions == b.transactions
+    assert len(a.wallets) == 3
+    assert all(len(t) == 10 for t in a.transactions.values())
+    assert {p["parent_id"] for p in a.portfolios} - {None} <= {
+        p["id"] for p in a.portfolios
+    }
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    with FakeAPI(generate(wallets=3, transactions=30)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        yield server
+
+
+def test_serves_the_dataset(fake_api):
+    dataset = fake_api.server.dataset
+    wallet = dataset.wallets[0]
+
+    wallets = api.get_wallets(headers={})
+    transactions = list(api.iter_transactions({"wallet_id": wallet["id"]}, {}, 20))
+
+    assert [w.id for w in wallets] == [w["id"] for w in dataset.wallets]
+    assert len(transactions) == 30
+    assert api.get_preferred_currency({}).acronym == "EUR"
+    assert fake_api.requests[("GET", "/transactions")] == 2
+
+
+def test_serves_every_resource(fake_api):
+    dataset = fake_api.server.dataset
+    wallet, asset = dataset.wallets[0], dataset.assets[0]
+    root = next(p for p in dataset.portfolios if p["parent_id"] is None)
+
+    children = api.get_portfolios({"portfolio_id": root["id"]}, {})
+    rebalance = api.get_portfolios_rebalance({"portfolio_id": root["id"]}, {})
+    gain = api.get_capital_gain({"asset_id": asset["id"]}, {})
+    history = api.get_asset_history(
+        {"asset_id": asset["id"], "start": "2023-12-01", "interval": "1w"}, {}
+    )
+    transaction = dataset.transactions[wallet["id"]][0]
+    reverted = api.revert_transaction(transaction["id"], {})
+
+    assert len(children) == len(rebalance.changes) == 2
+    assert gain.current_price > 0
+    assert len(history) == 5
+    assert reverted.value == -transaction["value"]
+    assert api.get_accumulations({"asset_id": asset["id"]}, {})
+
+
+def test_injects_faults(fake_api):
+    fake_api.faults = Faults(error_rate=1, errors=(502,))
+
+    response = requests.get(f"{fake_api.url}/wallets")
+
+    assert response.status_code == 502
+    assert response.headers["Content-Type"] == "text/html"
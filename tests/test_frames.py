@@ -0,0 +1,26 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from wellets_cli.frames import table  # noqa: E402
+
+
+def test_table_from_json_rows():
+    rows = [
+        {"id": "a", "value": 1.5, "created_at": "2024-01-01T10:00:00.000Z"},
+        {"id": "b", "value": None, "created_at": "2024-01-02T10:00:00+02:00"},
+    ]
+    columns = [
+        ("id", "string"),
+        ("wallet_id", "string"),
+        ("value", "float"),
+        ("created_at", "timestamp"),
+    ]
+
+    t = table(rows, columns, wallet_id="w")
+
+    assert t.column_names == ["id", "wallet_id", "value", "created_at"]
+    assert t.column("wallet_id").to_pylist() == ["w", "w"]
+    assert t.column("value").to_pylist() == [1.5, None]
+    assert t.column("created_at").type == pa.timestamp("us", tz="UTC")
+    assert [d.hour for d in t.column("created_at").to_pylist()] == [10, 8]
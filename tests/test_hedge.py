@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import wait
+
+import pytest
+
+import wellets_cli.api as api
+import wellets_cli.hedge as hedge
+from wellets_cli.fake_api import FakeAPI, Faults, generate
+
+
+class SlowFirst(Faults):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.first = delay
+
+    def delay(self) -> float:
+        with self.lock:
+            delay, self.first = self.first, 0
+        return delay
+
+
+@pytest.fixture
+def fake_api(monkeypatch, tmp_path):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path / "state"))
+
+    with FakeAPI(generate(wallets=2, transactions=5)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        yield server
+
+
+def test_endpoint():
+    url = "http://api/portfolios/3f2b8c1e-9a4d-4e2b-8c1e-9a4d4e2b8c1e/details/"
+
+    assert hedge.endpoint(url) == "/portfolios/{id}/details"
+    assert hedge.endpoint("http://api/wallets?limit=5") == "/wallets"
+
+
+def test_latency_stats(tmp_path):
+    stats = hedge.LatencyStats(tmp_path / "latency.json")
+    for i in range(1, hedge.MIN_SAMPLES):
+        stats.record("/wallets", i / 10)
+
+    assert stats.deadline("/wallets") is None
+
+    stats.record("/wallets", 2.0)
+    stats.save()
+
+    assert hedge.LatencyStats(tmp_path / "latency.json").deadline("/wallets") == 1.9
+
+
+def test_hedges_slow_requests(fake_api, monkeypatch):
+    stats = hedge.latency_stats()
+    for _ in range(hedge.MIN_SAMPLES):
+        stats.record("/currencies", 0.01)
+
+    monkeypatch.setenv("WELLETS_HEDGE", "1")
+    fake_api.faults = SlowFirst(2)
+
+    start = time.perf_counter()
+    currencies = api.get_currencies({})
+
+    assert len(currencies) == 5
+    assert time.perf_counter() - start < 1
+    assert fake_api.requests[("GET", "/currencies")] == 2
+
+
+def test_queued_requests_are_not_hedged(fake_api, monkeypatch):
+    stats = hedge.latency_stats()
+    for _ in range(hedge.MIN_SAMPLES):
+        stats.record("/currencies", 0.2)
+
+    monkeypatch.setenv("WELLETS_HEDGE", "1")
+
+    # keep every worker busy for longer than the deadline
+    busy = [hedge._submit(lambda: time.sleep(0.5)) for _ in range(8)]
+    api.get_currencies({})
+
+    wait(busy)
+    assert fake_api.requests[("GET", "/currencies")] == 1
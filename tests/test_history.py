@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from wellets_cli.history import cumulative_balance, nearest, time_index, to_datetime64
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_time_index_fixed_interval():
+    index = time_index(utc(2024, 1, 1), utc(2024, 1, 2), "6h")
+
+    assert len(index) == 5
+    assert index[-1] == np.datetime64("2024-01-02T00:00:00")
+
+
+def test_time_index_calendar_interval():
+    index = time_index(utc(2024, 1, 31), utc(2024, 4, 30), "1M")
+
+    assert list(index.astype("datetime64[D]").astype(str)) == [
+        "2024-01-31",
+        "2024-02-29",
+        "2024-03-31",
+        "2024-04-30",
+    ]
+
+
+def test_time_index_rejects_reversed_range():
+    with pytest.raises(ValueError):
+        time_index(utc(2024, 2, 1), utc(2024, 1, 1), "1d")
+
+
+def test_cumulative_balance():
+    index = time_index(utc(2024, 1, 2), utc(2024, 1, 4), "1d")
+    timestamp = to_datetime64(
+        [utc(2024, 1, 1), utc(2024, 1, 2), utc(2024, 1, 3, 12), utc(2024, 1, 5)]
+    )
+    value = np.array([10.0, 5.0, -3.0, 100.0])
+
+    balance = cumulative_balance(timestamp, value, index, initial=1.0)
+
+    assert balance.tolist() == [16.0, 16.0, 13.0]
+
+
+def test_nearest():
+    timestamp = np.array(["2024-01-01", "2024-01-03"], dtype="datetime64[s]")
+    index = np.array(
+        ["2023-12-01", "2024-01-01T23", "2024-01-02T01", "2024-02-01"],
+        dtype="datetime64[s]",
+    )
+
+    assert nearest(timestamp, index).tolist() == [0, 0, 1, 1]
+
+
+def test_validating_intervals_does_not_import_the_history_engine():
+    code = (
+        "import sys, wellets_cli.validator as v;"
+        "v.interval_validator('1d');"
+        "assert 'wellets_cli.history' not in sys.modules;"
+        "assert 'numpy' not in sys.modules"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
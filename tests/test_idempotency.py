@@ -0,0 +1,56 @@
+from wellets_cli.idempotency import (
+    HEADER,
+    Journal,
+    get_journal,
+    idempotency_key,
+    idempotent,
+)
+
+
+def test_idempotency_key_is_deterministic():
+    assert idempotency_key("revert", "a") == idempotency_key("revert", "a")
+    assert idempotency_key("revert", "a") != idempotency_key("revert", "b")
+    assert idempotency_key("t", {"a": 1, "b": 2}) == idempotency_key(
+        "t", {"b": 2, "a": 1}
+    )
+
+
+def test_idempotent_skips_confirmed_writes(tmp_path, monkeypatch):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+    calls = []
+
+    def write(headers):
+        calls.append(headers)
+        return {"id": str(len(calls))}
+
+    assert idempotent("k", {}, write) == {"id": "1"}
+    assert idempotent("k", {}, write) == {"id": "1"}
+    assert idempotent(None, {}, write) == {"id": "2"}
+
+    assert calls[0] == {HEADER: "k"}
+    assert Journal(get_journal({}).path).get("k") == {"id": "1"}
+
+
+def test_replayed_writes_leave_the_journal_alone(tmp_path, monkeypatch):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+    journal = get_journal({})
+    journal.record("k", {"id": "recorded"})
+
+    monkeypatch.setenv("WELLETS_REPLAY", str(tmp_path / "cassette.jsonl"))
+
+    assert idempotent("k", {}, lambda headers: {"id": "replayed"}) == {"id": "replayed"}
+    assert idempotent("new", {}, lambda headers: {"id": "replayed"})
+    assert Journal(journal.path).get("new") is None
+
+
+def test_journals_are_per_api_and_account(tmp_path, monkeypatch):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+    alice, bob = {"Authorization": "Bearer a"}, {"Authorization": "Bearer b"}
+
+    monkeypatch.setenv("WELLETS_API_URL", "http://one")
+    paths = [get_journal(alice).path, get_journal(bob).path]
+    monkeypatch.setenv("WELLETS_API_URL", "http://two")
+    paths.append(get_journal(alice).path)
+
+    assert len(set(paths)) == 3
+    assert all(p.is_relative_to(tmp_path) for p in paths)
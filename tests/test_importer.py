@@ -0,0 +1,85 @@
+import json
+from datetime import datetime
+
+from wellets_cli.importer import Checkpoint, RowValidator, import_rows, read_rows
+from wellets_cli.model import Currency, Wallet
+
+NOW = datetime(2024, 1, 1)
+WALLET_ID = "22222222-2222-2222-2222-222222222222"
+
+currency = Currency(
+    id="c", acronym="EUR", alias="Euro", dollar_rate=0.9, created_at=NOW, updated_at=NOW
+)
+wallet = Wallet(
+    id=WALLET_ID,
+    alias="eur",
+    balance=0,
+    currency_id="c",
+    created_at=NOW,
+    updated_at=NOW,
+)
+
+
+def row(**kwargs):
+    return {
+        "wallet": "eur",
+        "value": "10",
+        "description": "buy",
+        "created_at": "2024-01-01 10:00",
+        **kwargs,
+    }
+
+
+def test_row_validator():
+    validate = RowValidator([wallet], [currency])
+
+    data, error = validate(row())
+    assert error is None
+    assert data["wallet_id"] == WALLET_ID and data["dollar_rate"] == 0.9
+
+    assert validate(row(value="x"))[1] == "value: Should be a number"
+    assert validate(row(wallet="usd"))[1] == "wallet: unknown wallet 'usd'"
+    assert validate(row(wallet_id="nope"))[1] == "wallet_id: Should be a UUID"
+
+
+def test_import_rows_resumes_from_checkpoint(tmp_path):
+    rows = [(i, row(value=str(i))) for i in range(1, 11)]
+    validate = RowValidator([wallet], [currency])
+    posted = []
+
+    def post(line, data):
+        if data["value"] == 5 and not posted.count("failed"):
+            posted.append("failed")
+            raise RuntimeError("server down")
+        posted.append(data["value"])
+
+    checkpoint = Checkpoint(tmp_path / "checkpoint")
+    errors = import_rows(rows, validate, post, checkpoint, batch_size=3, workers=2)
+    checkpoint.close()
+
+    assert errors == {5: "server down"}
+
+    checkpoint = Checkpoint(tmp_path / "checkpoint")
+    errors = import_rows(rows, validate, post, checkpoint, batch_size=3, workers=2)
+    checkpoint.close()
+
+    assert errors == {}
+    assert sorted(v for v in posted if v != "failed") == list(range(1, 11))
+
+
+def test_malformed_jsonl_rows_are_row_errors(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    path.write_text(
+        "\n".join([json.dumps(row()), "{not json", "[1, 2]", json.dumps(row())])
+    )
+    posted = []
+
+    errors = import_rows(
+        read_rows(path, "jsonl"),
+        RowValidator([wallet], [currency]),
+        lambda line, data: posted.append(line),
+    )
+
+    assert sorted(posted) == [1, 4]
+    assert errors[2].startswith("invalid JSON")
+    assert errors[3] == "invalid JSON: expected an object"
@@ -0,0 +1,31 @@
+import pstats
+
+from wellets_cli.profiling import Profiler
+
+
+def allocate():
+    return [list(range(100)) for _ in range(1000)]
+
+
+def test_cpu_profile(tmp_path):
+    output = tmp_path / "cpu.prof"
+    profiler = Profiler("cpu", limit=5, output=str(output))
+
+    profiler.start()
+    allocate()
+    report = profiler.stop()
+
+    assert "allocate" in report
+    assert pstats.Stats(str(output)).total_calls > 0
+
+
+def test_mem_profile():
+    profiler = Profiler("mem", limit=5)
+
+    profiler.start()
+    data = allocate()
+    report = profiler.stop()
+
+    assert report.startswith("Peak")
+    assert "test_profiling.py" in report
+    assert len(data) == 1000
@@ -0,0 +1,19 @@
+import numpy as np
+
+from wellets_cli.projection import project
+
+
+def test_project_does_not_depend_on_workers():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.001, 0.02, size=(200, 2))
+    kwargs = dict(steps=20, checkpoints=[10, 20], paths=1_000, target=110.0, seed=42)
+
+    serial = project(np.array([50.0, 50.0]), returns, batch_size=300, **kwargs)
+    parallel = project(
+        np.array([50.0, 50.0]), returns, batch_size=300, workers=2, **kwargs
+    )
+
+    assert np.array_equal(serial.percentiles, parallel.percentiles)
+    assert np.allclose(serial.mean, parallel.mean)
+    assert (np.diff(serial.percentiles, axis=1) >= 0).all()
+    assert (serial.p_hit >= serial.p_above).all()
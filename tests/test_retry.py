@@ -0,0 +1,122 @@
+import pytest
+import requests
+
+import wellets_cli.api as api
+import wellets_cli.transport as transport
+from wellets_cli.fake_api import FakeAPI, Faults, generate
+from wellets_cli.retry import CircuitOpen, RetryPolicy
+
+
+class FailFirst(Faults):
+    def __init__(self, times: int, error, **kwargs):
+        super().__init__(**kwargs)
+        self.times, self.fault = times, error
+
+    def error(self):
+        with self.lock:
+            self.times -= 1
+            return self.fault if self.times >= 0 else None
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    previous = transport.set_retry_policy(RetryPolicy(retries=5, backoff=0))
+    transport._breaker.reset()
+
+    with FakeAPI(generate(wallets=2, transactions=5)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        yield server
+
+    transport.set_retry_policy(previous)
+    transport._breaker.reset()
+
+
+def test_retries_idempotent_requests(fake_api):
+    fake_api.faults = FailFirst(1, "drop")
+    currencies = api.get_currencies({})
+
+    fake_api.faults = FailFirst(2, 502)
+    wallets = api.get_wallets({})
+
+    assert len(currencies) == 5 and len(wallets) == 2
+    assert fake_api.requests[("GET", "/currencies")] == 2
+    assert fake_api.requests[("GET", "/wallets")] == 3
+
+
+def test_does_not_retry_writes(fake_api):
+    wallet = fake_api.server.dataset.wallets[0]
+    fake_api.faults = Faults(error_rate=1, errors=(500,))
+
+    with pytest.raises(api.APIError):
+        api.create_transaction({"wallet_id": wallet["id"], "value": 1}, {})
+
+    assert fake_api.requests[("POST", "/transactions")] == 1
+
+
+def test_retries_keyed_writes_only_if_the_server_deduplicates(
+    fake_api, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+    wallet = fake_api.server.dataset.wallets[0]
+    data = {"wallet_id": wallet["id"], "value": 1}
+
+    fake_api.faults = FailFirst(1, 502)
+    with pytest.raises(api.APIError):
+        api.create_transaction(data, {}, idempotency_key="a")
+    assert fake_api.requests[("POST", "/transactions")] == 1
+
+    monkeypatch.setenv("WELLETS_SERVER_DEDUP", "1")
+    fake_api.faults = FailFirst(1, 502)
+    api.create_transaction(data, {}, idempotency_key="b")
+    assert fake_api.requests[("POST", "/transactions")] == 3
+
+
+def test_honours_retry_after(fake_api):
+    wallet = fake_api.server.dataset.wallets[0]
+    fake_api.faults = FailFirst(1, 429, retry_after=0)
+
+    api.create_transaction({"wallet_id": wallet["id"], "value": 1}, {})
+
+    assert fake_api.requests[("POST", "/transactions")] == 2
+
+
+def test_non_json_error(fake_api, monkeypatch):
+    monkeypatch.setenv("WELLETS_RETRIES", "0")
+    fake_api.faults = Faults(error_rate=1, errors=(502,))
+
+    with pytest.raises(api.APIError, match="502"):
+        api.get_currencies({})
+
+
+def test_circuit_breaker_fails_fast(fake_api):
+    fake_api.faults = Faults(error_rate=1, errors=("drop",))
+
+    with pytest.raises(requests.ConnectionError):
+        api.get_currencies({})
+    sent = sum(fake_api.requests.values())
+
+    with pytest.raises(CircuitOpen):
+        api.get_currencies({})
+    assert sum(fake_api.requests.values()) == sent
+
+
+def test_circuit_breaker_trial_ends_on_any_error(fake_api, monkeypatch):
+    fake_api.faults = Faults(error_rate=1, errors=("drop",))
+    with pytest.raises(requests.ConnectionError):
+        api.get_currencies({})
+
+    # the cooldown is over, the trial request fails with an unrelated error
+    monkeypatch.setattr(transport._breaker, "cooldown", 0)
+    send = transport._send
+
+    def broken_send(method, url, **kwargs):
+        raise requests.exceptions.ChunkedEncodingError("truncated")
+
+    monkeypatch.setattr(transport, "_send", broken_send)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        api.get_currencies({})
+
+    monkeypatch.setattr(transport, "_send", send)
+    fake_api.faults = Faults()
+
+    assert len(api.get_currencies({})) == 5
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from wellets_cli.returns import irr, time_weighted_return, xirr
+
+
+def test_time_weighted_return_ignores_cash_flows():
+    value = np.array([100.0, 210.0, 231.0])
+    flow = np.array([0.0, 100.0, 0.0])
+
+    assert time_weighted_return(value, flow) == pytest.approx(1.1 * 1.1 - 1)
+
+
+def test_xirr():
+    cash = np.array([-1000.0, 1100.0])
+    years = np.array([0.0, 1.0])
+
+    assert xirr(cash, years) == pytest.approx(0.1)
+
+
+def test_xirr_fallback_and_no_sign_change():
+    # a loss close to -100% is out of reach of most Newton guesses
+    assert xirr(np.array([-1000.0, 1.0]), np.array([0.0, 2.0])) == pytest.approx(
+        np.sqrt(0.001) - 1, rel=1e-6
+    )
+    assert np.isnan(xirr(np.array([100.0, 100.0]), np.array([0.0, 1.0])))
+
+
+def test_irr():
+    assert irr(np.array([-100.0, 10.0, 110.0])) == pytest.approx(0.1)
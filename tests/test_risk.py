@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from wellets_cli.risk import (
+    beta,
+    covariance_to_correlation,
+    max_drawdown,
+    rolling_beta,
+    rolling_covariance,
+)
+
+
+def test_max_drawdown():
+    r = np.array([[0.1, -0.5, 0.2, 1.0], [0.0, 0.0, 0.0, 0.0]])
+
+    assert max_drawdown(r).tolist() == pytest.approx([-0.5, 0.0])
+
+
+def test_rolling_beta_matches_full_window_beta():
+    rng = np.random.default_rng(0)
+    benchmark = rng.normal(size=50)
+    r = np.stack([2 * benchmark + rng.normal(scale=0.1, size=50), -benchmark])
+
+    rolling = rolling_beta(r, benchmark, window=20)
+
+    assert rolling.shape == (2, 31)
+    for i in range(31):
+        assert rolling[:, i] == pytest.approx(
+            beta(r[:, i : i + 20], benchmark[i : i + 20])
+        )
+
+
+def test_rolling_covariance_matches_numpy():
+    r = np.random.default_rng(0).normal(size=(3, 40))
+
+    cov = rolling_covariance(r, window=10)
+    corr = covariance_to_correlation(cov)
+
+    assert cov.shape == (31, 3, 3)
+    for i in range(31):
+        assert cov[i] == pytest.approx(np.cov(r[:, i : i + 10]))
+        assert corr[i] == pytest.approx(np.corrcoef(r[:, i : i + 10]))
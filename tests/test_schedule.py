@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import wellets_cli.api as api
+from wellets_cli.fake_api import FakeAPI, generate
+from wellets_cli.model import Accumulation, AccumulationEntry, Duration
+from wellets_cli.schedule import next_entry, schedule, status
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def make_accumulation(n_entries: int) -> Accumulation:
+    entries = [
+        AccumulationEntry(
+            id=str(i),
+            value=80.0,
+            description="",
+            wallet_id="w",
+            created_at=utc(2024, 1 + i, 28),
+            updated_at=utc(2024, 1 + i, 28),
+        )
+        for i in range(n_entries)
+    ]
+    return Accumulation(
+        id="a",
+        alias="monthly",
+        strategy="dca",
+        quote=100.0,
+        planned_entries=4,
+        every=Duration(months=1),
+        planned_start=utc(2024, 1, 31),
+        planned_end=utc(2024, 4, 30),
+        created_at=utc(2024, 1, 1),
+        updated_at=utc(2024, 1, 1),
+        asset_id="x",
+        entries=entries,
+    )
+
+
+def test_schedule_does_not_drift_on_month_ends():
+    dates = schedule(make_accumulation(0))
+
+    assert [d.day for d in dates] == [31, 29, 31, 30]
+
+
+def test_status_and_next_entry():
+    accumulation = make_accumulation(2)
+
+    # a quote of USD 100 buys 2 units
+    s = status(accumulation, 2.0, now=utc(2024, 4, 1))
+    entry = next_entry(accumulation, 2.0)
+
+    assert (s.made, s.due, s.current, s.target) == (2, 3, 160.0, 800.0)
+    assert entry.entry == 3
+    assert entry.date == utc(2024, 3, 31)
+    assert entry.amount == 440.0
+
+
+def test_next_entry_of_complete_plan():
+    assert next_entry(make_accumulation(4), 1.0) is None
+
+
+def test_next_entry_agrees_with_the_server(monkeypatch):
+    with FakeAPI(generate(wallets=3, transactions=5)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        assets = {a.id: a for a in api.get_assets({})}
+        accumulations = api.get_accumulations({}, {})
+
+        for accumulation in accumulations:
+            dollar_rate = assets[accumulation.asset_id].currency.dollar_rate
+            local = next_entry(accumulation, dollar_rate)
+            remote = api.get_next_accumulation_entry(accumulation.id, {})
+
+            assert local.entry == remote.entry
+            assert local.amount == pytest.approx(remote.amount)
+            assert local.target == pytest.approx(remote.target)
+
+    assert accumulations
@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from click.testing import CliRunner
+
+import wellets_cli.api as api
+from wellets_cli.api import APIError
+from wellets_cli.commands.accumulation import run_accumulations
+from wellets_cli.fake_api import FakeAPI, generate
+from wellets_cli.model import Accumulation, AccumulationEntry, Duration
+from wellets_cli.schedule import next_entry
+from wellets_cli.scheduler import Scheduler, SchedulerState
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_accumulation() -> Accumulation:
+    return Accumulation(
+        id="a",
+        alias="weekly",
+        strategy="dca",
+        quote=10.0,
+        planned_entries=3,
+        every=Duration(weeks=1),
+        planned_start=START,
+        planned_end=START + timedelta(weeks=2),
+        created_at=START,
+        updated_at=START,
+        asset_id="x",
+        entries=[],
+    )
+
+
+def make_scheduler(accumulation, state, now):
+    def post(accumulation, entry):
+        accumulation.entries.append(
+            AccumulationEntry(
+                id=str(entry.entry),
+                value=entry.amount,
+                description="",
+                wallet_id="w",
+                created_at=START,
+                updated_at=START,
+            )
+        )
+
+    return Scheduler(
+        fetch=lambda: [accumulation],
+        post=post,
+        state=state,
+        dollar_rate=lambda accumulation: 1.0,
+        remote=lambda accumulation: next_entry(accumulation, 1.0),
+        clock=lambda: now.timestamp(),
+        sleep=lambda _: None,
+    )
+
+
+def test_scheduler_posts_due_entries_once(tmp_path):
+    accumulation = make_accumulation()
+    state = SchedulerState(tmp_path / "state.json")
+    now = START + timedelta(days=8)
+
+    make_scheduler(accumulation, state, now).run(once=True)
+    make_scheduler(accumulation, SchedulerState(state.path), now).run(once=True)
+
+    assert [e.id for e in accumulation.entries] == ["1", "2"]
+    assert SchedulerState(state.path).posted == {"a": 2}
+
+
+def test_scheduler_retries_unrecorded_pending_entry(tmp_path):
+    accumulation = make_accumulation()
+    state = SchedulerState(tmp_path / "state.json")
+
+    # crashed while posting entry 2, which the server did not record
+    make_scheduler(accumulation, state, START).run(once=True)
+    state.pending = ("a", 2)
+    state.save()
+
+    restarted = SchedulerState(state.path)
+    make_scheduler(accumulation, restarted, START + timedelta(days=8)).run(once=True)
+
+    assert [e.id for e in accumulation.entries] == ["1", "2"]
+    assert restarted.pending is None
+
+
+def test_scheduler_defers_entries_out_of_sync(tmp_path):
+    stuck, other = make_accumulation(), make_accumulation()
+    other.id = "b"
+    state = SchedulerState(tmp_path / "state.json")
+    # an entry was deleted by hand: the server is behind what we posted
+    state.posted = {"a": 1}
+
+    scheduler = make_scheduler(stuck, state, START + timedelta(days=8))
+    scheduler.fetch = lambda: [stuck, other]
+    scheduler.run(once=True)  # returns after a single pass
+
+    assert stuck.entries == []
+    assert [e.id for e in other.entries] == ["1", "2"]
+    assert scheduler.deferred["a"] > START.timestamp()
+
+
+def test_scheduler_survives_api_errors(tmp_path):
+    failing, other = make_accumulation(), make_accumulation()
+    other.id = "b"
+    state = SchedulerState(tmp_path / "state.json")
+    logged = []
+
+    scheduler = make_scheduler(failing, state, START)
+    post = scheduler.post
+
+    def flaky_post(accumulation, entry):
+        if accumulation.id == "a":
+            raise APIError({"message": "Bad Gateway"})
+        post(accumulation, entry)
+
+    scheduler.fetch = lambda: [failing, other]
+    scheduler.post = flaky_post
+    scheduler.log = logged.append
+    scheduler.run(once=True)
+
+    assert failing.entries == []
+    assert [e.id for e in other.entries] == ["1"]
+    assert "Bad Gateway" in logged[0]
+    assert SchedulerState(state.path).pending is None
+
+
+def test_scheduler_does_not_post_amounts_the_server_disagrees_on(tmp_path):
+    accumulation = make_accumulation()
+    state = SchedulerState(tmp_path / "state.json")
+    logged = []
+
+    scheduler = make_scheduler(accumulation, state, START)
+    # the server converts the quote at another dollar rate
+    scheduler.remote = lambda accumulation: next_entry(accumulation, 0.5)
+    scheduler.log = logged.append
+    scheduler.run(once=True)
+
+    assert accumulation.entries == []
+    assert "the server expects 5.0 for #1" in logged[0]
+    assert SchedulerState(state.path).pending is None
+
+
+def test_run_posts_the_server_amounts(tmp_path, monkeypatch):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+
+    with FakeAPI(generate(wallets=3, transactions=5)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        dataset = server.server.dataset
+        for accumulation in dataset.accumulations:
+            accumulation["planned_entries"] = 27  # only the next entry is left
+        expected = {
+            a["id"]: api.get_next_accumulation_entry(a["id"], {}).amount
+            for a in dataset.accumulations
+        }
+
+        result = CliRunner().invoke(run_accumulations, ["--once", "--auth-token", "t"])
+
+        assert result.exit_code == 0, result.output
+        for accumulation in dataset.accumulations:
+            entry = accumulation["entries"][-1]
+            assert len(accumulation["entries"]) == 27
+            assert entry["value"] == pytest.approx(expected[accumulation["id"]])
@@ -0,0 +1,108 @@
+import click
+import pytest
+from prompt_toolkit.document import Document
+from prompt_toolkit.input import create_pipe_input
+from prompt_toolkit.output import DummyOutput
+
+import wellets_cli.shell as shell
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.group()
+def wallet():
+    pass
+
+
+@wallet.command(name="list")
+@click.option("--portfolio-id")
+@click.option("--secret", hidden=True)
+def list_wallets(portfolio_id, secret):
+    pass
+
+
+@wallet.command()
+def create():
+    pass
+
+
+def complete(text):
+    completer = shell.CommandCompleter(cli)
+    completions = completer.get_completions(Document(text), None)
+    return [(c.text, c.display_meta_text) for c in completions]
+
+
+def test_resolve_command():
+    completer = shell.CommandCompleter(cli)
+
+    assert completer._resolve(["wallet", "list"]) is list_wallets
+    assert completer._resolve(["wallet", "nope"]) is wallet
+
+
+def test_complete_commands_and_options():
+    assert complete("wal") == [("wallet", "")]
+    assert complete("wallet ") == [("create", ""), ("list", "")]
+    assert complete("wallet list --") == [("--portfolio-id", "")]
+
+
+def test_complete_ids(monkeypatch):
+    def names(headers):
+        return [("p1", "savings"), ("p2", "crypto")]
+
+    monkeypatch.setitem(shell.ID_OPTIONS, "portfolio-id", names)
+    monkeypatch.setattr(shell, "get_auth_token", lambda: "token")
+
+    assert complete("wallet list --portfolio-id ") == [
+        ("p1", "savings"),
+        ("p2", "crypto"),
+    ]
+    assert complete("wallet list --portfolio-id cry") == [("p2", "crypto")]
+
+
+@pytest.fixture
+def run_shell(monkeypatch, tmp_path):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+
+    def run(lines, invoke):
+        with create_pipe_input() as pipe:
+            pipe.send_text("".join(f"{line}\n" for line in lines))
+            pipe.close()
+            shell.repl(cli, invoke, input=pipe, output=DummyOutput())
+
+    return run
+
+
+def test_errors_do_not_end_the_session(run_shell, capsys):
+    invoked = []
+
+    def invoke(args):
+        invoked.append(args)
+        if args == ["fail"]:
+            raise RuntimeError("boom")
+        return 1
+
+    run_shell(["fail", "wallet 'list", "shell", "help wallet", "exit", "x"], invoke)
+
+    assert invoked == [["fail"], ["wallet", "--help"]]
+    err = capsys.readouterr().err
+    assert "Error: boom" in err
+    assert "Already in the shell" in err
+
+
+def test_commands_share_the_process_until_exit(run_shell, monkeypatch, tmp_path):
+    cleared = []
+    monkeypatch.setattr(shell.transport, "clear_cache", lambda: cleared.append(1))
+    invoked = []
+
+    run_shell(
+        ["wallet list", "", "refresh", "wallet create", "quit", "wallet list"],
+        lambda args: invoked.append(args) or 0,
+    )
+
+    assert invoked == [["wallet", "list"], ["wallet", "create"]]
+    assert cleared == [1]
+    history = (tmp_path / "shell_history").read_text()
+    assert "+wallet list" in history and "+quit" in history
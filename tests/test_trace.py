@@ -0,0 +1,63 @@
+import json
+
+import requests
+
+import wellets_cli.api as api
+import wellets_cli.trace as trace
+import wellets_cli.transport as transport
+
+CURRENCIES = [
+    {
+        "id": "u",
+        "acronym": "USD",
+        "alias": "Dollar",
+        "dollar_rate": 1,
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-01T00:00:00Z",
+    }
+]
+
+
+def test_trace_records_api_calls(monkeypatch):
+    def send(method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(CURRENCIES).encode()
+        return response
+
+    monkeypatch.setattr(transport, "_send", send)
+
+    trace.enable()
+    try:
+        currencies = api.get_currencies({})
+    finally:
+        tracer = trace.disable()
+
+    assert currencies[0].acronym == "USD"
+    assert not hasattr(api.get_currencies, "__wrapped__")
+    assert transport._send is send
+
+    [call] = tracer.calls
+    [request] = call.requests
+    assert call.name == "get_currencies"
+    assert (request.method, request.path, request.status) == (
+        "GET",
+        "/currencies",
+        200,
+    )
+    assert request.bytes == len(json.dumps(CURRENCIES))
+
+    assert "get_currencies" in trace.waterfall(tracer)
+    events = trace.chrome_trace(tracer)["traceEvents"]
+    assert [e["cat"] for e in events][:3] == ["cli", "api", "http"]
+
+
+def test_waterfall_shows_cached_calls():
+    tracer = trace.Tracer()
+    cached = trace.Call("get_currencies", 1, tracer.start, end=tracer.start + 0.001)
+    tracer.calls.append(cached)
+    tracer.end = tracer.start + 0.002
+
+    [header, _, row] = trace.waterfall(tracer).splitlines()[:3]
+    assert "get_currencies" in row and "(cached)" in row
+    assert header.split()[:3] == ["start", "call", "request"]
@@ -0,0 +1,78 @@
+import uuid
+
+from click.testing import CliRunner
+
+from wellets_cli.commands.transaction import create_transaction, revert_transaction
+from wellets_cli.fake_api import FakeAPI, generate
+
+
+def test_revert_reports_failures(tmp_path, monkeypatch):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+    missing = str(uuid.UUID(int=1))
+
+    with FakeAPI(generate(wallets=1, transactions=3)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        transactions = server.server.dataset.transactions
+        ids = [t["id"] for t in next(iter(transactions.values()))]
+
+        ids_file = tmp_path / "ids.txt"
+        ids_file.write_text("\n".join(["# to revert", *ids, "nope", missing]))
+
+        result = CliRunner().invoke(
+            revert_transaction,
+            ["--from-file", str(ids_file), "--workers", "4", "--auth-token", "t", "-y"],
+        )
+
+    assert result.exit_code == 1
+    assert len(result.stdout.split()) == 3
+    assert "Reverted 3 transactions, 2 failed" in result.stderr
+
+    failures = result.stderr.splitlines()[-2:]
+    assert failures[0].startswith("nope ")
+    assert failures[1].startswith(missing)
+
+
+def test_revert_once_per_transaction(tmp_path, monkeypatch):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+
+    with FakeAPI(generate(wallets=1, transactions=2)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        transactions = server.server.dataset.transactions
+        ids = [t["id"] for t in next(iter(transactions.values()))]
+        args = [arg for i in [*ids, ids[0]] for arg in ("--transaction-ids", i)]
+
+        first = CliRunner().invoke(
+            revert_transaction, [*args, "--auth-token", "t", "-y"]
+        )
+        # re-running the same revert is answered from the idempotency journal
+        second = CliRunner().invoke(
+            revert_transaction, [*args, "--auth-token", "t", "-y"]
+        )
+
+        reverts = sum(
+            n for (method, path), n in server.requests.items() if "revert" in path
+        )
+
+    assert first.exit_code == second.exit_code == 0
+    assert "Reverted 2 transactions, 0 failed" in first.stderr
+    assert sorted(first.stdout.split()) == sorted(second.stdout.split())
+    assert reverts == 2
+
+
+def test_create_with_a_zero_value_does_not_prompt(tmp_path, monkeypatch):
+    monkeypatch.setenv("WELLETS_STATE_DIR", str(tmp_path))
+
+    with FakeAPI(generate(wallets=1, transactions=0)) as server:
+        monkeypatch.setenv("WELLETS_API_URL", server.url)
+        wallet = server.server.dataset.wallets[0]
+
+        result = CliRunner().invoke(
+            create_transaction,
+            ["--wallet-id", wallet["id"], "--value", "0", "--dollar-rate", "1"]
+            + ["--description", "fee", "--created-at", "2024-01-01 10:00", "-y"]
+            + ["--auth-token", "t"],
+        )
+        [transaction] = server.server.dataset.transactions[wallet["id"]]
+
+    assert result.exit_code == 0, result.output
+    assert transaction["value"] == 0
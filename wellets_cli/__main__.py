@@ -1,6 +1,20 @@
 """Entry point for wellets_cli."""
 
-from .cli import main  # pragma: no cover
+import sys
+
+from .client import forward
+
+
+def main():  # pragma: no cover
+    code = forward(sys.argv[1:])
+
+    if code is not None:
+        sys.exit(code)
+
+    from .cli import main
+
+    main()
+
 
 if __name__ == "__main__":  # pragma: no cover
     main()
@@ -1,9 +1,9 @@
-from typing import List, Optional
-
-import requests
+from typing import Iterator, List, Optional
 
+import wellets_cli.transport as transport
 from wellets_cli.auth import UserSession
 from wellets_cli.config import settings
+from wellets_cli.idempotency import idempotent
 from wellets_cli.model import (
     Accumulation,
     Asset,
@@ -32,6 +32,18 @@ base_url = lambda: settings.api_url
 
 
 class APIError(ValueError):
+    @classmethod
+    def from_response(cls, response) -> "APIError":
+        """
+        The error of a failed response, whether or not its body is JSON (a
+        proxy in front of the API may answer with an HTML page).
+        """
+        try:
+            return cls(response.json())
+        except ValueError:
+            reason = response.reason or "error"
+            return cls({"message": f"HTTP {response.status_code} {reason}"})
+
     def __str__(self) -> str:
         if len(self.args) != 0 and "message" in self.args[0]:
             return self.args[0]["message"]
@@ -39,13 +51,13 @@ class APIError(ValueError):
 
 
 def login(email: str, password: str) -> UserSession:
-    response = requests.post(
+    response = transport.post(
         f"{base_url()}/users/sessions",
         json={"email": email, "password": password},
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     user_session = response.json()
     user_session = UserSession(**user_session)
@@ -53,13 +65,13 @@ def login(email: str, password: str) -> UserSession:
 
 
 def get_currencies(headers: dict) -> List[Currency]:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/currencies",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     currencies = response.json()
     currencies = map(lambda c: Currency(**c), currencies)
@@ -68,13 +80,13 @@ def get_currencies(headers: dict) -> List[Currency]:
 
 
 def sync_currencies(headers: dict) -> str:
-    response = requests.post(
+    response = transport.post(
         f"{base_url()}/currencies/rate/sync",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     if response.status_code == 201:
         return "synced"
@@ -84,14 +96,14 @@ def sync_currencies(headers: dict) -> str:
 
 
 def get_wallets(headers: dict, params: Optional[dict] = None) -> List[Wallet]:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/wallets",
         headers=headers,
         params=params,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     wallets = response.json()["wallets"]
     wallets = map(lambda w: Wallet(**w), wallets)
@@ -100,14 +112,14 @@ def get_wallets(headers: dict, params: Optional[dict] = None) -> List[Wallet]:
 
 
 def create_wallet(data: dict, headers: dict) -> Wallet:
-    response = requests.post(
+    response = transport.post(
         f"{base_url()}/wallets",
         json=data,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     wallet = response.json()
     wallet = Wallet(**wallet)
@@ -115,14 +127,14 @@ def create_wallet(data: dict, headers: dict) -> Wallet:
 
 
 def update_wallet(wallet_id, data: dict, headers: dict) -> Wallet:
-    response = requests.patch(
+    response = transport.patch(
         f"{base_url()}/wallets/{wallet_id}",
         json=data,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     wallet = response.json()
     wallet = Wallet(**wallet)
@@ -130,13 +142,13 @@ def update_wallet(wallet_id, data: dict, headers: dict) -> Wallet:
 
 
 def delete_wallet(wallet_id: str, headers: dict) -> Wallet:
-    response = requests.delete(
+    response = transport.delete(
         f"{base_url()}/wallets/{wallet_id}",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     wallet = response.json()
     wallet = Wallet(**wallet)
@@ -146,14 +158,14 @@ def delete_wallet(wallet_id: str, headers: dict) -> Wallet:
 def get_wallet_average_load_price(
     params: dict, headers: dict
 ) -> WalletAverageLoadPrice:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/wallets/average-load-price",
         params=params,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     avg_load_price = response.json()
     avg_load_price = WalletAverageLoadPrice(**avg_load_price)
@@ -161,13 +173,13 @@ def get_wallet_average_load_price(
 
 
 def get_user_settings(headers: dict) -> UserSettings:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/users/settings",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     user_settings = response.json()
     user_settings = UserSettings(**user_settings)
@@ -183,7 +195,7 @@ def get_portfolios(params: dict, headers: dict) -> List[Portfolio]:
     portfolio_id = params.get("portfolio_id")
     show_all = params.get("show_all")
 
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/portfolios"
         f"/{portfolio_id if portfolio_id else ''}"
         f"{'/all' if show_all else ''}",
@@ -191,7 +203,7 @@ def get_portfolios(params: dict, headers: dict) -> List[Portfolio]:
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     portfolios = response.json()
     portfolios = map(lambda w: Portfolio(**w), portfolios)
@@ -200,13 +212,13 @@ def get_portfolios(params: dict, headers: dict) -> List[Portfolio]:
 
 
 def get_portfolio(portfolio_id: str, headers: dict) -> Portfolio:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/portfolios/{portfolio_id}/details",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     portfolio = response.json()
     portfolio = Portfolio(**portfolio)
@@ -214,14 +226,14 @@ def get_portfolio(portfolio_id: str, headers: dict) -> Portfolio:
 
 
 def create_portfolio(data: dict, headers: dict) -> Portfolio:
-    response = requests.post(
+    response = transport.post(
         f"{base_url()}/portfolios",
         json=data,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     portfolio = response.json()
     portfolio = Portfolio(**portfolio)
@@ -229,14 +241,14 @@ def create_portfolio(data: dict, headers: dict) -> Portfolio:
 
 
 def edit_portfolio(portfolio_id: str, data: dict, headers: dict) -> Portfolio:
-    response = requests.put(
+    response = transport.put(
         f"{base_url()}/portfolios/{portfolio_id}",
         json=data,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     portfolio = response.json()
     portfolio = Portfolio(**portfolio)
@@ -244,13 +256,13 @@ def edit_portfolio(portfolio_id: str, data: dict, headers: dict) -> Portfolio:
 
 
 def delete_portfolio(portfolio_id: str, headers: dict) -> Portfolio:
-    response = requests.delete(
+    response = transport.delete(
         f"{base_url()}/portfolios/{portfolio_id}",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     portfolio = response.json()
     portfolio = Portfolio(**portfolio)
@@ -258,14 +270,14 @@ def delete_portfolio(portfolio_id: str, headers: dict) -> Portfolio:
 
 
 def get_wallet_balance(wallet_id: str, headers: dict) -> Balance:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/wallets/balance",
         params={"wallet_id": wallet_id},
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     balance = response.json()
     balance = Balance(**balance)
@@ -273,13 +285,13 @@ def get_wallet_balance(wallet_id: str, headers: dict) -> Balance:
 
 
 def get_total_balance(headers: dict) -> Balance:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/wallets/total-balance",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     balance = response.json()
     balance = Balance(**balance)
@@ -287,13 +299,13 @@ def get_total_balance(headers: dict) -> Balance:
 
 
 def get_wallets_total_balance(headers: dict) -> Balance:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/wallets/total-balance",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     balance = response.json()
     balance = Balance(**balance)
@@ -301,14 +313,14 @@ def get_wallets_total_balance(headers: dict) -> Balance:
 
 
 def get_portfolios_balance(params: dict, headers: dict) -> Balance:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/portfolios/balance",
         params=params,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     balance = response.json()
     balance = Balance(**balance)
@@ -318,13 +330,13 @@ def get_portfolios_balance(params: dict, headers: dict) -> Balance:
 def get_portfolios_rebalance(params: dict, headers: dict) -> PortfolioRebalance:
     portfolio_id = params["portfolio_id"]
 
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/portfolios/{portfolio_id}/rebalance",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     rebalance = response.json()
     rebalance = PortfolioRebalance(**rebalance)
@@ -332,43 +344,86 @@ def get_portfolios_rebalance(params: dict, headers: dict) -> PortfolioRebalance:
 
 
 def get_transactions(params: dict, headers: dict) -> List[Transaction]:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/transactions/",
         params=params,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     transactions = response.json()["transactions"]
     transactions = [Transaction(**t) for t in transactions]
     return transactions
 
 
-def create_transaction(data: dict, headers: dict) -> Transaction:
-    response = requests.post(
-        f"{base_url()}/transactions",
-        json=data,
+def iter_transactions(
+    params: dict, headers: dict, page_size: int = 100
+) -> Iterator[Transaction]:
+    """
+    Iterate over all transactions matching `params`, page by page.
+    """
+    page = 1
+
+    while True:
+        transactions = get_transactions(
+            {**params, "limit": page_size, "page": page}, headers=headers
+        )
+
+        yield from transactions
+
+        if len(transactions) < page_size:
+            return
+
+        page += 1
+
+
+def get_json(path: str, headers: dict, params: Optional[dict] = None) -> bytes:
+    """
+    Return the raw JSON body of a GET on `path`, for callers that build their
+    own structures instead of models (see `wellets_cli.frames`).
+    """
+    response = transport.get(
+        f"{base_url()}{path}",
+        params=params,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
+
+    return response.content
+
 
-    transaction = response.json()
-    transaction = Transaction(**transaction)
+def create_transaction(
+    data: dict, headers: dict, idempotency_key: Optional[str] = None
+) -> Transaction:
+    def post(headers: dict) -> dict:
+        response = transport.post(
+            f"{base_url()}/transactions",
+            json=data,
+            headers=headers,
+        )
+
+        if not response.ok:
+            raise APIError.from_response(response)
+
+        return response.json()
+
+    payload = idempotent(idempotency_key, headers, post)
+    transaction = Transaction(**payload)
     return transaction
 
 
 def get_wallet(wallet_id: str, headers: dict) -> Wallet:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/wallets/{wallet_id}",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     wallet = response.json()
     wallet = Wallet(**wallet)
@@ -376,14 +431,14 @@ def get_wallet(wallet_id: str, headers: dict) -> Wallet:
 
 
 def get_accumulations(params: dict, headers: dict) -> List[Accumulation]:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/accumulations/",
         headers=headers,
         params=params,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     accumulations = response.json()
     accumulations = [Accumulation(**a) for a in accumulations]
@@ -393,13 +448,13 @@ def get_accumulations(params: dict, headers: dict) -> List[Accumulation]:
 def get_next_accumulation_entry(
     accumulation_id: str, headers: dict
 ) -> NextAccumulationEntry:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/accumulations/{accumulation_id}/next-entry",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     entry = response.json()
     entry = NextAccumulationEntry(**entry)
@@ -407,14 +462,14 @@ def get_next_accumulation_entry(
 
 
 def create_accumulation(data: dict, headers: dict) -> Accumulation:
-    response = requests.post(
+    response = transport.post(
         f"{base_url()}/accumulations",
         json=data,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     accumulation = response.json()
     accumulation = Accumulation(**accumulation)
@@ -422,42 +477,47 @@ def create_accumulation(data: dict, headers: dict) -> Accumulation:
 
 
 def delete_accumulation(accumulation_id: str, headers: dict) -> Accumulation:
-    response = requests.delete(
+    response = transport.delete(
         f"{base_url()}/accumulations/{accumulation_id}",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     accumulation = response.json()
     accumulation = Accumulation(**accumulation)
     return accumulation
 
 
-def create_transfer(data: dict, headers: dict) -> Transfer:
-    response = requests.post(
-        f"{base_url()}/transfers",
-        json=data,
-        headers=headers,
-    )
+def create_transfer(
+    data: dict, headers: dict, idempotency_key: Optional[str] = None
+) -> Transfer:
+    def post(headers: dict) -> dict:
+        response = transport.post(
+            f"{base_url()}/transfers",
+            json=data,
+            headers=headers,
+        )
 
-    if not response.ok:
-        raise APIError(response.json())
+        if not response.ok:
+            raise APIError.from_response(response)
+
+        return response.json()
 
-    transfer = response.json()
-    transfer = Transfer(**transfer)
+    payload = idempotent(idempotency_key, headers, post)
+    transfer = Transfer(**payload)
     return transfer
 
 
 def get_assets(headers: dict) -> List[Asset]:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/assets",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     assets = response.json()
     assets = [Asset(**a) for a in assets]
@@ -465,29 +525,29 @@ def get_assets(headers: dict) -> List[Asset]:
 
 
 def get_asset_average_load_price(params: dict, headers: dict) -> AverageLoadPrice:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/assets/average-load-price",
         params=params,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     avg_load_price = response.json()
     avg_load_price = AverageLoadPrice(**avg_load_price)
     return avg_load_price
 
 
-def get_asset_balance(params: dict, headers: dict) -> Balance:
-    response = requests.get(
+def get_asset_balance(params: dict, headers: dict) -> AssetBalance:
+    response = transport.get(
         f"{base_url()}/assets/balance",
         params=params,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     asset_balance = response.json()
     asset_balance = AssetBalance(**asset_balance)
@@ -495,56 +555,61 @@ def get_asset_balance(params: dict, headers: dict) -> Balance:
 
 
 def get_asset_allocations(headers: dict) -> List[AssetAllocation]:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/assets/allocations",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     allocations = response.json()
     allocations = [AssetAllocation(**a) for a in allocations]
     return allocations
 
 
-def get_total_asset_balance(headers: dict) -> Balance:
-    response = requests.get(
+def get_total_asset_balance(headers: dict) -> AssetBalance:
+    response = transport.get(
         f"{base_url()}/assets/total-balance",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     balance = response.json()
     balance = AssetBalance(**balance)
     return balance
 
 
-def revert_transaction(transaction_id: str, headers: dict) -> Transaction:
-    response = requests.post(
-        f"{base_url()}/transactions/{transaction_id}/revert",
-        headers=headers,
-    )
+def revert_transaction(
+    transaction_id: str, headers: dict, idempotency_key: Optional[str] = None
+) -> Transaction:
+    def post(headers: dict) -> dict:
+        response = transport.post(
+            f"{base_url()}/transactions/{transaction_id}/revert",
+            headers=headers,
+        )
 
-    if not response.ok:
-        raise APIError(response.json())
+        if not response.ok:
+            raise APIError.from_response(response)
+
+        return response.json()
 
-    transaction = response.json()
-    transaction = Transaction(**transaction)
+    payload = idempotent(idempotency_key, headers, post)
+    transaction = Transaction(**payload)
     return transaction
 
 
 def set_preferred_currency(data: dict, headers: dict) -> UserSettings:
-    response = requests.put(
+    response = transport.put(
         f"{base_url()}/users/settings",
         json=data,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     user_settings = response.json()
     user_settings = UserSettings(**user_settings)
@@ -552,14 +617,14 @@ def set_preferred_currency(data: dict, headers: dict) -> UserSettings:
 
 
 def register(data: dict, headers: dict) -> User:
-    response = requests.post(
+    response = transport.post(
         f"{base_url()}/users",
         json=data,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     user = response.json()
     user = User(**user)
@@ -567,14 +632,14 @@ def register(data: dict, headers: dict) -> User:
 
 
 def create_investment(data: dict, headers: dict) -> Investment:
-    response = requests.post(
+    response = transport.post(
         f"{base_url()}/investments",
         json=data,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     investment = response.json()
     investment = Investment(**investment)
@@ -582,13 +647,13 @@ def create_investment(data: dict, headers: dict) -> Investment:
 
 
 def get_investments(headers: dict) -> List[Investment]:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/investments",
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     investments = response.json()
     investments = [Investment(**i) for i in investments]
@@ -596,7 +661,7 @@ def get_investments(headers: dict) -> List[Investment]:
 
 
 def get_wallet_history(params: dict, headers: dict) -> List[WalletHistory]:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/wallets-balances/history",
         params=params,
         headers=headers,
@@ -604,7 +669,7 @@ def get_wallet_history(params: dict, headers: dict) -> List[WalletHistory]:
 
     if not response.ok:
         print(response.status_code)
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     history = response.json()
     history = [WalletHistory(**h) for h in history]
@@ -612,7 +677,7 @@ def get_wallet_history(params: dict, headers: dict) -> List[WalletHistory]:
 
 
 def get_asset_history(params: dict, headers: dict) -> List[AssetHistory]:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/assets/history",
         params=params,
         headers=headers,
@@ -620,7 +685,7 @@ def get_asset_history(params: dict, headers: dict) -> List[AssetHistory]:
 
     if not response.ok:
         print(response.status_code)
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     history = response.json()
     history = [AssetHistory(**h) for h in history]
@@ -630,7 +695,7 @@ def get_asset_history(params: dict, headers: dict) -> List[AssetHistory]:
 def get_currency_history(params: dict, headers: dict) -> List[KLines]:
     currency_id = params.pop("currency_id")
 
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/currencies/{currency_id}/klines",
         params=params,
         headers=headers,
@@ -638,7 +703,7 @@ def get_currency_history(params: dict, headers: dict) -> List[KLines]:
 
     if not response.ok:
         print(response.status_code)
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     history = response.json()
     history = [KLines(**h) for h in history]
@@ -647,14 +712,14 @@ def get_currency_history(params: dict, headers: dict) -> List[KLines]:
 
 
 def get_capital_gain(params: dict, headers: dict) -> CapitalGain:
-    response = requests.get(
+    response = transport.get(
         f"{base_url()}/assets/capital-gain",
         params=params,
         headers=headers,
     )
 
     if not response.ok:
-        raise APIError(response.json())
+        raise APIError.from_response(response)
 
     capital_gain = response.json()
     return CapitalGain(**capital_gain)
@@ -26,6 +26,7 @@ class UserSession(BaseModel):
 
 
 def retrieve_auth() -> Optional[UserSession]:
+    auth = None
     if auth_file.exists():
         with open(auth_file) as f:
             auth = UserSession(**json.load(f))
@@ -57,3 +58,16 @@ def get_email() -> Optional[str]:
         return auth.email
 
     return None
+
+
+def get_account(auth_token: Optional[str]) -> str:
+    """
+    Identity of the account of `auth_token`, to key local state by: the user
+    id of the saved session if the token is its own, else the token itself.
+    """
+    auth = retrieve_auth()
+
+    if auth and auth.token == auth_token:
+        return auth.id
+
+    return auth_token or ""
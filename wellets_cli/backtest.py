@@ -0,0 +1,149 @@
+"""
+Dollar-cost-averaging backtest of accumulation plans.
+
+A plan invests `quote` US dollars (the unit of `Accumulation.quote`) every
+`every` from a start date, for at most `entries` times, and is valued in the
+base currency. All plans of a grid are replayed together: their entries are
+concatenated, priced with a single lookup on the cached klines and reduced
+per plan with `bincount`.
+"""
+
+from datetime import datetime
+from typing import List, NamedTuple
+
+import numpy as np
+
+from wellets_cli.history import currency_price_history, time_index, to_utc
+from wellets_cli.interval import kline_interval
+from wellets_cli.model import Currency
+from wellets_cli.util import pp
+
+
+class Plan(NamedTuple):
+    every: str  # interval string, e.g. '1w'
+    quote: float  # amount invested at each entry, in US dollars
+    entries: int  # maximum number of entries
+
+
+class Backtest(NamedTuple):
+    plans: List[Plan]
+    entries: np.ndarray  # (n_plans,) entries actually made
+    invested: np.ndarray  # (n_plans,) in the base currency
+    units: np.ndarray  # (n_plans,) accumulated asset units
+    average_price: np.ndarray  # (n_plans,) average load price
+    value: np.ndarray  # (n_plans,) value at the end, in the base currency
+    returns: np.ndarray  # (n_plans,)
+    end_price: float
+
+
+def plan_schedule(plan: Plan, start: datetime, end: datetime) -> np.ndarray:
+    """
+    Return the entry times of `plan` between `start` and `end`.
+    """
+    if to_utc(end) < to_utc(start):
+        return np.array([], dtype="datetime64[s]")
+
+    return time_index(start, end, plan.every)[: plan.entries]
+
+
+def dca(
+    plan_pos: np.ndarray,
+    quote: np.ndarray,
+    entry_price: np.ndarray,
+    end_price: float,
+    n_plans: int,
+):
+    """
+    Reduce the entries of many plans at once.
+
+    `plan_pos` is the plan of each entry, `quote` the amount invested and
+    `entry_price` the asset price (both in the base currency) of each entry.
+    Returns entries, invested amount, units, average load price, end value
+    and return of each plan.
+    """
+    entries = np.bincount(plan_pos, minlength=n_plans)
+    invested = np.bincount(plan_pos, weights=quote, minlength=n_plans)
+    units = np.bincount(plan_pos, weights=quote / entry_price, minlength=n_plans)
+    value = units * end_price
+
+    with np.errstate(all="ignore"):
+        average_price = invested / units
+        returns = value / invested - 1
+
+    return entries, invested, units, average_price, value, returns
+
+
+def backtest(
+    plans: List[Plan],
+    start: datetime,
+    end: datetime,
+    currency: Currency,
+    base_currency: Currency,
+    headers: dict,
+) -> Backtest:
+    """
+    Replay `plans` buying `currency` with the base currency from `start`,
+    valuing the accumulated units at `end`.
+    """
+    schedules = [plan_schedule(p, start, end) for p in plans]
+
+    plan_pos = np.repeat(np.arange(len(plans)), [len(s) for s in schedules])
+    timestamp = np.concatenate(schedules + [np.array([], dtype="datetime64[s]")])
+    quote = np.array([p.quote for p in plans], dtype=float)[plan_pos]
+
+    # price every distinct entry time and the end with one lookup
+    end64 = np.datetime64(to_utc(end), "s")
+    points = np.unique(np.concatenate([timestamp, [end64]]))
+
+    intraday = any(kline_interval(p.every) == "1h" for p in plans)
+    interval = "1h" if intraday else "1d"
+
+    price = currency_price_history(currency, points, headers, interval)
+    base_price = currency_price_history(base_currency, points, headers, interval)
+    price = price / base_price
+
+    entry_pos = np.searchsorted(points, timestamp)
+    entry_price = price[entry_pos]
+    end_price = float(price[-1])
+
+    # dollars into the base currency at the time of each entry
+    quote = quote / base_price[entry_pos]
+
+    entries, invested, units, average_price, value, returns = dca(
+        plan_pos, quote, entry_price, end_price, len(plans)
+    )
+
+    return Backtest(
+        plans=plans,
+        entries=entries,
+        invested=invested,
+        units=units,
+        average_price=average_price,
+        value=value,
+        returns=returns,
+        end_price=end_price,
+    )
+
+
+def backtest_rows(result: Backtest, currency: Currency, base: Currency) -> List[dict]:
+    def pp_nan(x: float, **kwargs) -> str:
+        return "-" if np.isnan(x) else pp(x, **kwargs)
+
+    rows = []
+    for i, plan in enumerate(result.plans):
+        units = pp(result.units[i], decimals=8, fixed=False)
+        rows.append(
+            {
+                "every": plan.every,
+                "quote": f"USD {pp(plan.quote)}",
+                "entries": f"{result.entries[i]}/{plan.entries}",
+                "invested": f"{base.acronym} {pp(result.invested[i])}",
+                "units": f"{currency.acronym} {units}",
+                "average_load_price": (
+                    f"{base.acronym} {pp_nan(result.average_price[i])}"
+                ),
+                "value": f"{base.acronym} {pp(result.value[i])}",
+                "return": pp_nan(result.returns[i], percent=True, with_symbol=True),
+            }
+        )
+    return rows
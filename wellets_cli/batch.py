@@ -0,0 +1,178 @@
+"""
+Batch scripts of cli commands.
+
+A script has one command per line, written as on the command line without
+the program name. Blank lines and `#` comments are ignored. Consecutive
+lines ending with `&` form a parallel group: they run concurrently, their
+output is printed in script order, and the group finishes before the next
+line starts. Only independent read commands should be marked parallel.
+"""
+
+import io
+import shlex
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, NamedTuple
+
+NESTED_COMMANDS = ("batch", "shell")
+
+
+class Command(NamedTuple):
+    line: int
+    args: List[str]
+
+
+class Result(NamedTuple):
+    command: Command
+    code: int
+    stdout: str
+    stderr: str
+
+
+def parse(lines: Iterable[str]) -> List[List[Command]]:
+    """
+    Split a script into groups of commands, run in order. Groups of more than
+    one command run concurrently. Raises `ValueError` on a malformed line.
+    """
+    groups: List[List[Command]] = []
+    parallel: List[Command] = []
+
+    for n, line in enumerate(lines, start=1):
+        line = line.strip()
+
+        if not line or line.startswith("#"):
+            continue
+
+        background = line.endswith("&")
+        if background:
+            line = line[:-1]
+
+        try:
+            args = shlex.split(line, comments=True)
+        except ValueError as e:
+            raise ValueError(f"line {n}: {e}")
+
+        if not args:
+            continue
+        if args[0] in NESTED_COMMANDS:
+            raise ValueError(f"line {n}: `{args[0]}` cannot run in a batch")
+
+        if background:
+            parallel.append(Command(n, args))
+            continue
+
+        if parallel:
+            groups.append(parallel)
+            parallel = []
+        groups.append([Command(n, args)])
+
+    if parallel:
+        groups.append(parallel)
+
+    return groups
+
+
+class _ThreadLocalStream(io.TextIOBase):
+    """
+    Write to a per-thread buffer when one is set, to `stream` otherwise.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, s):
+        return getattr(self.local, "buffer", self.stream).write(s)
+
+    def flush(self):
+        getattr(self.local, "buffer", self.stream).flush()
+
+    def isatty(self):
+        return False
+
+
+def run_command(command: Command, invoke: Callable[[List[str]], int]) -> Result:
+    try:
+        code = invoke(command.args)
+    except EOFError:
+        sys.stderr.write("Error: command needs input, pass all its options\n")
+        code = 1
+
+    return Result(command, code, "", "")
+
+
+def _run_captured(
+    command: Command,
+    invoke: Callable[[List[str]], int],
+    stdout: _ThreadLocalStream,
+    stderr: _ThreadLocalStream,
+) -> Result:
+    stdout.local.buffer, stderr.local.buffer = io.StringIO(), io.StringIO()
+    try:
+        result = run_command(command, invoke)
+        return result._replace(
+            stdout=stdout.local.buffer.getvalue(),
+            stderr=stderr.local.buffer.getvalue(),
+        )
+    finally:
+        del stdout.local.buffer, stderr.local.buffer
+
+
+def run_group(
+    group: List[Command], invoke: Callable[[List[str]], int], workers: int
+) -> List[Result]:
+    """
+    Run a group of commands, concurrently (with captured output) if there is
+    more than one.
+    """
+    if len(group) == 1:
+        return [run_command(group[0], invoke)]
+
+    stdout, stderr = sys.stdout, sys.stderr
+    local_stdout, local_stderr = _ThreadLocalStream(stdout), _ThreadLocalStream(stderr)
+    sys.stdout, sys.stderr = local_stdout, local_stderr
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    lambda c: _run_captured(c, invoke, local_stdout, local_stderr),
+                    group,
+                )
+            )
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+    for result in results:
+        sys.stdout.write(result.stdout)
+        sys.stderr.write(result.stderr)
+
+    return results
+
+
+def run(
+    groups: List[List[Command]],
+    invoke: Callable[[List[str]], int],
+    workers: int = 8,
+    keep_going: bool = False,
+    echo: bool = False,
+) -> List[Result]:
+    """
+    Run the groups of a parsed script in order. Stops after the first group
+    with a failing command unless `keep_going`.
+    """
+    results: List[Result] = []
+
+    for group in groups:
+        if echo:
+            for command in group:
+                sys.stderr.write(f"+ {shlex.join(command.args)}\n")
+
+        group_results = run_group(group, invoke, workers)
+        results.extend(group_results)
+
+        if not keep_going and any(r.code for r in group_results):
+            break
+
+    return results
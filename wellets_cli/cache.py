@@ -0,0 +1,124 @@
+"""
+On-disk cache for currency klines.
+
+Closed candles never change, so they are stored per currency and interval
+together with the date range they cover. Only the missing head/tail of a
+requested range is fetched from the server. Today's candles are still open:
+the covered range ends yesterday, so they are fetched again on each request.
+"""
+
+import json
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import wellets_cli.api as api
+from wellets_cli.config import settings
+from wellets_cli.model import KLines
+
+DATE_FMT = "%Y-%m-%d"
+
+
+def _to_date(x: Union[str, date, datetime]) -> date:
+    if isinstance(x, datetime):
+        return x.date()
+    if isinstance(x, date):
+        return x
+    return datetime.strptime(x, DATE_FMT).date()
+
+
+def _klines_path(currency_id: str, interval: str) -> Path:
+    return settings.cache_dir / "klines" / f"{currency_id}-{interval}.json"
+
+
+def _load(path: Path) -> Optional[Tuple[date, date, dict]]:
+    if not path.exists():
+        return None
+
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return (
+            _to_date(data["start"]),
+            _to_date(data["end"]),
+            {k["open_time"]: k for k in data["klines"]},
+        )
+    except (ValueError, KeyError):
+        return None  # corrupted cache, refetch
+
+
+def _persist(path: Path, start: date, end: date, klines: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    data = {
+        "start": start.strftime(DATE_FMT),
+        "end": end.strftime(DATE_FMT),
+        "klines": [klines[k] for k in sorted(klines)],
+    }
+
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    tmp.replace(path)
+
+
+def get_currency_history(params: dict, headers: dict) -> List[KLines]:
+    """
+    Cached counterpart of `api.get_currency_history`.
+    """
+    return [KLines(**k) for k in get_currency_history_json(params, headers)]
+
+
+def get_currency_history_json(params: dict, headers: dict) -> List[dict]:
+    """
+    Cached klines of the requested range as JSON dicts, sorted by open time.
+    """
+    currency_id = params["currency_id"]
+    interval = params.get("interval", "1d")
+    start = _to_date(params["start_time"])
+    end = _to_date(params["end_time"])
+
+    path = _klines_path(currency_id, interval)
+    cached = _load(path)
+    klines: dict
+
+    if cached is None:
+        missing = [(start, end)]
+        # an empty range, ending the day before it starts
+        cached_start, cached_end, klines = start, start - timedelta(days=1), {}
+    else:
+        cached_start, cached_end, klines = cached
+        missing = []
+        if start < cached_start:
+            missing.append((start, cached_start))
+        if end > cached_end:
+            missing.append((cached_end, end))
+
+    for missing_start, missing_end in missing:
+        fetched = api.get_currency_history(
+            {
+                "currency_id": currency_id,
+                "interval": interval,
+                "start_time": missing_start.strftime(DATE_FMT),
+                "end_time": missing_end.strftime(DATE_FMT),
+            },
+            headers=headers,
+        )
+        for k in fetched:
+            kline = k.model_dump(mode="json")
+            klines[kline["open_time"]] = kline
+
+    if missing:
+        # today's candles are still open: never mark them as covered
+        yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+        _persist(
+            path,
+            min(start, cached_start),
+            max(cached_end, min(end, yesterday)),
+            klines,
+        )
+
+    # open times are ISO strings, so the date is their prefix
+    lo, hi = start.strftime(DATE_FMT), end.strftime(DATE_FMT)
+
+    return [k for t, k in sorted(klines.items()) if lo <= t[:10] <= hi]
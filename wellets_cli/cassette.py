@@ -0,0 +1,190 @@
+"""
+Recording and replay of API traffic.
+
+With WELLETS_RECORD=path every response received is appended to a cassette,
+a JSON Lines file with one request/response pair per line. With
+WELLETS_REPLAY=path requests are answered from the cassette instead of the
+network, so that commands run offline and deterministically on the recorded
+data. Set WELLETS_REPLAY_LATENCY to also wait as long as each original
+request took.
+
+Requests are matched on method, path, query and JSON body, not on the API
+host or the auth token, so a cassette recorded against production replays
+under any WELLETS_API_URL. Identical requests are answered in the order they
+were recorded; once exhausted, the last response repeats. Replayed writes
+neither read nor update the idempotency journal.
+
+Credentials stay out of cassettes: only a few response headers are kept, and
+secret fields (the session token, passwords) are redacted from the recorded
+bodies and from the request bodies before they are digested.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from wellets_cli.config import settings
+
+# response headers worth keeping, the others are left out of the cassette
+HEADERS = ("Content-Type", "Retry-After")
+
+# JSON fields holding credentials, redacted when recording
+SECRETS = ("token", "access_token", "refresh_token", "password")
+REDACTED = "REDACTED"
+
+Key = Tuple[str, str, Optional[str]]
+
+
+class CassetteMiss(requests.RequestException):
+    """
+    The cassette holds no response for the request.
+    """
+
+
+def redact(value: Any) -> Any:
+    """
+    Return `value` with the `SECRETS` fields of its JSON objects redacted.
+    """
+    if isinstance(value, dict):
+        return {k: REDACTED if k in SECRETS else redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+def request_key(method: str, url: str, kwargs: dict) -> Key:
+    """
+    Method, path with the sorted query, and a digest of the JSON body.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query) + [
+        (k, str(v)) for k, v in (kwargs.get("params") or {}).items() if v is not None
+    ]
+    path = parts.path + (f"?{urlencode(sorted(query))}" if query else "")
+
+    body = kwargs.get("json")
+    digest = None
+    if body is not None:
+        payload = json.dumps(redact(body), sort_keys=True, default=str).encode()
+        digest = hashlib.sha1(payload).hexdigest()[:12]
+
+    return method, path, digest
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Recorder:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, key: Key, response: requests.Response, elapsed: float) -> None:
+        method, path, body = key
+        entry = {
+            "method": method,
+            "path": path,
+            "body": body,
+            "status": response.status_code,
+            "headers": {
+                h: response.headers[h] for h in HEADERS if h in response.headers
+            },
+            "content": self.content(response),
+            "elapsed": round(elapsed, 4),
+        }
+
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with _open(self.path, "a") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    @staticmethod
+    def content(response: requests.Response) -> str:
+        content = response.content.decode("utf-8", "replace")
+        try:
+            body = json.loads(content)
+        except ValueError:
+            return content
+        return json.dumps(redact(body), separators=(",", ":"))
+
+
+class Player:
+    def __init__(self, path: Path, latency: bool = False):
+        self.path = path
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._entries: Dict[Key, Deque[dict]] = defaultdict(deque)
+
+        with _open(path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn write of an interrupted recording
+                key = (entry["method"], entry["path"], entry["body"])
+                self._entries[key].append(entry)
+
+    def replay(self, key: Key, url: str) -> requests.Response:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                method, path, _ = key
+                raise CassetteMiss(f"No recorded response for {method} {path}")
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+
+        if self.latency:
+            time.sleep(entry["elapsed"])
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["content"].encode()
+        response.encoding = "utf-8"
+        response.url = url
+        return response
+
+
+_lock = threading.Lock()
+_recorders: Dict[Path, Recorder] = {}
+_players: Dict[Tuple[Path, bool], Player] = {}
+
+
+def recorder() -> Optional[Recorder]:
+    """
+    The recorder of WELLETS_RECORD, if set.
+    """
+    path = settings.record_path
+    if path is None:
+        return None
+
+    with _lock:
+        if path not in _recorders:
+            _recorders[path] = Recorder(path)
+        return _recorders[path]
+
+
+def player() -> Optional[Player]:
+    """
+    The player of WELLETS_REPLAY, if set. The cassette is read once.
+    """
+    path = settings.replay_path
+    if path is None:
+        return None
+
+    key = (path, settings.replay_latency)
+    with _lock:
+        if key not in _players:
+            _players[key] = Player(*key)
+        return _players[key]
@@ -49,6 +49,36 @@ def plot_balance(fig, history, label=None):
     return fig
 
 
+def plot_curves(fig, timestamp, curves, labels, ylabel="Balance"):
+    ax = fig.add_subplot(1, 1, 1)
+    fig.autofmt_xdate()
+
+    for ys, label in zip(curves, labels):
+        ax.plot(timestamp, ys, label=label)
+
+    ax.legend()
+    ax.set_xlabel("Date")
+    ax.set_ylabel(ylabel)
+
+    return fig
+
+
+def plot_heatmap(fig, matrix, labels, vmin=-1, vmax=1):
+    ax = fig.add_subplot(1, 1, 1)
+
+    image = ax.imshow(matrix, cmap="coolwarm", vmin=vmin, vmax=vmax)
+    fig.colorbar(image, ax=ax)
+
+    ax.set_xticks(np.arange(len(labels)), labels=labels, rotation=45, ha="right")
+    ax.set_yticks(np.arange(len(labels)), labels=labels)
+
+    for i in range(len(labels)):
+        for j in range(len(labels)):
+            ax.text(j, i, f"{matrix[i][j]:.2f}", ha="center", va="center")
+
+    return fig
+
+
 def plot_allocation(fig, allocation):
     labels = np.array([x.asset.currency.acronym for x in allocation])
     values = np.array([x.allocation for x in allocation])
@@ -1,20 +1,28 @@
 import pathlib
+from typing import List
 
 import click
+import requests
 
+import wellets_cli.trace as wellets_trace
 from wellets_cli.api import APIError
 from wellets_cli.commands.accumulation import accumulation
 from wellets_cli.commands.asset import asset
+from wellets_cli.commands.batch import batch
 from wellets_cli.commands.currency import currency
+from wellets_cli.commands.daemon import daemon
 from wellets_cli.commands.dashboard import dashboard
+from wellets_cli.commands.export import export
 from wellets_cli.commands.investment import investment
 from wellets_cli.commands.login import login
 from wellets_cli.commands.portfolio import portfolio
 from wellets_cli.commands.register import register
+from wellets_cli.commands.shell import shell
 from wellets_cli.commands.transaction import transaction
 from wellets_cli.commands.transfer import transfer
 from wellets_cli.commands.wallet import wallet
 from wellets_cli.commands.whoami import whoami
+from wellets_cli.profiling import MODES, Profiler
 
 try:
     VERSION_PATH = pathlib.Path(__file__).parent / "VERSION"
@@ -25,11 +33,55 @@ except:
 
 @click.group()
 @click.version_option(VERSION)
-def cli():
-    pass
+@click.option(
+    "--trace", is_flag=True, default=False, help="Report the timing of API calls."
+)
+@click.option(
+    "--trace-file",
+    type=click.Path(dir_okay=False),
+    help="Also write the trace as Chrome trace-event JSON.",
+)
+@click.option(
+    "--profile",
+    type=click.Choice(MODES),
+    help="Profile the command's CPU time or memory.",
+)
+@click.option("--profile-limit", type=int, default=25, help="Entries in the report.")
+@click.option(
+    "--profile-output",
+    type=click.Path(dir_okay=False),
+    help="Also save the profile (.prof stats or tracemalloc snapshot).",
+)
+@click.pass_context
+def cli(ctx, trace, trace_file, profile, profile_limit, profile_output):
+    if trace or trace_file:
+        wellets_trace.enable()
+        ctx.call_on_close(lambda: report_trace(trace_file))
 
+    if profile:
+        profiler = Profiler(profile, profile_limit, profile_output)
+        profiler.start()
+        ctx.call_on_close(lambda: report_profile(profiler))
 
-def main():  # pragma: no cover
+
+def report_trace(trace_file) -> None:
+    tracer = wellets_trace.disable()
+    if tracer is None:
+        return
+
+    click.echo(wellets_trace.waterfall(tracer), err=True)
+    if trace_file:
+        wellets_trace.write_chrome_trace(tracer, trace_file)
+        click.echo(f"Trace written to {trace_file}", err=True)
+
+
+def report_profile(profiler: Profiler) -> None:
+    click.echo(profiler.stop(), err=True)
+    if profiler.output:
+        click.echo(f"Profile written to {profiler.output}", err=True)
+
+
+def setup():
     # user
     cli.add_command(login)
     cli.add_command(register)
@@ -49,13 +101,49 @@ def main():  # pragma: no cover
 
     cli.add_command(dashboard)
 
+    cli.add_command(export)
+
+    cli.add_command(daemon)
+    cli.add_command(shell)
+    cli.add_command(batch)
+
     # deprecated
     cli.add_command(accumulation)  # DEPRECATED
     cli.add_command(investment)  # DEPRECATED
 
+
+def invoke(args: List[str]) -> int:
+    """
+    Run the cli on `args` in this process and return its exit code. A prompt
+    reaching the end of stdin raises `EOFError` rather than aborting.
+    """
+    try:
+        rv = cli.main(args=args, prog_name="wellets_cli", standalone_mode=False)
+        return rv if isinstance(rv, int) else 0
+    except click.ClickException as e:
+        e.show()
+        return e.exit_code
+    except click.Abort as e:
+        # click.prompt raises Abort from None, leaving EOFError as the context
+        eof = e.__cause__ or e.__context__
+        if isinstance(eof, EOFError):
+            raise eof
+        click.echo("Aborted!", err=True)
+        return 1
+    except (APIError, requests.RequestException) as e:
+        error = click.style("ERROR", fg="red")
+        click.echo(f"{error}: {e}")
+        return 1
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+
+
+def main():  # pragma: no cover
+    setup()
+
     try:
         cli()
-    except APIError as e:
+    except (APIError, requests.RequestException) as e:
         error = click.style("ERROR", fg="red")
         click.echo(f"{error}: {e}")
         exit(1)
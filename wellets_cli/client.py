@@ -0,0 +1,172 @@
+"""
+Thin client of the wellets_cli daemon.
+
+Forwards an invocation (argv, working directory, WELLETS_* environment and
+piped stdin) to the daemon over its Unix socket and replays its output. Only
+the standard library is imported, so a forwarded call skips the startup cost
+of the full cli.
+
+The daemon runs one invocation at a time and acknowledges each one before
+running it. An invocation it does not pick up within `ACCEPT_TIMEOUT` (busy
+or stuck) runs in-process instead; its deadline travels with it, so that the
+daemon declines it if it gets to it later.
+
+Commands that show charts, run for long or prompt also run in-process. If one
+of them writes, the daemon is told to drop its cached responses at exit, so
+that the next forwarded command does not show stale data.
+"""
+
+import atexit
+import io
+import json
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from wellets_cli.config import settings
+
+# commands always run in the calling process: interactive ones, those showing
+# charts (the daemon has no display) and long-running ones (which would hold
+# the daemon and buffer their output until the end)
+LOCAL_COMMANDS = [
+    ("daemon",),
+    ("shell",),
+    ("asset", "allocation"),
+    ("asset", "correlation"),
+    ("asset", "history"),
+    ("asset", "visualize"),
+    ("portfolio", "history"),
+    ("wallet", "history"),
+    ("accumulation", "run"),
+    ("transaction", "import"),
+    ("batch",),
+    ("export",),
+]
+
+# seconds for the daemon to pick up an invocation
+ACCEPT_TIMEOUT = 2.0
+
+
+def socket_path() -> Path:
+    return settings.state_dir / "daemon.sock"
+
+
+def send(message: dict, timeout: Optional[float] = None) -> dict:
+    """
+    Send `message` to the daemon and return its reply. Raises `OSError` when
+    the daemon is not running.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(socket_path()))
+        sock.sendall(json.dumps(message).encode())
+        sock.shutdown(socket.SHUT_WR)
+
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+
+    return json.loads(b"".join(chunks))
+
+
+def run(message: dict) -> dict:
+    """
+    Send an invocation to the daemon and return its reply once it has run.
+    Raises `OSError` (`TimeoutError` included) when the daemon is not running
+    or does not accept the invocation in time.
+    """
+    message = {**message, "deadline": time.time() + ACCEPT_TIMEOUT}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        # a little longer than the deadline, for the acknowledgement to arrive
+        sock.settimeout(ACCEPT_TIMEOUT + 1)
+        sock.connect(str(socket_path()))
+        sock.sendall(json.dumps(message).encode())
+        sock.shutdown(socket.SHUT_WR)
+
+        with sock.makefile("rb") as f:
+            reply = json.loads(f.readline())
+            if not reply.get("accepted"):
+                return reply  # declined
+
+            # the command runs for as long as it takes
+            sock.settimeout(None)
+            return json.loads(f.read())
+
+
+def is_local(argv: List[str]) -> bool:
+    """
+    Whether `argv` runs a command of `LOCAL_COMMANDS` (whatever the options
+    before it).
+    """
+    words = [a for a in argv if not a.startswith("-")]
+    return any(
+        tuple(words[i : i + len(command)]) == command
+        for command in LOCAL_COMMANDS
+        for i in range(len(words))
+    )
+
+
+def clear_daemon_cache() -> None:
+    """
+    Have the daemon drop its cached responses if this process wrote.
+    """
+    transport = sys.modules.get("wellets_cli.transport")
+    if transport is None or not transport.wrote():
+        return
+
+    try:
+        send({"command": "clear-cache"}, timeout=ACCEPT_TIMEOUT)
+    except (OSError, ValueError):
+        pass  # stopped meanwhile, nothing is cached
+
+
+def forward(argv: List[str]) -> Optional[int]:
+    """
+    Run `argv` on the daemon and return its exit code, or None when the
+    invocation should run in-process (no daemon, or it needs a terminal).
+    """
+    if os.environ.get("WELLETS_NO_DAEMON"):
+        return None
+
+    # recorded and replayed runs skip the daemon's cache of responses
+    if settings.record_path or settings.replay_path:
+        return None
+
+    if not socket_path().exists():
+        return None
+
+    if is_local(argv):
+        atexit.unregister(clear_daemon_cache)
+        atexit.register(clear_daemon_cache)
+        return None
+
+    stdin = "" if sys.stdin is None or sys.stdin.isatty() else sys.stdin.read()
+
+    try:
+        reply = run(
+            {
+                "argv": argv,
+                "cwd": os.getcwd(),
+                "env": {
+                    k: v for k, v in os.environ.items() if k.startswith("WELLETS_")
+                },
+                "stdin": stdin,
+            }
+        )
+    except (OSError, ValueError):
+        reply = {"fallback": True}
+
+    if reply.get("fallback"):
+        sys.stdin = io.StringIO(stdin) if stdin else sys.stdin
+        atexit.unregister(clear_daemon_cache)
+        atexit.register(clear_daemon_cache)
+        return None
+
+    sys.stdout.write(reply["stdout"])
+    sys.stderr.write(reply["stderr"])
+
+    return reply["code"]
@@ -1,26 +1,33 @@
 from datetime import datetime
-from typing import Optional
+from itertools import product
+from typing import Dict, Optional
 
 import click
 from InquirerPy import inquirer
 from tabulate import tabulate
 
 import wellets_cli.api as api
-from wellets_cli.auth import get_auth_token
+from wellets_cli.auth import get_account, get_auth_token
+from wellets_cli.backtest import Plan, backtest, backtest_rows
 from wellets_cli.commands.transaction import create_transaction
-from wellets_cli.model import Accumulation, AccumulationEntry
+from wellets_cli.config import settings
+from wellets_cli.idempotency import idempotency_key
+from wellets_cli.model import Accumulation, AccumulationEntry, NextAccumulationEntry
 from wellets_cli.question import (
     accumulation_question,
     asset_question,
     date_question,
     duration_question,
 )
+from wellets_cli.schedule import next_entry, status_row
+from wellets_cli.scheduler import Scheduler, SchedulerState
 from wellets_cli.util import format_duration, get_by_id, make_headers, pp
 from wellets_cli.validator import (
     AndValidator,
     EmptyInputValidator,
     GreaterThanValidator,
     NumberValidator,
+    validate_interval,
 )
 
 
@@ -94,8 +101,13 @@ def show_accumulation(accumulation_id, auth_token):
 
 @accumulation.command(name="next-entry")
 @click.option("--accumulation-id")
+@click.option(
+    "--remote",
+    is_flag=True,
+    help="Ask the server instead of computing the schedule locally.",
+)
 @click.option("--auth-token")
-def show_next_entry(accumulation_id, auth_token):
+def show_next_entry(accumulation_id, remote, auth_token):
     auth_token = auth_token or get_auth_token()
     headers = make_headers(auth_token)
 
@@ -104,10 +116,16 @@ def show_next_entry(accumulation_id, auth_token):
     if not accumulation:
         return
 
-    next_accumulation_entry = api.get_next_accumulation_entry(
-        accumulation.id, headers=headers
+    next_accumulation_entry = (
+        api.get_next_accumulation_entry(accumulation.id, headers=headers)
+        if remote
+        else next_entry(accumulation, __dollar_rates(headers)[accumulation.asset_id])
     )
 
+    if next_accumulation_entry is None:
+        click.echo("The accumulation is complete")
+        return
+
     print(
         tabulate(
             [
@@ -124,6 +142,29 @@ def show_next_entry(accumulation_id, auth_token):
     )
 
 
+@accumulation.command(name="status")
+@click.option("--accumulation-id")
+@click.option("--all", "show_all", is_flag=True, help="Show every accumulation.")
+@click.option("--auth-token")
+def show_status(accumulation_id, show_all, auth_token):
+    """
+    Show the progress of accumulations against their schedule.
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    if show_all:
+        accumulations = api.get_accumulations(params={}, headers=headers)
+    else:
+        accumulation = __prompt_accumulation(accumulation_id, headers)
+        accumulations = [accumulation] if accumulation else []
+
+    dollar_rates = __dollar_rates(headers)
+    data = [status_row(a, dollar_rates[a.asset_id]) for a in accumulations]
+
+    print(tabulate(data, headers="keys"))
+
+
 @accumulation.command(name="create")
 @click.option("--asset-id")
 @click.option("--alias")
@@ -243,6 +284,7 @@ def delete_accumulation(accumulation_id, auth_token):
 
 
 @accumulation.command(name="create-entry")
+@click.option("--wallet-id", type=click.UUID)
 @click.option("--value", type=float)
 @click.option("--dollar-rate", type=float)
 @click.option("--change-currency-id", type=click.UUID)
@@ -251,6 +293,7 @@ def delete_accumulation(accumulation_id, auth_token):
 @click.option("--accumulation-id", type=click.UUID)
 @click.option("--created-at", type=click.DateTime(formats=["%Y-%m-%d %H:%M"]))
 @click.option("-y", "--yes", is_flag=True, type=bool)
+@click.option("--idempotency-key", hidden=True)
 @click.option("--auth-token")
 @click.pass_context
 def create_entry(ctx, **kwargs):
@@ -266,13 +309,13 @@ def create_entry(ctx, **kwargs):
     if not accumulation:
         return
 
-    next_entry = api.get_next_accumulation_entry(accumulation.id, headers=headers)
+    entry_number = len(accumulation.entries) + 1
 
     description = (
         description
         or inquirer.text(
             message="Description",
-            default=f"{accumulation.alias} entry #{next_entry.entry}",
+            default=f"{accumulation.alias} entry #{entry_number}",
             validate=EmptyInputValidator(),
         ).execute()
     )
@@ -286,6 +329,190 @@ def create_entry(ctx, **kwargs):
     ctx.invoke(create_transaction, **params)
 
 
+@accumulation.command(name="backtest")
+@click.option("--accumulation-id")
+@click.option(
+    "--every",
+    multiple=True,
+    callback=validate_interval,
+    help="Alternative entry interval, e.g. 1w (repeatable).",
+)
+@click.option(
+    "--quote",
+    type=float,
+    multiple=True,
+    help="Alternative amount per entry in US dollars (repeatable).",
+)
+@click.option(
+    "--entries",
+    type=click.IntRange(1),
+    multiple=True,
+    help="Alternative number of entries (repeatable).",
+)
+@click.option("--start-date", type=click.DateTime(), help="Default: planned start.")
+@click.option("--end-date", type=click.DateTime(), help="Default: now.")
+@click.option("--auth-token")
+def backtest_accumulation(
+    accumulation_id, every, quote, entries, start_date, end_date, auth_token
+):
+    """
+    Replay an accumulation plan on the asset price history.
+
+    Each entry invests the plan quote, in US dollars, at the asset price of
+    its date; results are shown in the preferred currency. Passing
+    --every, --quote or --entries (repeatable) replays the grid of all their
+    combinations instead, falling back to the plan values for the others.
+    Accumulated units are valued at --end-date.
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    assets = api.get_assets(headers=headers)
+    base_currency = api.get_preferred_currency(headers=headers)
+
+    accumulation = __prompt_accumulation(accumulation_id, headers)
+
+    if not accumulation:
+        return
+
+    asset = get_by_id(assets, accumulation.asset_id)
+
+    plans = [
+        Plan(e, q, n)
+        for e, q, n in product(
+            every or [format_duration(accumulation.every)],
+            quote or [accumulation.quote],
+            entries or [accumulation.planned_entries],
+        )
+    ]
+
+    start_date = start_date or accumulation.planned_start
+    end_date = end_date or datetime.now()
+
+    result = backtest(
+        plans,
+        start_date,
+        end_date,
+        asset.currency,
+        base_currency,
+        headers,
+    )
+
+    click.echo(
+        f"{asset.currency.acronym} price at end = "
+        f"{base_currency.acronym} {pp(result.end_price)}"
+    )
+    click.echo()
+
+    data = backtest_rows(result, asset.currency, base_currency)
+
+    print(tabulate(data, headers="keys"))
+
+
+@accumulation.command(name="run")
+@click.option(
+    "--wallet-id",
+    type=click.UUID,
+    help="Wallet of accumulations without entries (default: last entry wallet).",
+)
+@click.option(
+    "--poll",
+    type=click.FloatRange(1),
+    default=3600,
+    help="Seconds between checks for new or changed accumulations.",
+)
+@click.option("--once", is_flag=True, help="Post the entries due and exit.")
+@click.option("--auth-token")
+@click.pass_context
+def run_accumulations(ctx, wallet_id, poll, once, auth_token):
+    """
+    Post accumulation entries as they become due.
+
+    Entries are recorded as transactions through create-entry, at the current
+    dollar rate of the wallet currency, once the server agrees on their amount.
+    State is kept in the state directory (per API and account), so the
+    scheduler can be restarted (or run with --once from cron) without
+    double-posting or missing entries.
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    def entry_wallet_id(accumulation: Accumulation) -> Optional[str]:
+        if accumulation.entries:
+            return accumulation.entries[-1].wallet_id
+        return wallet_id and str(wallet_id)
+
+    skipped = set()
+    dollar_rates: Dict[str, float] = {}
+
+    def fetch():
+        accumulations = api.get_accumulations(params={}, headers=headers)
+        # entries are converted at the current rate, as the server does
+        dollar_rates.update(__dollar_rates(headers))
+        for a in accumulations:
+            if entry_wallet_id(a) is None and a.id not in skipped:
+                skipped.add(a.id)
+                click.echo(f"Skipping {a.alias}: no entries, pass --wallet-id")
+        return [a for a in accumulations if entry_wallet_id(a) is not None]
+
+    def post(accumulation: Accumulation, entry: NextAccumulationEntry):
+        wallets = api.get_wallets(headers=headers)
+        currencies = api.get_currencies(headers=headers)
+
+        wallet_id = entry_wallet_id(accumulation)
+        wallet = next(w for w in wallets if w.id == wallet_id)
+        currency = next(c for c in currencies if c.id == wallet.currency_id)
+
+        click.echo(
+            f"{datetime.now().strftime('%Y-%m-%d %H:%M')} {accumulation.alias} "
+            f"entry #{entry.entry}: "
+            f"{currency.acronym} {pp(entry.amount, decimals=8, fixed=False)}"
+        )
+
+        ctx.invoke(
+            create_entry,
+            wallet_id=wallet.id,
+            value=entry.amount,
+            dollar_rate=currency.dollar_rate,
+            change_currency_id=None,
+            change_val=None,
+            description=f"{accumulation.alias} entry #{entry.entry}",
+            accumulation_id=accumulation.id,
+            created_at=datetime.now(),
+            yes=True,
+            idempotency_key=idempotency_key(
+                "accumulation-entry", accumulation.id, entry.entry
+            ),
+            auth_token=auth_token,
+        )
+
+    state_dir = settings.account_state_dir(get_account(auth_token))
+    state = SchedulerState(state_dir / "scheduler.json")
+    scheduler = Scheduler(
+        fetch,
+        post,
+        state,
+        lambda accumulation: dollar_rates[accumulation.asset_id],
+        lambda accumulation: api.get_next_accumulation_entry(
+            accumulation.id, headers=headers
+        ),
+        poll=poll,
+        log=click.echo,
+    )
+
+    try:
+        scheduler.run(once=once)
+    except KeyboardInterrupt:
+        pass
+
+
+def __dollar_rates(headers) -> Dict[str, float]:
+    """
+    Dollar rate of the currency of each asset, by asset id.
+    """
+    return {a.id: a.currency.dollar_rate for a in api.get_assets(headers=headers)}
+
+
 def __prompt_accumulation(accumulation_id: str, headers) -> Optional[Accumulation]:
     accumulations = api.get_accumulations(params={}, headers=headers)
 
@@ -296,6 +523,6 @@ def __prompt_accumulation(accumulation_id: str, headers) -> Optional[Accumulatio
         accumulation_id or accumulation_question(accumulations=accumulations).execute()
     )
 
-    accumulation = get_by_id(accumulations, accumulation_id)  # type: ignore
+    accumulation = get_by_id(accumulations, str(accumulation_id))  # type: ignore
 
     return accumulation
@@ -1,6 +1,7 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 import click
+import numpy as np
 from tabulate import tabulate
 
 import wellets_cli.api as api
@@ -9,17 +10,48 @@ from wellets_cli.chart import (
     mk_fig,
     plot_allocation,
     plot_balance,
+    plot_curves,
     plot_ema,
     plot_exposition,
+    plot_heatmap,
     plot_position,
     plot_price,
     show_chart,
     xdate_fmt,
 )
 from wellets_cli.config import settings
+from wellets_cli.history import (
+    asset_history,
+    asset_movements,
+    currencies_price_history,
+    currency_price_history,
+    time_index,
+    value_history,
+)
+from wellets_cli.interval import INTERVALS, kline_interval
 from wellets_cli.model import Asset, AssetAllocation, AssetEntry
 from wellets_cli.question import asset_question, date_range_question, interval_question
-from wellets_cli.util import change_val, change_value, get_by_id, make_headers, pp
+from wellets_cli.returns import compute_returns, returns_rows
+from wellets_cli.risk import (
+    correlation_json,
+    correlation_rows,
+    covariance_to_correlation,
+    periods_per_year,
+    price_returns,
+    risk_json,
+    risk_metrics,
+    risk_rows,
+    rolling_covariance,
+)
+from wellets_cli.util import (
+    change_val,
+    change_value,
+    get_by_id,
+    get_currency_by_acronym,
+    make_headers,
+    pp,
+)
+from wellets_cli.validator import validate_interval
 
 
 @click.group()
@@ -195,49 +227,323 @@ def show_asset_entries(asset_id, auth_token):
 
 @asset.command(name="history")
 @click.option("--asset-id")
-@click.option("--interval", type=click.Choice(["1d", "1w"], case_sensitive=True))
+@click.option("--all", "show_all", is_flag=True, default=False, help="All assets.")
+@click.option("--interval", callback=validate_interval)
 @click.option("--start-date", type=click.DateTime())
 @click.option("--end-date", type=click.DateTime())
+@click.option(
+    "--value",
+    is_flag=True,
+    default=False,
+    help="Show the countervalue in the preferred currency.",
+)
+@click.option(
+    "--remote",
+    is_flag=True,
+    default=False,
+    help="Ask the server for the history (only 1d and 1w intervals).",
+)
 @click.option("--path", type=click.Path())
 @click.option("--auth-token")
-def show_asset_history(asset_id, interval, start_date, end_date, path, auth_token):
+def show_asset_history(
+    asset_id,
+    show_all,
+    interval,
+    start_date,
+    end_date,
+    value,
+    remote,
+    path,
+    auth_token,
+):
     """
     Show the balance history of an asset.
+
+    The history is rebuilt locally from the asset entries, so any interval is
+    supported and all assets can be shown at once with `--all`.
     """
+    if remote and interval and interval not in ("1d", "1w"):
+        raise click.BadParameter(
+            f"The server only supports 1d and 1w intervals, not '{interval}'",
+            param_hint="--interval",
+        )
+
     auth_token = auth_token or get_auth_token()
     headers = make_headers(auth_token)
 
     assets = api.get_assets(headers=headers)
 
-    asset_id = asset_id or asset_question(assets).execute()
-    interval = interval or interval_question(default="1d").execute()
-    start_date, end_date = (start_date and end_date) or date_range_question().execute()
+    if remote:
+        asset_id = asset_id or asset_question(assets).execute()
+        interval = (
+            interval or interval_question(choices=["1d", "1w"], default="1d").execute()
+        )
+    else:
+        asset_id = asset_id or (None if show_all else asset_question(assets).execute())
+        interval = (
+            interval or interval_question(choices=INTERVALS, default="1d").execute()
+        )
+
+    start_date, end_date = (
+        (start_date, end_date)
+        if start_date and end_date
+        else date_range_question().execute()
+    )
+
+    if remote:
+        params = {
+            "asset_id": asset_id,
+            "start": start_date,
+            "end": end_date,
+            "interval": interval,
+        }
+
+        history = api.get_asset_history(params=params, headers=headers)
+        asset = get_by_id(assets, asset_id)
+
+        data = [
+            {
+                "timestamp": h.timestamp.strftime(settings.date_format),
+                f"balance\n({asset.currency.acronym})": pp(h.balance, 8, fixed=False),
+            }
+            for h in history
+        ]
+
+        print(tabulate(data, headers="keys"))
 
-    params = {
-        "asset_id": asset_id,
-        "start": start_date,
-        "end": end_date,
-        "interval": interval,
-    }
+        fig = mk_fig()
+        fig = plot_balance(fig, history, label=asset.currency.acronym)
+        fig = show_chart(fig, path)
+        return
 
-    history = api.get_asset_history(params=params, headers=headers)
-    asset = get_by_id(assets, asset_id)
+    selected = assets if asset_id is None else [get_by_id(assets, asset_id)]
+
+    index = time_index(start_date, end_date, interval)
+    curves = asset_history(selected, index)
+    labels = [a.currency.acronym for a in selected]
+
+    if value:
+        base_currency = api.get_preferred_currency(headers=headers)
+        prices_interval = kline_interval(interval)
+
+        base_price = currency_price_history(
+            base_currency, index, headers, prices_interval
+        )
+        prices = np.array(
+            [
+                currency_price_history(a.currency, index, headers, prices_interval)
+                for a in selected
+            ]
+        )
+        curves = value_history(curves, prices, base_price)
+        labels = [f"{label}\n({base_currency.acronym})" for label in labels]
+
+    timestamp = index.astype(datetime)
 
     data = [
         {
-            "timestamp": h.timestamp.strftime(settings.date_format),
-            f"balance\n({asset.currency.acronym})": pp(h.balance, 8, fixed=False),
+            "timestamp": t.strftime(settings.date_format),
+            **{
+                label: pp(balance, 2 if value else 8, fixed=False)
+                for label, balance in zip(labels, curves[:, i])
+            },
         }
-        for h in history
+        for i, t in enumerate(timestamp)
     ]
 
     print(tabulate(data, headers="keys"))
 
     fig = mk_fig()
-    fig = plot_balance(fig, history, label=asset.currency.acronym)
+    fig = plot_curves(
+        fig,
+        timestamp,
+        curves,
+        labels,
+        ylabel="Value" if value else "Balance",
+    )
     fig = show_chart(fig, path)
 
 
+@asset.command(name="returns")
+@click.option("--asset-id")
+@click.option("--start-date", type=click.DateTime())
+@click.option("--end-date", type=click.DateTime())
+@click.option("--auth-token")
+def show_asset_returns(asset_id, start_date, end_date, auth_token):
+    """
+    Show the time-weighted and money-weighted returns of an asset.
+
+    Returns are computed in the preferred currency from the first entry (or
+    --start-date) to now (or --end-date).
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    assets = api.get_assets(headers=headers)
+    base_currency = api.get_preferred_currency(headers=headers)
+
+    asset_id = asset_id or asset_question(assets=assets).execute()
+    asset: Asset = get_by_id(assets, asset_id)
+
+    result = compute_returns(
+        asset_movements([asset]),
+        [asset.currency],
+        base_currency,
+        headers,
+        start=start_date,
+        end=end_date,
+    )
+
+    print(tabulate(returns_rows(result, base_currency), headers="keys"))
+
+
+@asset.command(name="risk")
+@click.option("--asset-id", help="Asset to measure (default: all assets).")
+@click.option("--benchmark", help="Benchmark currency acronym for beta, e.g. BTC.")
+@click.option("--interval", default="1d", callback=validate_interval)
+@click.option("--start-date", type=click.DateTime(), help="Default: 365 days ago.")
+@click.option("--end-date", type=click.DateTime(), help="Default: now.")
+@click.option(
+    "--window", type=click.IntRange(2), default=30, help="Rolling beta window."
+)
+@click.option("--risk-free", type=float, default=0.0, help="Annual risk-free rate.")
+@click.option("--format", "fmt", type=click.Choice(["table", "json"]), default="table")
+@click.option("--auth-token")
+def show_asset_risk(
+    asset_id,
+    benchmark,
+    interval,
+    start_date,
+    end_date,
+    window,
+    risk_free,
+    fmt,
+    auth_token,
+):
+    """
+    Show risk metrics of assets in the preferred currency.
+
+    Volatility, max drawdown, Sharpe and Sortino ratios are measured on the
+    asset price; beta is measured against the --benchmark currency.
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    assets = api.get_assets(headers=headers)
+    base_currency = api.get_preferred_currency(headers=headers)
+
+    selected = assets if asset_id is None else [get_by_id(assets, asset_id)]
+
+    end_date = end_date or datetime.now()
+    start_date = start_date or end_date - timedelta(days=365)
+
+    index = time_index(start_date, end_date, interval)
+    prices_interval = kline_interval(interval)
+
+    base_price = currency_price_history(base_currency, index, headers, prices_interval)
+    prices = currencies_price_history(
+        [a.currency for a in selected], index, headers, prices_interval
+    )
+    r = price_returns(prices, base_price)
+
+    benchmark = benchmark and benchmark.upper()
+    benchmark_r = None
+    if benchmark:
+        currencies = api.get_currencies(headers=headers)
+        benchmark_currency = get_currency_by_acronym(currencies, benchmark, safe=True)
+        if benchmark_currency is None:
+            raise click.BadParameter(
+                f"Unknown currency '{benchmark}'", param_hint="--benchmark"
+            )
+        benchmark_price = currency_price_history(
+            benchmark_currency, index, headers, prices_interval
+        )
+        benchmark_r = price_returns(benchmark_price, base_price)
+
+    labels = [a.currency.acronym for a in selected]
+    metrics = risk_metrics(
+        r, periods_per_year(index), benchmark_r, window=window, risk_free=risk_free
+    )
+
+    if fmt == "json":
+        print(risk_json(labels, metrics, index, benchmark, window))
+    else:
+        print(tabulate(risk_rows(labels, metrics, benchmark), headers="keys"))
+
+
+@asset.command(name="correlation")
+@click.option("--interval", default="1d", callback=validate_interval)
+@click.option(
+    "--window", type=click.IntRange(2), default=90, help="Rolling window periods."
+)
+@click.option("--start-date", type=click.DateTime(), help="Default: 365 days ago.")
+@click.option("--end-date", type=click.DateTime(), help="Default: now.")
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(["table", "heatmap", "json"]),
+    default="table",
+)
+@click.option("--output", type=click.Path(dir_okay=False), help="Heatmap PNG path.")
+@click.option("--auth-token")
+def show_asset_correlation(
+    interval, window, start_date, end_date, fmt, output, auth_token
+):
+    """
+    Show the rolling correlation of the assets held, in the preferred currency.
+
+    Covariance and correlation matrices are computed over each trailing
+    --window of price returns; table and heatmap show the latest window,
+    JSON every window.
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    assets = [a for a in api.get_assets(headers=headers) if a.balance]
+    base_currency = api.get_preferred_currency(headers=headers)
+
+    if len(assets) < 2:
+        raise click.UsageError("At least two assets are needed for a correlation")
+
+    end_date = end_date or datetime.now()
+    start_date = start_date or end_date - timedelta(days=365)
+
+    index = time_index(start_date, end_date, interval)
+
+    if len(index) <= window:
+        raise click.BadParameter(
+            f"The date range has {len(index) - 1} periods, fewer than the window",
+            param_hint="--window",
+        )
+
+    prices_interval = kline_interval(interval)
+
+    base_price = currency_price_history(base_currency, index, headers, prices_interval)
+    prices = currencies_price_history(
+        [a.currency for a in assets], index, headers, prices_interval
+    )
+    r = price_returns(prices, base_price)
+
+    cov = rolling_covariance(r, window)
+    corr = covariance_to_correlation(cov)
+
+    labels = [a.currency.acronym for a in assets]
+
+    if fmt == "json":
+        print(correlation_json(labels, index, cov, corr, window))
+    elif fmt == "heatmap":
+        fig = mk_fig()
+        fig = plot_heatmap(fig, corr[-1], labels)
+        fig.suptitle(f"Correlation ({window} x {interval})")
+        if output:
+            fig.savefig(output)
+            print("Saved to", output)
+        else:
+            show_chart(fig)
+    else:
+        print(tabulate(correlation_rows(labels, corr[-1]), headers="keys"))
+
+
 @asset.command(name="visualize")
 @click.option("-id", "--asset-id")
 @click.option("--auth-token")
@@ -0,0 +1,50 @@
+import math
+
+import click
+
+import wellets_cli.transport as transport
+from wellets_cli.batch import parse, run
+
+
+@click.command()
+@click.argument("script", type=click.File("r"), default="-")
+@click.option("--workers", type=int, default=8, help="Parallel commands at once.")
+@click.option(
+    "-k", "--keep-going", is_flag=True, default=False, help="Run past failures."
+)
+@click.option(
+    "-x", "--echo", is_flag=True, default=False, help="Print commands as they run."
+)
+def batch(script, workers, keep_going, echo):
+    """
+    Run a script of commands in one process.
+
+    SCRIPT (default: stdin) has one command per line, written as on the
+    command line without the program name; `#` starts a comment. Consecutive
+    lines ending with `&` run concurrently. GET responses are reused for the
+    whole script and dropped after any write. Stops at the first failing
+    command unless --keep-going, exiting with its code.
+    """
+    from wellets_cli.cli import invoke
+
+    try:
+        groups = parse(script)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    previous = transport.enable_cache(math.inf)
+    try:
+        results = run(groups, invoke, workers, keep_going, echo)
+    finally:
+        transport.enable_cache(previous)
+
+    failed = [r for r in results if r.code]
+
+    if failed:
+        for r in failed:
+            click.echo(
+                f"line {r.command.line}: exited with {r.code}: "
+                f"{' '.join(r.command.args)}",
+                err=True,
+            )
+        raise click.exceptions.Exit(failed[0].code)
@@ -0,0 +1,99 @@
+import subprocess
+import sys
+import time
+
+import click
+
+from wellets_cli.client import send, socket_path
+from wellets_cli.daemon import serve
+
+
+@click.group()
+def daemon():
+    """
+    Manage the background daemon.
+
+    While the daemon runs, every invocation is forwarded to it over a Unix
+    socket and served by a warm process (HTTP session, parsed modules, cached
+    responses). Invocations fall back to running in-process when the daemon is
+    not running or a command needs to prompt. Set WELLETS_NO_DAEMON to
+    bypass it.
+    """
+    pass
+
+
+def _ping():
+    try:
+        return send({"command": "ping"}, timeout=1)
+    except OSError:
+        return None
+
+
+@daemon.command(name="start")
+@click.option(
+    "--cache-ttl", type=float, default=30, help="Seconds GET responses are reused."
+)
+def start_daemon(cache_ttl):
+    """
+    Start the daemon in the background.
+    """
+    status = _ping()
+    if status:
+        click.echo(f"Daemon already running (pid {status['pid']})")
+        return
+
+    subprocess.Popen(
+        [sys.executable, "-m", "wellets_cli", "daemon", "serve"]
+        + ["--cache-ttl", str(cache_ttl)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+    for _ in range(100):
+        time.sleep(0.1)
+        status = _ping()
+        if status:
+            click.echo(f"Daemon started (pid {status['pid']})")
+            return
+
+    raise click.ClickException("Daemon did not start, try `daemon serve`")
+
+
+@daemon.command(name="serve")
+@click.option(
+    "--cache-ttl", type=float, default=30, help="Seconds GET responses are reused."
+)
+def serve_daemon(cache_ttl):
+    """
+    Run the daemon in the foreground.
+    """
+    click.echo(f"Listening on {socket_path()}")
+    serve(cache_ttl=cache_ttl)
+
+
+@daemon.command(name="stop")
+def stop_daemon():
+    """
+    Stop the daemon.
+    """
+    if not _ping():
+        click.echo("Daemon not running")
+        return
+
+    reply = send({"command": "stop"}, timeout=5)
+    click.echo(f"Daemon stopped (pid {reply['pid']})")
+
+
+@daemon.command(name="status")
+def show_daemon_status():
+    """
+    Show whether the daemon is running.
+    """
+    status = _ping()
+
+    if status:
+        click.echo(f"Running (pid {status['pid']}, up {status['uptime']:.0f}s)")
+    else:
+        click.echo("Not running")
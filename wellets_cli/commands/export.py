@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import click
+from tabulate import tabulate
+
+import wellets_cli.api as api
+from wellets_cli.auth import get_auth_token
+from wellets_cli.export import COLUMNS, FORMATS, check_format, export_collection, record
+from wellets_cli.util import make_headers
+
+
+@click.command()
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="jsonl")
+@click.option(
+    "-o",
+    "--output-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="Default: wellets-export-<timestamp>",
+)
+@click.option("--auth-token")
+def export(fmt, output_dir, auth_token):
+    """
+    Export all account data.
+
+    Wallets, transactions, asset entries, portfolios and accumulations are
+    streamed to one file per collection. Collections are fetched concurrently,
+    transactions page by page.
+    """
+    try:
+        check_format(fmt)
+    except RuntimeError as e:
+        raise click.UsageError(str(e))
+
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    output_dir = output_dir or Path(
+        f"wellets-export-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    )
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    with ThreadPoolExecutor() as executor:
+        wallets = executor.submit(api.get_wallets, headers=headers)
+        assets = executor.submit(api.get_assets, headers=headers)
+        portfolios = executor.submit(
+            api.get_portfolios, params={"show_all": True}, headers=headers
+        )
+        accumulations = executor.submit(
+            api.get_accumulations, params={}, headers=headers
+        )
+
+        def rows(name, objs, **extra):
+            return (record(o, COLUMNS[name], **extra) for o in objs)
+
+        def transactions():
+            for wallet in wallets.result():
+                params = {"wallet_id": wallet.id}
+                for t in api.iter_transactions(params, headers=headers):
+                    yield record(t, COLUMNS["transactions"])
+
+        def asset_entries():
+            for asset in assets.result():
+                yield from rows(
+                    "asset_entries", asset.entries, currency_id=asset.currency_id
+                )
+
+        def portfolio_wallets():
+            for portfolio in portfolios.result():
+                for wallet in portfolio.wallets:
+                    yield {"portfolio_id": portfolio.id, "wallet_id": wallet.id}
+
+        def accumulation_entries():
+            for accumulation in accumulations.result():
+                yield from rows(
+                    "accumulation_entries",
+                    accumulation.entries,
+                    accumulation_id=accumulation.id,
+                )
+
+        sources = {
+            "wallets": lambda: rows("wallets", wallets.result()),
+            "transactions": transactions,
+            "asset_entries": asset_entries,
+            "portfolios": lambda: rows("portfolios", portfolios.result()),
+            "portfolio_wallets": portfolio_wallets,
+            "accumulations": lambda: rows("accumulations", accumulations.result()),
+            "accumulation_entries": accumulation_entries,
+        }
+
+        counts = {
+            name: executor.submit(
+                lambda n, s: export_collection(n, s(), output_dir, fmt), name, source
+            )
+            for name, source in sources.items()
+        }
+
+        data = [
+            {
+                "collection": name,
+                "rows": count.result(),
+                "file": output_dir / f"{name}.{fmt}",
+            }
+            for name, count in counts.items()
+        ]
+
+    print(tabulate(data, headers="keys"))
@@ -1,13 +1,53 @@
+from datetime import datetime, timedelta
+
 import click
+import numpy as np
+from dateutil.relativedelta import relativedelta
 from InquirerPy import inquirer
 from InquirerPy.validator import EmptyInputValidator
 from tabulate import tabulate
 
 import wellets_cli.api as api
 from wellets_cli.auth import get_auth_token
+from wellets_cli.chart import mk_fig, plot_curves, show_chart
+from wellets_cli.config import settings
+from wellets_cli.history import (
+    bucket_totals,
+    currencies_price_history,
+    currency_price_history,
+    get_wallets_transactions,
+    movements_balances,
+    time_index,
+    value_history,
+    wallet_movements,
+    wallets_value_history,
+)
+from wellets_cli.interval import INTERVALS, kline_interval
 from wellets_cli.model import Portfolio, RebalanceChange
-from wellets_cli.question import confirm_question, portfolio_question, wallets_question
-from wellets_cli.util import make_headers, pp
+from wellets_cli.projection import MODELS, PERCENTILES, project
+from wellets_cli.question import (
+    confirm_question,
+    date_range_question,
+    interval_question,
+    portfolio_question,
+    wallets_question,
+)
+from wellets_cli.returns import compute_returns, period_returns, returns_rows
+from wellets_cli.risk import (
+    periods_per_year,
+    price_returns,
+    risk_json,
+    risk_metrics,
+    risk_rows,
+)
+from wellets_cli.util import (
+    change_val,
+    get_by_id,
+    get_currency_by_acronym,
+    get_portfolio_wallets,
+    make_headers,
+    pp,
+)
 from wellets_cli.validator import (
     AndValidator,
     GreaterThanOrEqualValidator,
@@ -16,6 +56,7 @@ from wellets_cli.validator import (
     each_validator,
     uuid_validator,
     validate,
+    validate_interval,
 )
 
 
@@ -384,3 +425,324 @@ def show_portfolio_rebalance(portfolio_id, auth_token):
     data = list(map(get_row_value, result.changes))
 
     print(tabulate(data, headers="keys"))
+
+
+@portfolio.command(name="history")
+@click.option("-id", "--portfolio-id", type=click.UUID)
+@click.option("--interval", callback=validate_interval)
+@click.option("--start-date", type=click.DateTime())
+@click.option("--end-date", type=click.DateTime())
+@click.option("--path", type=click.Path())
+@click.option("--auth-token")
+def show_portfolio_history(
+    portfolio_id, interval, start_date, end_date, path, auth_token
+):
+    """
+    Show the value history of a portfolio in the preferred currency.
+
+    The value is rebuilt locally from the transactions of the wallets in the
+    portfolio (and its children), priced with historical currency rates.
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    portfolios = api.get_portfolios(params={"show_all": True}, headers=headers)
+
+    portfolio_id = portfolio_id or portfolio_question(portfolios=portfolios).execute()
+    interval = interval or interval_question(choices=INTERVALS, default="1d").execute()
+    start_date, end_date = (
+        (start_date, end_date)
+        if start_date and end_date
+        else date_range_question().execute()
+    )
+
+    currencies = api.get_currencies(headers=headers)
+    base_currency = api.get_preferred_currency(headers=headers)
+
+    wallets = get_portfolio_wallets(portfolios, str(portfolio_id))
+    transactions = get_wallets_transactions(wallets, headers=headers)
+
+    index = time_index(start_date, end_date, interval)
+    prices_interval = kline_interval(interval)
+
+    prices = {
+        currency_id: currency_price_history(
+            get_by_id(currencies, currency_id), index, headers, prices_interval
+        )
+        for currency_id in {w.currency_id for w in wallets}
+    }
+    base_price = currency_price_history(base_currency, index, headers, prices_interval)
+
+    curve = wallets_value_history(wallets, transactions, index, prices, base_price)
+    timestamp = curve.timestamp.astype(datetime)
+
+    data = [
+        {
+            "timestamp": t.strftime(settings.date_format),
+            f"value\n({base_currency.acronym})": pp(v),
+        }
+        for t, v in zip(timestamp, curve.balance)
+    ]
+
+    print(tabulate(data, headers="keys"))
+
+    portfolio = get_by_id(portfolios, str(portfolio_id))
+
+    fig = mk_fig()
+    fig = plot_curves(
+        fig,
+        timestamp,
+        [curve.balance],
+        [portfolio.alias],
+        ylabel=f"Value ({base_currency.acronym})",
+    )
+    fig = show_chart(fig, path)
+
+
+@portfolio.command(name="returns")
+@click.option("-id", "--portfolio-id", type=click.UUID)
+@click.option("--start-date", type=click.DateTime())
+@click.option("--end-date", type=click.DateTime())
+@click.option("--auth-token")
+def show_portfolio_returns(portfolio_id, start_date, end_date, auth_token):
+    """
+    Show the time-weighted and money-weighted returns of a portfolio.
+
+    Returns are computed in the preferred currency over the wallets of the
+    portfolio and its children, from the first transaction (or --start-date)
+    to now (or --end-date).
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    portfolios = api.get_portfolios(params={"show_all": True}, headers=headers)
+    portfolio_id = portfolio_id or portfolio_question(portfolios=portfolios).execute()
+
+    currencies = api.get_currencies(headers=headers)
+    base_currency = api.get_preferred_currency(headers=headers)
+
+    wallets = get_portfolio_wallets(portfolios, str(portfolio_id))
+    transactions = get_wallets_transactions(wallets, headers=headers)
+    movements = wallet_movements(wallets, transactions)
+
+    result = compute_returns(
+        movements,
+        [get_by_id(currencies, c) for c in movements.keys],
+        base_currency,
+        headers,
+        start=start_date,
+        end=end_date,
+    )
+
+    print(tabulate(returns_rows(result, base_currency), headers="keys"))
+
+
+@portfolio.command(name="risk")
+@click.option("-id", "--portfolio-id", type=click.UUID)
+@click.option("--benchmark", help="Benchmark currency acronym for beta, e.g. BTC.")
+@click.option("--interval", default="1d", callback=validate_interval)
+@click.option("--start-date", type=click.DateTime(), help="Default: 365 days ago.")
+@click.option("--end-date", type=click.DateTime(), help="Default: now.")
+@click.option(
+    "--window", type=click.IntRange(2), default=30, help="Rolling beta window."
+)
+@click.option("--risk-free", type=float, default=0.0, help="Annual risk-free rate.")
+@click.option("--format", "fmt", type=click.Choice(["table", "json"]), default="table")
+@click.option("--auth-token")
+def show_portfolio_risk(
+    portfolio_id,
+    benchmark,
+    interval,
+    start_date,
+    end_date,
+    window,
+    risk_free,
+    fmt,
+    auth_token,
+):
+    """
+    Show risk metrics of a portfolio in the preferred currency.
+
+    Metrics are measured on the value of the portfolio wallets (and its
+    children) net of deposits and withdrawals; beta is measured against the
+    --benchmark currency.
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    portfolios = api.get_portfolios(params={"show_all": True}, headers=headers)
+    portfolio_id = portfolio_id or portfolio_question(portfolios=portfolios).execute()
+    portfolio = get_by_id(portfolios, str(portfolio_id))
+
+    currencies = api.get_currencies(headers=headers)
+    base_currency = api.get_preferred_currency(headers=headers)
+
+    end_date = end_date or datetime.now()
+    start_date = start_date or end_date - timedelta(days=365)
+
+    index = time_index(start_date, end_date, interval)
+    prices_interval = kline_interval(interval)
+
+    wallets = get_portfolio_wallets(portfolios, str(portfolio_id))
+    transactions = get_wallets_transactions(wallets, headers=headers)
+    movements = wallet_movements(wallets, transactions)
+
+    base_price = currency_price_history(base_currency, index, headers, prices_interval)
+    prices = currencies_price_history(
+        [get_by_id(currencies, c) for c in movements.keys],
+        index,
+        headers,
+        prices_interval,
+    )
+
+    balances = movements_balances(movements, index)
+    units = bucket_totals(
+        movements.timestamp,
+        movements.value,
+        movements.series,
+        len(movements.keys),
+        index,
+    )
+    value = value_history(balances, prices, base_price).sum(axis=0)
+    flow = value_history(units, prices, base_price).sum(axis=0)
+    r = period_returns(value, flow)[None, :]
+
+    benchmark = benchmark and benchmark.upper()
+    benchmark_r = None
+    if benchmark:
+        benchmark_currency = get_currency_by_acronym(currencies, benchmark, safe=True)
+        if benchmark_currency is None:
+            raise click.BadParameter(
+                f"Unknown currency '{benchmark}'", param_hint="--benchmark"
+            )
+        benchmark_price = currency_price_history(
+            benchmark_currency, index, headers, prices_interval
+        )
+        benchmark_r = price_returns(benchmark_price, base_price)
+
+    labels = [portfolio.alias]
+    metrics = risk_metrics(
+        r, periods_per_year(index), benchmark_r, window=window, risk_free=risk_free
+    )
+
+    if fmt == "json":
+        print(risk_json(labels, metrics, index, benchmark, window))
+    else:
+        print(tabulate(risk_rows(labels, metrics, benchmark), headers="keys"))
+
+
+@portfolio.command(name="project")
+@click.option("-id", "--portfolio-id", type=click.UUID)
+@click.option("--years", type=click.IntRange(1), default=10)
+@click.option("--paths", type=click.IntRange(1), default=10_000)
+@click.option("--target", type=float, help="Target value in the preferred currency.")
+@click.option(
+    "--model",
+    type=click.Choice(MODELS),
+    default="bootstrap",
+    help="Bootstrap historical periods or fit a multivariate normal.",
+)
+@click.option(
+    "--interval",
+    default="1w",
+    callback=validate_interval,
+    help="Length of a simulation step.",
+)
+@click.option(
+    "--lookback", type=click.IntRange(1), default=3, help="Years of price history."
+)
+@click.option("--seed", type=int)
+@click.option("--workers", type=click.IntRange(1), default=1)
+@click.option("--batch-size", type=click.IntRange(1), default=10_000)
+@click.option("--auth-token")
+def project_portfolio(
+    portfolio_id,
+    years,
+    paths,
+    target,
+    model,
+    interval,
+    lookback,
+    seed,
+    workers,
+    batch_size,
+    auth_token,
+):
+    """
+    Project the future value of a portfolio with a Monte Carlo simulation.
+
+    Returns of the currencies held by the portfolio wallets are drawn from
+    their price history (in the preferred currency) and applied to the
+    current holdings. Paths are simulated in batches of --batch-size,
+    optionally on --workers processes.
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    portfolios = api.get_portfolios(params={"show_all": True}, headers=headers)
+    portfolio_id = portfolio_id or portfolio_question(portfolios=portfolios).execute()
+
+    currencies = api.get_currencies(headers=headers)
+    base_currency = api.get_preferred_currency(headers=headers)
+
+    wallets = get_portfolio_wallets(portfolios, str(portfolio_id))
+    currency_ids = sorted({w.currency_id for w in wallets})
+    held = [get_by_id(currencies, c) for c in currency_ids]
+
+    initial = np.array(
+        [
+            sum(
+                change_val(c, base_currency, w.balance)
+                for w in wallets
+                if w.currency_id == c.id
+            )
+            for c in held
+        ]
+    )
+
+    if initial.sum() <= 0:
+        raise click.UsageError("The portfolio has no value to project")
+
+    end_date = datetime.now()
+    index = time_index(end_date - relativedelta(years=lookback), end_date, interval)
+    prices_interval = kline_interval(interval)
+
+    base_price = currency_price_history(base_currency, index, headers, prices_interval)
+    prices = currencies_price_history(held, index, headers, prices_interval)
+    returns = price_returns(prices, base_price).T
+
+    steps_per_year = round(periods_per_year(index))
+
+    projection = project(
+        initial,
+        returns,
+        steps=years * steps_per_year,
+        checkpoints=[y * steps_per_year for y in range(1, years + 1)],
+        paths=paths,
+        model=model,
+        target=target,
+        seed=seed,
+        batch_size=batch_size,
+        workers=workers,
+    )
+
+    def get_row_value(i: int):
+        row = {
+            "year": i + 1,
+            f"mean\n({base_currency.acronym})": pp(projection.mean[i]),
+            **{
+                f"p{q}\n({base_currency.acronym})": pp(projection.percentiles[i][j])
+                for j, q in enumerate(PERCENTILES)
+            },
+        }
+        if target is not None:
+            row["above target\n(%)"] = pp(projection.p_above[i], 1, percent=True)
+            row["hit target\n(%)"] = pp(projection.p_hit[i], 1, percent=True)
+        return row
+
+    click.echo(f"Current value = {base_currency.acronym} {pp(initial.sum())}")
+    click.echo()
+
+    data = [get_row_value(i) for i in range(len(projection.checkpoints))]
+
+    print(tabulate(data, headers="keys"))
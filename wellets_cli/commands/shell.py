@@ -0,0 +1,24 @@
+import click
+
+import wellets_cli.transport as transport
+from wellets_cli.shell import repl
+
+
+@click.command()
+@click.option(
+    "--cache-ttl", type=float, default=30, help="Seconds GET responses are reused."
+)
+@click.pass_context
+def shell(ctx, cache_ttl):
+    """
+    Run commands in an interactive shell.
+
+    Commands are typed as on the command line, without the program name
+    (`wallet list`, `transaction create ...`). Tab completes commands, options
+    and wallet, asset and portfolio ids. `refresh` drops cached responses,
+    `help [COMMAND]` shows help and `exit` (or Ctrl-D) quits.
+    """
+    from wellets_cli.cli import invoke
+
+    transport.enable_cache(cache_ttl)
+    repl(ctx.find_root().command, invoke)
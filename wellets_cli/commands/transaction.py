@@ -1,12 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from pathlib import Path
 
 import click
+import requests
 from InquirerPy import inquirer
 from InquirerPy.validator import EmptyInputValidator
 from tabulate import tabulate
 
 import wellets_cli.api as api
+import wellets_cli.idempotency as idempotency
 from wellets_cli.auth import get_auth_token
+from wellets_cli.importer import (
+    FORMATS,
+    Checkpoint,
+    RowValidator,
+    count_rows,
+    detect_format,
+    import_rows,
+    read_rows,
+)
 from wellets_cli.model import Transaction
 from wellets_cli.question import (
     change_value_question,
@@ -90,6 +103,8 @@ def list_transactions(wallet_id, auth_token):
 @click.option("--description", type=str)
 @click.option("--created-at", type=click.DateTime(formats=["%Y-%m-%d %H:%M"]))
 @click.option("-y", "--yes", is_flag=True, type=bool)
+@click.option("--accumulation-id", type=click.UUID, hidden=True)
+@click.option("--idempotency-key", hidden=True)
 @click.option("--auth-token")
 def create_transaction(
     wallet_id,
@@ -100,6 +115,8 @@ def create_transaction(
     description,
     created_at,
     yes,
+    accumulation_id,
+    idempotency_key,
     auth_token,
 ):
     """
@@ -112,19 +129,18 @@ def create_transaction(
     currencies = api.get_currencies(headers=headers)
     preferred_currency = api.get_preferred_currency(headers=headers)
 
-    wallet_id = wallet_id or wallet_question(wallets).execute()
+    wallet_id = str(wallet_id or wallet_question(wallets).execute())
     wallet = get_by_id(wallets, wallet_id)
     wallet_currency = get_by_id(currencies, wallet.currency_id)
 
-    transaction_type = inquirer.select(
-        message="Transaction type",
-        choices=["Income", "Outcome"],
-        default="Income",
-    ).execute()
+    if value is None:
+        transaction_type = inquirer.select(
+            message="Transaction type",
+            choices=["Income", "Outcome"],
+            default="Income",
+        ).execute()
 
-    value = (
-        value
-        or inquirer.number(
+        value = inquirer.number(
             message=f"{transaction_type} amount ({wallet_currency.acronym})",
             float_allowed=True,
             validate=AndValidator(
@@ -132,7 +148,6 @@ def create_transaction(
             ),
             filter=lambda x: float(x) * (1 if transaction_type == "Income" else -1),
         ).execute()
-    )
 
     if not dollar_rate:
         usd_currency = get_currency_by_acronym(currencies, acronym="USD", safe=True)
@@ -176,6 +191,9 @@ def create_transaction(
         ).execute()
     )
 
+    if isinstance(created_at, datetime):
+        created_at = created_at.strftime("%Y-%m-%d %H:%M")
+
     if (
         not yes
         and not confirm_question(
@@ -192,11 +210,85 @@ def create_transaction(
         "created_at": created_at,
     }
 
-    transaction = api.create_transaction(data, headers=headers)
+    if accumulation_id:
+        data["accumulation_id"] = str(accumulation_id)
+
+    transaction = api.create_transaction(
+        data, headers=headers, idempotency_key=idempotency_key
+    )
 
     print(transaction.id)
 
 
+@transaction.command(name="import")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option(
+    "--format", "fmt", type=click.Choice(FORMATS), help="Default: from extension."
+)
+@click.option("--workers", type=click.IntRange(1), default=4)
+@click.option("--batch-size", type=click.IntRange(1), default=100)
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Default: FILE.checkpoint",
+)
+@click.option("--dry-run", is_flag=True, help="Only validate the rows.")
+@click.option("--auth-token")
+def import_transactions(
+    file, fmt, workers, batch_size, checkpoint, dry_run, auth_token
+):
+    """
+    Import transactions from a CSV or JSON Lines file.
+
+    Each row has a wallet_id (or the wallet alias as wallet), value,
+    description, created_at (yyyy-MM-dd HH:mm) and optionally dollar_rate
+    (default: the current rate of the wallet currency). Imported rows are
+    recorded in the checkpoint file: running the import again resumes it.
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    fmt = fmt or detect_format(file)
+
+    wallets = api.get_wallets(headers=headers)
+    currencies = api.get_currencies(headers=headers)
+    validate_row = RowValidator(wallets, currencies)
+
+    def post(line: int, data: dict) -> None:
+        if not dry_run:
+            key = idempotency.idempotency_key("import", str(file.resolve()), line, data)
+            api.create_transaction(data, headers=headers, idempotency_key=key)
+
+    progress = (
+        None
+        if dry_run
+        else Checkpoint(checkpoint or file.with_name(file.name + ".checkpoint"))
+    )
+    if progress and progress.done:
+        click.echo(f"Resuming, {len(progress.done)} rows already imported")
+
+    try:
+        with click.progressbar(length=count_rows(file, fmt), label="Importing") as bar:
+            errors = import_rows(
+                read_rows(file, fmt),
+                validate_row,
+                post,
+                checkpoint=progress,
+                batch_size=batch_size,
+                workers=workers,
+                on_row=lambda: bar.update(1),
+            )
+    finally:
+        if progress:
+            progress.close()
+
+    for line, error in errors.items():
+        click.echo(f"line {line}: {error}", err=True)
+
+    if errors:
+        raise click.ClickException(f"{len(errors)} rows failed")
+
+
 @transaction.command(name="revert")
 @click.option("--wallet-id", type=click.UUID)
 @click.option(
@@ -204,29 +296,77 @@ def create_transaction(
     multiple=True,
     callback=lambda _1, _2, value: validate(each_validator(uuid_validator), value),
 )
+@click.option(
+    "--from-file",
+    type=click.File("r"),
+    help="File with one transaction id per line ('-' for stdin).",
+)
+@click.option("--workers", type=click.IntRange(1), default=8)
 @click.option("--auth-token")
 @click.option("-y", "--yes", is_flag=True, type=bool, default=False)
-def revert_transaction(wallet_id, transaction_ids, auth_token, yes):
+def revert_transaction(wallet_id, transaction_ids, from_file, workers, auth_token, yes):
     """
     Revert a transaction.
 
     The transaction reverted is not deleted from the system. Instead, a new
     transaction is created with the same value but the opposite sign. The asset
     balance is also affected and an asset entry is created accordingly.
+
+    Many transactions (--transaction-ids, --from-file) are reverted
+    concurrently; failures are reported at the end instead of stopping the run.
     """
     auth_token = auth_token or get_auth_token()
     headers = make_headers(auth_token)
 
-    wallets = api.get_wallets(headers=headers)
-    wallet_id = wallet_id or wallet_question(wallets).execute()
+    transaction_ids = list(transaction_ids)
+    if from_file:
+        transaction_ids += [
+            line.strip()
+            for line in from_file
+            if line.strip() and not line.startswith("#")
+        ]
 
-    transactions = api.get_transactions({"wallet_id": wallet_id}, headers=headers)
+    if not transaction_ids:
+        wallets = api.get_wallets(headers=headers)
+        wallet_id = wallet_id or wallet_question(wallets).execute()
 
-    transaction_ids = transaction_ids or transactions_question(transactions).execute()
+        transactions = api.get_transactions({"wallet_id": wallet_id}, headers=headers)
+
+        transaction_ids = transactions_question(transactions).execute()
+
+    transaction_ids = list(dict.fromkeys(str(t) for t in transaction_ids))
 
     if not yes and not confirm_question().execute():
         return
 
-    for transaction_id in transaction_ids:
-        reverted = api.revert_transaction(transaction_id, headers=headers)
-        print(reverted.id)
+    def revert(transaction_id: str) -> Transaction:
+        error = uuid_validator(transaction_id)
+        if error is not True:
+            raise ValueError(error)
+
+        return api.revert_transaction(
+            transaction_id,
+            headers=headers,
+            idempotency_key=idempotency.idempotency_key("revert", transaction_id),
+        )
+
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(revert, t): t for t in transaction_ids}
+        for future in as_completed(futures):
+            try:
+                print(future.result().id)
+            except (api.APIError, ValueError, requests.RequestException) as e:
+                errors[futures[future]] = str(e)
+
+    click.echo(
+        f"Reverted {len(transaction_ids) - len(errors)} transactions, "
+        f"{len(errors)} failed",
+        err=True,
+    )
+
+    if errors:
+        data = [{"id": t, "error": errors[t]} for t in transaction_ids if t in errors]
+        click.echo(tabulate(data, headers="keys"), err=True)
+        raise click.exceptions.Exit(1)
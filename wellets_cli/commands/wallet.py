@@ -1,12 +1,15 @@
 from datetime import datetime
 
 import click
+import numpy as np
 from InquirerPy import inquirer
 from tabulate import tabulate
 
 import wellets_cli.api as api
 from wellets_cli.auth import get_auth_token
 from wellets_cli.config import settings
+from wellets_cli.history import time_index, wallet_history, wallet_movements
+from wellets_cli.interval import INTERVALS
 from wellets_cli.model import Wallet
 from wellets_cli.question import (
     change_value_question,
@@ -19,6 +22,7 @@ from wellets_cli.question import (
     wallet_question,
     warning_message,
 )
+from wellets_cli.returns import compute_returns, returns_rows
 from wellets_cli.util import (
     change_value,
     get_by_id,
@@ -32,6 +36,7 @@ from wellets_cli.validator import (
     EmptyInputValidator,
     GreaterThanOrEqualValidator,
     NumberValidator,
+    validate_interval,
 )
 
 
@@ -400,38 +405,73 @@ def show_wallets_total_balance(auth_token):
 
 @wallet.command(name="history")
 @click.option("--wallet-id")
-@click.option("--interval", type=click.Choice(["1d", "1w"], case_sensitive=True))
+@click.option("--interval", callback=validate_interval)
 @click.option("--start-date", type=click.DateTime())
 @click.option("--end-date", type=click.DateTime())
+@click.option(
+    "--remote",
+    is_flag=True,
+    default=False,
+    help="Ask the server for the history (only 1d and 1w intervals).",
+)
 @click.option("--path", type=click.Path())
 @click.option("--auth-token")
-def show_wallet_history(wallet_id, interval, start_date, end_date, path, auth_token):
+def show_wallet_history(
+    wallet_id, interval, start_date, end_date, remote, path, auth_token
+):
     """
     Show a chart with the wallet balance history.
+
+    The history is rebuilt locally from the wallet transactions, so any
+    interval is supported (e.g. 1h, 6h, 1d, 1w, 1M).
     """
+    if remote and interval and interval not in ("1d", "1w"):
+        raise click.BadParameter(
+            f"The server only supports 1d and 1w intervals, not '{interval}'",
+            param_hint="--interval",
+        )
+
     auth_token = auth_token or get_auth_token()
     headers = make_headers(auth_token)
 
     wallets = api.get_wallets(headers=headers)
 
     wallet_id = wallet_id or wallet_question(wallets).execute()
-    interval = interval or interval_question().execute()
-    start_date, end_date = (start_date and end_date) or date_range_question().execute()
+    interval = (
+        interval
+        or interval_question(choices=["1d", "1w"] if remote else INTERVALS).execute()
+    )
+    start_date, end_date = (
+        (start_date, end_date)
+        if start_date and end_date
+        else date_range_question().execute()
+    )
 
-    params = {
-        "wallet_id": wallet_id,
-        "start": start_date,
-        "end": end_date,
-        "interval": interval,
-    }
+    if remote:
+        params = {
+            "wallet_id": wallet_id,
+            "start": start_date,
+            "end": end_date,
+            "interval": interval,
+        }
 
-    history = api.get_wallet_history(params=params, headers=headers)
+        history = api.get_wallet_history(params=params, headers=headers)
 
-    import matplotlib.pyplot as plt
-    import numpy as np
+        xs = np.array([x.timestamp for x in history])
+        ys = np.array([x.balance for x in history])
+    else:
+        wallet: Wallet = get_by_id(wallets, wallet_id)
+        transactions = list(
+            api.iter_transactions({"wallet_id": wallet_id}, headers=headers)
+        )
 
-    xs = np.array([x.timestamp for x in history])
-    ys = np.array([x.balance for x in history])
+        index = time_index(start_date, end_date, interval)
+        curve = wallet_history(transactions, index, balance=wallet.balance)
+
+        xs = curve.timestamp.astype(datetime)
+        ys = curve.balance
+
+    import matplotlib.pyplot as plt
 
     fig, ax = plt.subplots()
     fig.autofmt_xdate()
@@ -442,3 +482,42 @@ def show_wallet_history(wallet_id, interval, start_date, end_date, path, auth_to
         print("Saved to", path)
     else:
         plt.show()
+
+
+@wallet.command(name="returns")
+@click.option("--wallet-id")
+@click.option("--start-date", type=click.DateTime())
+@click.option("--end-date", type=click.DateTime())
+@click.option("--auth-token")
+def show_wallet_returns(wallet_id, start_date, end_date, auth_token):
+    """
+    Show the time-weighted and money-weighted returns of a wallet.
+
+    Returns are computed in the preferred currency from the first
+    transaction (or --start-date) to now (or --end-date).
+    """
+    auth_token = auth_token or get_auth_token()
+    headers = make_headers(auth_token)
+
+    wallets = api.get_wallets(headers=headers)
+    currencies = api.get_currencies(headers=headers)
+    base_currency = api.get_preferred_currency(headers=headers)
+
+    wallet_id = wallet_id or wallet_question(wallets).execute()
+    wallet: Wallet = get_by_id(wallets, wallet_id)
+
+    transactions = list(
+        api.iter_transactions({"wallet_id": wallet_id}, headers=headers)
+    )
+    movements = wallet_movements([wallet], transactions)
+
+    result = compute_returns(
+        movements,
+        [get_by_id(currencies, c) for c in movements.keys],
+        base_currency,
+        headers,
+        start=start_date,
+        end=end_date,
+    )
+
+    print(tabulate(returns_rows(result, base_currency), headers="keys"))
@@ -1,4 +1,6 @@
+import hashlib
 import os
+from pathlib import Path
 from typing import Optional
 
 
@@ -32,6 +34,55 @@ class Settings:
     def api_password(self) -> Optional[str]:
         return os.environ.get("WELLETS_API_PASSWORD") or None
 
+    @property
+    def cache_dir(self) -> Path:
+        cache_dir = os.environ.get("WELLETS_CACHE_DIR")
+        return Path(cache_dir) if cache_dir else Path.home() / ".cache" / "wellets_cli"
+
+    @property
+    def state_dir(self) -> Path:
+        state_dir = os.environ.get("WELLETS_STATE_DIR")
+        return (
+            Path(state_dir)
+            if state_dir
+            else Path.home() / ".local" / "state" / "wellets_cli"
+        )
+
+    def account_state_dir(self, account: str) -> Path:
+        """
+        State directory of `account` on the configured API, so that accounts
+        and servers do not share state.
+        """
+        key = hashlib.sha256(f"{self.api_url}\n{account}".encode()).hexdigest()
+        return self.state_dir / "accounts" / key[:16]
+
+    @property
+    def record_path(self) -> Optional[Path]:
+        record_path = os.environ.get("WELLETS_RECORD")
+        return Path(record_path) if record_path else None
+
+    @property
+    def replay_path(self) -> Optional[Path]:
+        replay_path = os.environ.get("WELLETS_REPLAY")
+        return Path(replay_path) if replay_path else None
+
+    @property
+    def replay_latency(self) -> bool:
+        return bool(os.environ.get("WELLETS_REPLAY_LATENCY")) or False
+
+    @property
+    def retries(self) -> Optional[int]:
+        retries = os.environ.get("WELLETS_RETRIES")
+        return int(retries) if retries else None
+
+    @property
+    def server_dedup(self) -> bool:
+        return bool(os.environ.get("WELLETS_SERVER_DEDUP")) or False
+
+    @property
+    def hedge(self) -> bool:
+        return bool(os.environ.get("WELLETS_HEDGE")) or False
+
     def __str__(self):
         api_username = f'"{self.api_username}"' if self.api_username else None
         api_password = "<secret>" if self.api_password else None
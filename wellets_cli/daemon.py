@@ -0,0 +1,115 @@
+"""
+Background daemon keeping a warm wellets_cli process.
+
+The daemon listens on a Unix socket in the state directory and runs the
+invocations forwarded by `wellets_cli.client` one at a time, keeping the
+imported cli, the HTTP session and a short-lived cache of GET responses
+between them. Invocations that need a terminal (interactive prompts) are
+sent back to the client, which runs them in-process. Control commands (ping,
+stop, clear-cache) are served while an invocation runs.
+"""
+
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Optional
+
+import wellets_cli.transport as transport
+from wellets_cli.client import socket_path
+
+
+def _apply_env(env: dict) -> dict:
+    """
+    Replace the WELLETS_* environment with `env`, returning the previous one.
+    """
+    previous = {k: v for k, v in os.environ.items() if k.startswith("WELLETS_")}
+    for k in previous:
+        del os.environ[k]
+    os.environ.update(env)
+    return previous
+
+
+def run_invocation(message: dict) -> dict:
+    from wellets_cli.cli import invoke
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    stdin, cwd = sys.stdin, os.getcwd()
+    env = _apply_env(message.get("env", {}))
+
+    try:
+        os.chdir(message.get("cwd", cwd))
+        sys.stdin = io.StringIO(message.get("stdin", ""))
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            code = invoke(message["argv"])
+    except EOFError:
+        # a prompt needs the client terminal
+        return {"fallback": True}
+    finally:
+        sys.stdin = stdin
+        os.chdir(cwd)
+        _apply_env(env)
+
+    return {"code": code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    started = time.time()
+    # invocations swap the process environment, cwd and stdio: one at a time
+    invocation_lock = threading.Lock()
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        message = json.loads(self.rfile.read())
+        command = message.get("command")
+
+        if command == "ping":
+            reply = {"pid": os.getpid(), "uptime": time.time() - self.server.started}
+        elif command == "stop":
+            reply = {"pid": os.getpid()}
+            threading.Thread(target=self.server.shutdown).start()
+        elif command == "clear-cache":
+            transport.clear_cache()
+            reply = {}
+        else:
+            with self.server.invocation_lock:
+                reply = self.invoke(message)
+
+        self.wfile.write(json.dumps(reply).encode())
+
+    def invoke(self, message: dict) -> dict:
+        if time.time() > message.get("deadline", float("inf")):
+            # the client gave up waiting and runs it itself
+            return {"fallback": True}
+
+        self.wfile.write(json.dumps({"accepted": True}).encode() + b"\n")
+        return run_invocation(message)
+
+
+def serve(path: Optional[Path] = None, cache_ttl: float = 30) -> None:
+    """
+    Serve forwarded invocations on `path` until stopped.
+    """
+    from wellets_cli.cli import setup
+
+    setup()
+    transport.enable_cache(cache_ttl)
+
+    path = path or socket_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()  # stale socket of a dead daemon
+
+    with Server(str(path), Handler) as server:
+        os.chmod(path, 0o600)
+        try:
+            server.serve_forever()
+        finally:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,216 @@
+"""
+Streaming export of account data.
+
+Each collection is written to its own file (`<collection>.<format>`) record by
+record, or batch by batch for Parquet, so memory does not grow with the size
+of the account. Columns are fixed per collection so that every format (and
+every Parquet batch) shares the same schema.
+"""
+
+import csv
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Protocol, Tuple
+
+from wellets_cli.util import format_duration
+
+FORMATS = ["jsonl", "csv", "parquet"]
+
+Columns = List[Tuple[str, str]]  # name, type (string, float, int, timestamp)
+
+COLUMNS: Dict[str, Columns] = {
+    "wallets": [
+        ("id", "string"),
+        ("alias", "string"),
+        ("description", "string"),
+        ("balance", "float"),
+        ("currency_id", "string"),
+        ("created_at", "timestamp"),
+        ("updated_at", "timestamp"),
+    ],
+    "transactions": [
+        ("id", "string"),
+        ("wallet_id", "string"),
+        ("value", "float"),
+        ("description", "string"),
+        ("created_at", "timestamp"),
+        ("updated_at", "timestamp"),
+    ],
+    "asset_entries": [
+        ("id", "string"),
+        ("asset_id", "string"),
+        ("currency_id", "string"),
+        ("value", "float"),
+        ("dollar_rate", "float"),
+        ("created_at", "timestamp"),
+        ("updated_at", "timestamp"),
+    ],
+    "portfolios": [
+        ("id", "string"),
+        ("alias", "string"),
+        ("weight", "float"),
+        ("parent_id", "string"),
+        ("created_at", "timestamp"),
+        ("updated_at", "timestamp"),
+    ],
+    "portfolio_wallets": [
+        ("portfolio_id", "string"),
+        ("wallet_id", "string"),
+    ],
+    "accumulations": [
+        ("id", "string"),
+        ("asset_id", "string"),
+        ("alias", "string"),
+        ("strategy", "string"),
+        ("quote", "float"),
+        ("planned_entries", "int"),
+        ("every", "string"),
+        ("planned_start", "timestamp"),
+        ("planned_end", "timestamp"),
+        ("created_at", "timestamp"),
+        ("updated_at", "timestamp"),
+    ],
+    "accumulation_entries": [
+        ("id", "string"),
+        ("accumulation_id", "string"),
+        ("wallet_id", "string"),
+        ("value", "float"),
+        ("description", "string"),
+        ("created_at", "timestamp"),
+        ("updated_at", "timestamp"),
+    ],
+}
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc)
+
+
+def record(obj, columns: Columns, **extra) -> dict:
+    """
+    Pick `columns` from a model (or dict), with `extra` fields overriding.
+    """
+    data = obj if isinstance(obj, dict) else obj.__dict__
+    data = {**data, **extra}
+
+    out = {}
+    for name, kind in columns:
+        value = data.get(name)
+        if value is not None and kind == "timestamp":
+            value = _utc(value)
+        elif value is not None and name == "every":
+            value = format_duration(value)
+        out[name] = value
+    return out
+
+
+class Writer(Protocol):
+    def write(self, row: dict) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class JsonlWriter:
+    def __init__(self, path: Path, columns: Columns):
+        self.file = open(path, "w")
+
+    def write(self, row: dict) -> None:
+        self.file.write(json.dumps(row, default=lambda x: x.isoformat()) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class CsvWriter:
+    def __init__(self, path: Path, columns: Columns):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=[c for c, _ in columns])
+        self.writer.writeheader()
+
+    def write(self, row: dict) -> None:
+        self.writer.writerow(
+            {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def check_format(fmt: str) -> None:
+    """
+    Raise when the optional dependencies of `fmt` are missing.
+    """
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError(
+                "Parquet export requires pyarrow, install it with "
+                "`pip install wellets_cli[parquet]`"
+            )
+
+
+class ParquetWriter:
+    """
+    Buffer rows into Arrow record batches of `batch_size` rows.
+    """
+
+    def __init__(self, path: Path, columns: Columns, batch_size: int = 10_000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            "string": pa.string(),
+            "float": pa.float64(),
+            "int": pa.int64(),
+            "timestamp": pa.timestamp("us", tz="UTC"),
+        }
+
+        self.pa = pa
+        self.schema = pa.schema([(c, types[t]) for c, t in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.batch_size = batch_size
+        self.rows: List[dict] = []
+
+    def write(self, row: dict) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.rows:
+            batch = self.pa.RecordBatch.from_pylist(self.rows, schema=self.schema)
+            self.writer.write_batch(batch)
+            self.rows = []
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+
+WRITERS: Dict[str, Callable[[Path, Columns], Writer]] = {
+    "jsonl": JsonlWriter,
+    "csv": CsvWriter,
+    "parquet": ParquetWriter,
+}
+
+
+def export_collection(
+    name: str, rows: Iterable[dict], output_dir: Path, fmt: str
+) -> int:
+    """
+    Stream `rows` of collection `name` to `output_dir`. Returns the count.
+    """
+    path = output_dir / f"{name}.{fmt}"
+    writer = WRITERS[fmt](path, COLUMNS[name])
+
+    n = 0
+    try:
+        for row in rows:
+            writer.write(row)
+            n += 1
+    finally:
+        writer.close()
+
+    return n
@@ -0,0 +1,1140 @@
+"""
+Local stand-in for the Wellets API.
+
+`generate` builds a seeded synthetic account (wallets with their
+transactions, assets, nested portfolios, accumulations and daily candles)
+and `FakeAPI` serves it over HTTP on localhost, covering every endpoint used
+by `wellets_cli.api` and counting the requests it receives. `Faults` adds
+latency, a bandwidth limit and injected errors (5xx, non-JSON 502, 429 with
+Retry-After, dropped connections) to exercise retries, caches and
+concurrency. Point the cli at it with WELLETS_API_URL; any credentials and
+auth token are accepted.
+
+Run it standalone with `python -m wellets_cli.fake_api --help`.
+"""
+
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import click
+
+# last day of the synthetic history, so that datasets do not depend on today
+END = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# acronym, alias, initial price in USD
+CURRENCIES = [
+    ("USD", "Dollar", 1.0),
+    ("EUR", "Euro", 1.1),
+    ("BTC", "Bitcoin", 20000.0),
+    ("ETH", "Ethereum", 1500.0),
+    ("SOL", "Solana", 20.0),
+]
+
+FIAT = ("USD", "EUR")
+
+INTERVAL_DAYS = {"1d": 1, "1w": 7, "1M": 30, "1y": 365}
+
+
+def _ts(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _parse_dt(s: Optional[str], default: datetime = END) -> datetime:
+    if not s:
+        return default
+    dt = datetime.fromisoformat(str(s).replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _new_id() -> str:
+    return str(uuid.uuid4())
+
+
+@dataclass
+class Dataset:
+    user_id: str
+    email: str
+    currencies: List[dict]
+    prices: Dict[str, List[float]]  # currency id -> daily price in USD
+    start: datetime
+    settings: dict
+    wallets: List[dict] = field(default_factory=list)
+    transactions: Dict[str, List[dict]] = field(default_factory=dict)  # by wallet
+    assets: List[dict] = field(default_factory=list)
+    portfolios: List[dict] = field(default_factory=list)
+    accumulations: List[dict] = field(default_factory=list)
+    investments: List[dict] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def currency(self, currency_id: str) -> Optional[dict]:
+        return next((c for c in self.currencies if c["id"] == currency_id), None)
+
+    def wallet(self, wallet_id: str) -> Optional[dict]:
+        return next((w for w in self.wallets if w["id"] == wallet_id), None)
+
+    def asset(self, asset_id: str) -> Optional[dict]:
+        return next((a for a in self.assets if a["id"] == asset_id), None)
+
+    def asset_of(self, currency_id: str) -> Optional[dict]:
+        return next((a for a in self.assets if a["currency_id"] == currency_id), None)
+
+    def portfolio(self, portfolio_id: str) -> Optional[dict]:
+        return next((p for p in self.portfolios if p["id"] == portfolio_id), None)
+
+    def accumulation(self, accumulation_id: str) -> Optional[dict]:
+        return next((a for a in self.accumulations if a["id"] == accumulation_id), None)
+
+    def price(self, currency_id: str, when: datetime) -> float:
+        prices = self.prices[currency_id]
+        day = (when - self.start).days
+        return prices[min(max(day, 0), len(prices) - 1)]
+
+    @property
+    def preferred(self) -> dict:
+        return self.settings["currency"]
+
+    def change(self, currency_id: str, value: float) -> float:
+        """
+        Convert `value` of a currency to the preferred currency.
+        """
+        currency = self.currency(currency_id)
+        if currency is None:
+            raise KeyError(currency_id)
+        return value / currency["dollar_rate"] * self.preferred["dollar_rate"]
+
+
+def generate(
+    wallets: int = 5,
+    transactions: int = 50,
+    portfolios: int = 3,
+    years: int = 2,
+    seed: int = 0,
+) -> Dataset:
+    """
+    Generate an account with `wallets` wallets of `transactions` transactions
+    each, `portfolios` root portfolios (each with two children) and `years`
+    of daily prices, the same for the same arguments.
+    """
+    rng = random.Random(seed)
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    user_id = new_id()
+    days = 365 * years
+    start = END - timedelta(days=days)
+
+    currencies: List[dict] = []
+    prices: Dict[str, List[float]] = {}
+    for acronym, alias, price in CURRENCIES:
+        id = new_id()
+        series = [price]
+        volatility = 0 if acronym == "USD" else 0.005 if acronym in FIAT else 0.03
+        for _ in range(days):
+            series.append(series[-1] * (1 + rng.gauss(0.0005, volatility)))
+        prices[id] = series
+        currencies.append(
+            {
+                "id": id,
+                "acronym": acronym,
+                "alias": alias,
+                "dollar_rate": 1 / series[-1],
+                "created_at": _ts(start),
+                "updated_at": _ts(END),
+            }
+        )
+
+    settings = {
+        "id": new_id(),
+        "user_id": user_id,
+        "currency_id": currencies[1]["id"],
+        "created_at": _ts(start),
+        "updated_at": _ts(start),
+        "currency": currencies[1],
+    }
+
+    dataset = Dataset(
+        user_id, "user@wellets.local", currencies, prices, start, settings
+    )
+
+    for currency in currencies:
+        if currency["acronym"] not in FIAT:
+            _add_asset(dataset, new_id(), currency, start)
+
+    for i in range(wallets):
+        currency = currencies[i % len(currencies)]
+        wallet = _add_wallet(
+            dataset, new_id(), f"{currency['acronym'].lower()}-{i}", currency, start
+        )
+
+        unit = 1000 * currency["dollar_rate"]  # about 1000 USD
+        dates = sorted(
+            start + timedelta(seconds=rng.randrange(days * 86400))
+            for _ in range(transactions)
+        )
+        for created_at in dates:
+            value = round(unit * rng.uniform(-0.5, 1), 8)
+            _add_transaction(dataset, new_id(), wallet, value, "synthetic", created_at)
+
+    dataset.assets = [a for a in dataset.assets if a["entries"]]
+
+    for i in range(portfolios):
+        root = _add_portfolio(dataset, new_id(), f"portfolio-{i}", 1 / portfolios)
+        for j in range(2):
+            _add_portfolio(dataset, new_id(), f"portfolio-{i}.{j}", 0.5, root["id"])
+
+    leaves = [p for p in dataset.portfolios if p["parent_id"]]
+    for i, wallet in enumerate(dataset.wallets):
+        if leaves:
+            leaves[i % len(leaves)]["wallets"].append(wallet)
+
+    for asset in dataset.assets:
+        dataset.accumulations.append(_accumulation(new_id(), asset, dataset.wallets))
+
+    return dataset
+
+
+def _add_wallet(
+    dataset: Dataset, id: str, alias: str, currency: dict, created_at: datetime
+) -> dict:
+    wallet = {
+        "id": id,
+        "alias": alias,
+        "description": None,
+        "balance": 0.0,
+        "currency_id": currency["id"],
+        "created_at": _ts(created_at),
+        "updated_at": _ts(created_at),
+        "currency": currency,
+    }
+    dataset.wallets.append(wallet)
+    dataset.transactions[id] = []
+    return wallet
+
+
+def _add_asset(dataset: Dataset, id: str, currency: dict, created_at: datetime):
+    asset = {
+        "id": id,
+        "balance": 0.0,
+        "entries": [],
+        "user_id": dataset.user_id,
+        "currency_id": currency["id"],
+        "created_at": _ts(created_at),
+        "updated_at": _ts(created_at),
+        "currency": currency,
+    }
+    dataset.assets.append(asset)
+    return asset
+
+
+def _add_portfolio(
+    dataset: Dataset,
+    id: str,
+    alias: str,
+    weight: float,
+    parent_id: Optional[str] = None,
+) -> dict:
+    portfolio = {
+        "id": id,
+        "alias": alias,
+        "weight": weight,
+        "parent_id": parent_id,
+        "user_id": dataset.user_id,
+        "created_at": _ts(END),
+        "updated_at": _ts(END),
+        "wallets": [],
+        "children": [],
+    }
+    dataset.portfolios.append(portfolio)
+    return portfolio
+
+
+def _add_transaction(
+    dataset: Dataset,
+    id: str,
+    wallet: dict,
+    value: float,
+    description: str,
+    created_at: datetime,
+    dollar_rate: Optional[float] = None,
+) -> dict:
+    wallet["balance"] = round(wallet["balance"] + value, 8)
+    transaction = {
+        "id": id,
+        "value": value,
+        "description": description,
+        "wallet_id": wallet["id"],
+        "created_at": _ts(created_at),
+        "updated_at": _ts(created_at),
+        "wallet": dict(wallet),
+    }
+    dataset.transactions[wallet["id"]].append(transaction)
+
+    asset = dataset.asset_of(wallet["currency_id"])
+    if asset is not None:
+        asset["balance"] = round(asset["balance"] + value, 8)
+        asset["entries"].append(
+            {
+                "id": id,
+                "value": value,
+                "dollar_rate": dollar_rate
+                or 1 / dataset.price(wallet["currency_id"], created_at),
+                "asset_id": asset["id"],
+                "created_at": _ts(created_at),
+                "updated_at": _ts(created_at),
+            }
+        )
+
+    return transaction
+
+
+def _accumulation(id: str, asset: dict, wallets: List[dict]) -> dict:
+    """
+    A weekly DCA plan of a year on `asset`, half done.
+    """
+    planned_start = END - timedelta(weeks=26)
+    wallet = next(w for w in wallets if w["currency_id"] == asset["currency_id"])
+    entries = [
+        {
+            "id": f"{id[:-4]}{i:04d}",
+            "value": 10 * asset["currency"]["dollar_rate"],
+            "description": f"DCA {i + 1}",
+            "wallet_id": wallet["id"],
+            "created_at": _ts(planned_start + timedelta(weeks=i)),
+            "updated_at": _ts(planned_start + timedelta(weeks=i)),
+        }
+        for i in range(26)
+    ]
+    return {
+        "id": id,
+        "alias": f"dca-{asset['currency']['acronym'].lower()}",
+        "strategy": "dca",
+        "quote": 10.0,
+        "planned_entries": 52,
+        "every": {"weeks": 1},
+        "planned_start": _ts(planned_start),
+        "planned_end": _ts(planned_start + timedelta(weeks=51)),
+        "created_at": _ts(planned_start),
+        "updated_at": _ts(END),
+        "asset_id": asset["id"],
+        "entries": entries,
+    }
+
+
+def _history(
+    data: Dataset, movements: List[dict], currency_id: str, query: dict
+) -> List[dict]:
+    """
+    Balance after `movements` (value, created_at) at each interval step of
+    the queried range, in the preferred currency.
+    """
+    step = timedelta(days=INTERVAL_DAYS.get(query.get("interval", "1d"), 1))
+    start = max(_parse_dt(query.get("start"), data.start), data.start)
+    end = min(_parse_dt(query.get("end")), END)
+
+    movements = sorted(movements, key=lambda m: m["created_at"])
+    history, balance, i, t = [], 0.0, 0, start
+    while t <= end:
+        while i < len(movements) and _parse_dt(movements[i]["created_at"]) <= t:
+            balance += movements[i]["value"]
+            i += 1
+        value = balance * data.price(currency_id, t) * data.preferred["dollar_rate"]
+        history.append({"timestamp": _ts(t), "balance": value})
+        t += step
+    return history
+
+
+# handlers take the dataset, the path match, the query and the JSON body
+Response = Tuple[int, object]
+Handler = Callable[[Dataset, re.Match, dict, Optional[dict]], Response]
+
+
+def _not_found(what: str) -> Response:
+    return 404, {"message": f"{what} not found"}
+
+
+def _balance(data: Dataset, balance: float) -> Response:
+    return 200, {"balance": balance, "currency": data.preferred}
+
+
+# users
+
+
+def login(data, match, query, body) -> Response:
+    return 200, {
+        "id": data.user_id,
+        "email": body.get("email") or data.email,
+        "token": _new_id(),
+        "created_at": _ts(END),
+        "updated_at": _ts(END),
+    }
+
+
+def register(data, match, query, body) -> Response:
+    return 201, {
+        "id": _new_id(),
+        "email": body.get("email"),
+        "created_at": _ts(END),
+        "updated_at": _ts(END),
+    }
+
+
+def get_settings(data, match, query, body) -> Response:
+    return 200, data.settings
+
+
+def set_settings(data, match, query, body) -> Response:
+    currency = data.currency(body.get("currency_id"))
+    if currency is None:
+        return _not_found("Currency")
+
+    data.settings.update(currency_id=currency["id"], currency=currency)
+    return 200, data.settings
+
+
+# currencies
+
+
+def get_currencies(data, match, query, body) -> Response:
+    return 200, data.currencies
+
+
+def sync_currencies(data, match, query, body) -> Response:
+    return 200, {}
+
+
+def get_klines(data, match, query, body) -> Response:
+    currency_id = match["id"]
+    if currency_id not in data.prices:
+        return _not_found("Currency")
+
+    step = INTERVAL_DAYS.get(query.get("interval", "1d"), 1)
+    start = max(_parse_dt(query["start_time"]), data.start)
+    end = min(_parse_dt(query["end_time"]), END)
+
+    klines, t = [], start
+    while t <= end:
+        price = data.price(currency_id, t)
+        klines.append(
+            {
+                "open_time": _ts(t),
+                "open_price": price,
+                "high_price": price * 1.01,
+                "low_price": price * 0.99,
+                "close_price": price,
+                "volume": 1000.0,
+            }
+        )
+        t += timedelta(days=step)
+    return 200, klines
+
+
+# wallets
+
+
+def get_wallets(data, match, query, body) -> Response:
+    return 200, {"wallets": data.wallets, "total": len(data.wallets)}
+
+
+def get_wallet(data, match, query, body) -> Response:
+    wallet = data.wallet(match["id"])
+    return (200, wallet) if wallet else _not_found("Wallet")
+
+
+def create_wallet(data, match, query, body) -> Response:
+    currency = data.currency(body.get("currency_id"))
+    if currency is None:
+        return _not_found("Currency")
+
+    wallet = _add_wallet(data, _new_id(), body.get("alias"), currency, END)
+    wallet["description"] = body.get("description")
+    return 201, wallet
+
+
+def update_wallet(data, match, query, body) -> Response:
+    wallet = data.wallet(match["id"])
+    if wallet is None:
+        return _not_found("Wallet")
+
+    for key in ("alias", "description", "balance"):
+        if body.get(key) is not None:
+            wallet[key] = body[key]
+    return 200, wallet
+
+
+def delete_wallet(data, match, query, body) -> Response:
+    wallet = data.wallet(match["id"])
+    if wallet is None:
+        return _not_found("Wallet")
+
+    data.wallets.remove(wallet)
+    data.transactions.pop(wallet["id"], None)
+    for portfolio in data.portfolios:
+        portfolio["wallets"] = [w for w in portfolio["wallets"] if w is not wallet]
+    return 200, wallet
+
+
+def get_wallet_balance(data, match, query, body) -> Response:
+    wallet = data.wallet(query.get("wallet_id"))
+    if wallet is None:
+        return _not_found("Wallet")
+    return _balance(data, data.change(wallet["currency_id"], wallet["balance"]))
+
+
+def get_total_balance(data, match, query, body) -> Response:
+    return _balance(
+        data, sum(data.change(w["currency_id"], w["balance"]) for w in data.wallets)
+    )
+
+
+def get_wallet_average_load_price(data, match, query, body) -> Response:
+    wallet = data.wallet(query.get("wallet_id"))
+    if wallet is None:
+        return _not_found("Wallet")
+
+    buys = [t for t in data.transactions[wallet["id"]] if t["value"] > 0]
+    amount = sum(t["value"] for t in buys)
+    cost = sum(
+        t["value"] * data.price(wallet["currency_id"], _parse_dt(t["created_at"]))
+        for t in buys
+    )
+    price = cost / amount * data.preferred["dollar_rate"] if amount else None
+    return 200, {"average_load_price": price, "base_currency": data.preferred}
+
+
+def get_wallet_history(data, match, query, body) -> Response:
+    wallets = data.wallets
+    if query.get("wallet_id"):
+        wallets = [w for w in wallets if w["id"] == query["wallet_id"]]
+        if not wallets:
+            return _not_found("Wallet")
+
+    histories = [
+        _history(data, data.transactions[w["id"]], w["currency_id"], query)
+        for w in wallets
+    ]
+    return 200, [
+        {
+            "timestamp": points[0]["timestamp"],
+            "balance": sum(p["balance"] for p in points),
+        }
+        for points in zip(*histories)
+    ]
+
+
+# transactions and transfers
+
+
+def get_transactions(data, match, query, body) -> Response:
+    if query.get("wallet_id"):
+        transactions = data.transactions.get(query["wallet_id"], [])
+    else:
+        transactions = [t for ts in data.transactions.values() for t in ts]
+    transactions = sorted(transactions, key=lambda t: t["created_at"], reverse=True)
+
+    limit, page = int(query.get("limit", 25)), int(query.get("page", 1))
+    return 200, {
+        "transactions": transactions[(page - 1) * limit : page * limit],
+        "total": len(transactions),
+    }
+
+
+def create_transaction(data, match, query, body) -> Response:
+    wallet = data.wallet(body.get("wallet_id"))
+    if wallet is None:
+        return _not_found("Wallet")
+
+    transaction = _add_transaction(
+        data,
+        _new_id(),
+        wallet,
+        float(body["value"]),
+        body.get("description") or "",
+        _parse_dt(body.get("created_at")),
+        body.get("dollar_rate"),
+    )
+
+    accumulation = data.accumulation(body.get("accumulation_id") or "")
+    if accumulation is not None:
+        keys = ("id", "value", "description", "wallet_id", "created_at", "updated_at")
+        accumulation["entries"].append({k: transaction[k] for k in keys})
+
+    return 201, transaction
+
+
+def revert_transaction(data, match, query, body) -> Response:
+    transaction = next(
+        (t for ts in data.transactions.values() for t in ts if t["id"] == match["id"]),
+        None,
+    )
+    if transaction is None:
+        return _not_found("Transaction")
+
+    wallet = data.wallet(transaction["wallet_id"])
+    reverted = _add_transaction(
+        data,
+        _new_id(),
+        wallet,
+        -transaction["value"],
+        f"Revert of: {transaction['description']}",
+        END,
+    )
+    return 201, reverted
+
+
+def create_transfer(data, match, query, body) -> Response:
+    source = data.wallet(body.get("from_wallet_id"))
+    target = data.wallet(body.get("to_wallet_id"))
+    if source is None or target is None:
+        return _not_found("Wallet")
+
+    value = float(body["value"])
+    fee = float(body.get("static_fee") or 0)
+    fee += value * float(body.get("percentual_fee") or 0)
+
+    received = value * target["currency"]["dollar_rate"]
+    received /= source["currency"]["dollar_rate"]
+
+    _add_transaction(data, _new_id(), source, -(value + fee), "Transfer", END)
+    _add_transaction(data, _new_id(), target, received, "Transfer", END)
+    return 201, {"id": _new_id()}
+
+
+# portfolios
+
+
+def _portfolio_wallets(data: Dataset, portfolio: dict) -> List[dict]:
+    children = [p for p in data.portfolios if p["parent_id"] == portfolio["id"]]
+    wallets = list(portfolio["wallets"])
+    for child in children:
+        wallets += _portfolio_wallets(data, child)
+    return wallets
+
+
+def _portfolio_balance(data: Dataset, portfolio: dict) -> float:
+    wallets = _portfolio_wallets(data, portfolio)
+    return sum(data.change(w["currency_id"], w["balance"]) for w in wallets)
+
+
+def get_portfolios(data, match, query, body) -> Response:
+    parent_id = match["id"]
+    if parent_id and data.portfolio(parent_id) is None:
+        return _not_found("Portfolio")
+
+    if match["all"] and not parent_id:
+        return 200, data.portfolios
+
+    children = [p for p in data.portfolios if p["parent_id"] == parent_id]
+    if match["all"]:  # every descendant
+        i = 0
+        while i < len(children):
+            children += [
+                p for p in data.portfolios if p["parent_id"] == children[i]["id"]
+            ]
+            i += 1
+    return 200, children
+
+
+def get_portfolio(data, match, query, body) -> Response:
+    portfolio = data.portfolio(match["id"])
+    if portfolio is None:
+        return _not_found("Portfolio")
+
+    children = [p for p in data.portfolios if p["parent_id"] == portfolio["id"]]
+    parent = data.portfolio(portfolio["parent_id"]) if portfolio["parent_id"] else None
+    return 200, {**portfolio, "children": children, "parent": parent}
+
+
+def _set_portfolio(data: Dataset, portfolio: dict, body: dict) -> None:
+    for key in ("alias", "weight", "parent_id"):
+        if key in body:
+            portfolio[key] = body[key]
+    if body.get("wallet_ids") is not None:
+        wallet_ids = set(map(str, body["wallet_ids"]))
+        portfolio["wallets"] = [w for w in data.wallets if w["id"] in wallet_ids]
+
+
+def create_portfolio(data, match, query, body) -> Response:
+    portfolio = _add_portfolio(data, _new_id(), body.get("alias"), 0)
+    _set_portfolio(data, portfolio, body)
+    return 201, portfolio
+
+
+def edit_portfolio(data, match, query, body) -> Response:
+    portfolio = data.portfolio(match["id"])
+    if portfolio is None:
+        return _not_found("Portfolio")
+
+    _set_portfolio(data, portfolio, body)
+    return 200, portfolio
+
+
+def delete_portfolio(data, match, query, body) -> Response:
+    portfolio = data.portfolio(match["id"])
+    if portfolio is None:
+        return _not_found("Portfolio")
+
+    data.portfolios.remove(portfolio)
+    for child in data.portfolios:
+        if child["parent_id"] == portfolio["id"]:
+            child["parent_id"] = portfolio["parent_id"]
+    return 200, portfolio
+
+
+def get_portfolios_balance(data, match, query, body) -> Response:
+    portfolio = data.portfolio(query.get("portfolio_id"))
+    if portfolio is None:
+        return get_total_balance(data, match, query, body)
+    return _balance(data, _portfolio_balance(data, portfolio))
+
+
+def get_portfolio_rebalance(data, match, query, body) -> Response:
+    parent = data.portfolio(match["id"])
+    if parent is None:
+        return _not_found("Portfolio")
+
+    total = _portfolio_balance(data, parent)
+    changes = []
+    for child in [p for p in data.portfolios if p["parent_id"] == parent["id"]]:
+        actual = _portfolio_balance(data, child)
+        target = total * child["weight"]
+        changes.append(
+            {
+                "portfolio": child,
+                "wallets": _portfolio_wallets(data, child),
+                "target": target,
+                "actual": actual,
+                "weight": child["weight"],
+                "off_by": (actual - target) / target if target else 0,
+                "action": {
+                    "type": "buy" if actual < target else "sell",
+                    "amount": abs(target - actual),
+                },
+            }
+        )
+    return 200, {"changes": changes, "currency": data.preferred}
+
+
+# accumulations
+
+
+def get_accumulations(data, match, query, body) -> Response:
+    asset_id = query.get("asset_id")
+    return 200, [a for a in data.accumulations if asset_id in (None, a["asset_id"])]
+
+
+def get_next_accumulation_entry(data, match, query, body) -> Response:
+    accumulation = data.accumulation(match["id"])
+    if accumulation is None:
+        return _not_found("Accumulation")
+
+    asset = data.asset(accumulation["asset_id"])
+    entry = len(accumulation["entries"]) + 1
+    current = sum(e["value"] for e in accumulation["entries"])
+    target = accumulation["quote"] * entry * asset["currency"]["dollar_rate"]
+    every = timedelta(**{k: v for k, v in accumulation["every"].items() if v})
+    return 200, {
+        "entry": entry,
+        "amount": target - current,
+        "current": current,
+        "target": target,
+        "date": _ts(_parse_dt(accumulation["planned_start"]) + every * (entry - 1)),
+    }
+
+
+def create_accumulation(data, match, query, body) -> Response:
+    if data.asset(body.get("asset_id")) is None:
+        return _not_found("Asset")
+
+    keys = ("alias", "strategy", "quote", "planned_entries", "every", "asset_id")
+    accumulation = {
+        "id": _new_id(),
+        **{k: body.get(k) for k in keys},
+        "planned_start": _ts(_parse_dt(body.get("planned_start"))),
+        "planned_end": _ts(_parse_dt(body.get("planned_end"))),
+        "created_at": _ts(END),
+        "updated_at": _ts(END),
+        "entries": [],
+    }
+    data.accumulations.append(accumulation)
+    return 201, accumulation
+
+
+def delete_accumulation(data, match, query, body) -> Response:
+    accumulation = data.accumulation(match["id"])
+    if accumulation is None:
+        return _not_found("Accumulation")
+
+    data.accumulations.remove(accumulation)
+    return 200, accumulation
+
+
+# assets
+
+
+def get_assets(data, match, query, body) -> Response:
+    return 200, data.assets
+
+
+def _average_load_price(data: Dataset, asset: dict) -> Optional[float]:
+    buys = [e for e in asset["entries"] if e["value"] > 0]
+    amount = sum(e["value"] for e in buys)
+    cost = sum(e["value"] / e["dollar_rate"] for e in buys)
+    return cost / amount * data.preferred["dollar_rate"] if amount else None
+
+
+def get_asset_average_load_price(data, match, query, body) -> Response:
+    asset = data.asset(query.get("asset_id"))
+    if asset is None:
+        return _not_found("Asset")
+    return 200, {"average_load_price": _average_load_price(data, asset)}
+
+
+def get_asset_balance(data, match, query, body) -> Response:
+    asset = data.asset(query.get("asset_id"))
+    if asset is None:
+        return _not_found("Asset")
+    return _balance(data, data.change(asset["currency_id"], asset["balance"]))
+
+
+def get_total_asset_balance(data, match, query, body) -> Response:
+    return _balance(
+        data, sum(data.change(a["currency_id"], a["balance"]) for a in data.assets)
+    )
+
+
+def get_asset_allocations(data, match, query, body) -> Response:
+    balances = [data.change(a["currency_id"], a["balance"]) for a in data.assets]
+    total = sum(balances)
+    return 200, [
+        {"balance": b, "allocation": b / total if total else 0, "asset": a}
+        for a, b in zip(data.assets, balances)
+    ]
+
+
+def get_asset_history(data, match, query, body) -> Response:
+    asset = data.asset(query.get("asset_id"))
+    if asset is None:
+        return _not_found("Asset")
+    return 200, _history(data, asset["entries"], asset["currency_id"], query)
+
+
+def get_capital_gain(data, match, query, body) -> Response:
+    asset = data.asset(query.get("asset_id"))
+    if asset is None:
+        return _not_found("Asset")
+
+    current = data.change(asset["currency_id"], 1)
+    basis = _average_load_price(data, asset) or 0
+    return 200, {
+        "current_price": current,
+        "basis_price": basis,
+        "gain_amount": (current - basis) * asset["balance"],
+        "gain_rate": (current - basis) / basis if basis else 0,
+    }
+
+
+# investments
+
+
+def get_investments(data, match, query, body) -> Response:
+    return 200, data.investments
+
+
+def create_investment(data, match, query, body) -> Response:
+    investment = {
+        "id": _new_id(),
+        "alias": body.get("alias"),
+        "status": "created",
+        "created_at": _ts(END),
+        "updated_at": _ts(END),
+        "entries": [],
+    }
+    data.investments.append(investment)
+    return 201, investment
+
+
+ID = r"(?P<id>[0-9a-fA-F-]{36})"
+
+ROUTES: List[Tuple[str, str, Handler]] = [
+    ("POST", r"/users/sessions", login),
+    ("POST", r"/users", register),
+    ("GET", r"/users/settings", get_settings),
+    ("PUT", r"/users/settings", set_settings),
+    ("GET", r"/currencies", get_currencies),
+    ("POST", r"/currencies/rate/sync", sync_currencies),
+    ("GET", r"/currencies/(?P<id>[^/]+)/klines", get_klines),
+    ("GET", r"/wallets", get_wallets),
+    ("POST", r"/wallets", create_wallet),
+    ("GET", r"/wallets/balance", get_wallet_balance),
+    ("GET", r"/wallets/total-balance", get_total_balance),
+    ("GET", r"/wallets/average-load-price", get_wallet_average_load_price),
+    ("GET", rf"/wallets/{ID}", get_wallet),
+    ("PATCH", rf"/wallets/{ID}", update_wallet),
+    ("DELETE", rf"/wallets/{ID}", delete_wallet),
+    ("GET", r"/wallets-balances/history", get_wallet_history),
+    ("GET", r"/transactions", get_transactions),
+    ("POST", r"/transactions", create_transaction),
+    ("POST", rf"/transactions/{ID}/revert", revert_transaction),
+    ("POST", r"/transfers", create_transfer),
+    ("GET", r"/portfolios/balance", get_portfolios_balance),
+    ("GET", rf"/portfolios(?:/{ID})?(?P<all>/all)?", get_portfolios),
+    ("GET", rf"/portfolios/{ID}/details", get_portfolio),
+    ("GET", rf"/portfolios/{ID}/rebalance", get_portfolio_rebalance),
+    ("POST", r"/portfolios", create_portfolio),
+    ("PUT", rf"/portfolios/{ID}", edit_portfolio),
+    ("DELETE", rf"/portfolios/{ID}", delete_portfolio),
+    ("GET", r"/accumulations", get_accumulations),
+    ("POST", r"/accumulations", create_accumulation),
+    ("GET", rf"/accumulations/{ID}/next-entry", get_next_accumulation_entry),
+    ("DELETE", rf"/accumulations/{ID}", delete_accumulation),
+    ("GET", r"/assets", get_assets),
+    ("GET", r"/assets/average-load-price", get_asset_average_load_price),
+    ("GET", r"/assets/balance", get_asset_balance),
+    ("GET", r"/assets/total-balance", get_total_asset_balance),
+    ("GET", r"/assets/allocations", get_asset_allocations),
+    ("GET", r"/assets/history", get_asset_history),
+    ("GET", r"/assets/capital-gain", get_capital_gain),
+    ("GET", r"/investments", get_investments),
+    ("POST", r"/investments", create_investment),
+]
+
+_ROUTES = [(m, re.compile(p), h) for m, p, h in ROUTES]
+
+
+@dataclass
+class Faults:
+    """
+    Network conditions of the fake server. Latency and jitter are in
+    seconds, bandwidth in bytes per second (None for unlimited) and
+    `error_rate` is the fraction of requests answered with one of `errors`:
+    an HTTP status, or "drop" to close the connection without a response.
+    """
+
+    latency: float = 0
+    jitter: float = 0
+    bandwidth: Optional[float] = None
+    error_rate: float = 0
+    errors: Tuple = (500, 502, 503, 429, "drop")
+    retry_after: int = 1
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+        self.lock = threading.Lock()
+
+    def delay(self) -> float:
+        with self.lock:
+            return max(self.latency + self.rng.uniform(-1, 1) * self.jitter, 0)
+
+    def error(self):
+        with self.lock:
+            if self.error_rate and self.rng.random() < self.error_rate:
+                return self.rng.choice(self.errors)
+        return None
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self, method: str) -> None:
+        url = urlsplit(self.path)
+        path = re.sub("/+", "/", url.path).rstrip("/") or "/"
+        query = dict(parse_qsl(url.query))
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+
+        with self.server.lock:
+            self.server.requests[(method, path)] += 1
+
+        faults = self.server.faults
+        time.sleep(faults.delay())
+
+        error = faults.error()
+        if error == "drop":
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        if error:
+            return self._send_error(error)
+
+        for route_method, pattern, handler in _ROUTES:
+            match = pattern.fullmatch(path)
+            if route_method == method and match:
+                with self.server.dataset.lock:
+                    status, payload = handler(self.server.dataset, match, query, body)
+                break
+        else:
+            status, payload = 404, {"message": f"Cannot {method} {path}"}
+
+        self._send(status, json.dumps(payload).encode())
+
+    def _send_error(self, status: int) -> None:
+        if status == 502:  # as a proxy in front of a dead server would
+            content = b"<html><body><h1>502 Bad Gateway</h1></body></html>"
+            return self._send(status, content, content_type="text/html")
+
+        headers = {"Retry-After": str(self.server.faults.retry_after)}
+        content = json.dumps({"message": f"Injected error {status}"}).encode()
+        self._send(status, content, headers=headers if status in (429, 503) else {})
+
+    def _send(
+        self,
+        status: int,
+        content: bytes,
+        content_type: str = "application/json",
+        headers: Optional[dict] = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+        bandwidth = self.server.faults.bandwidth
+        if not bandwidth:
+            self.wfile.write(content)
+            return
+
+        chunk = max(int(bandwidth / 20), 1)  # 50ms worth of bytes
+        for i in range(0, len(content), chunk):
+            self.wfile.write(content[i : i + chunk])
+            time.sleep(len(content[i : i + chunk]) / bandwidth)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, dataset: Dataset, faults: Faults):
+        super().__init__(address, _RequestHandler)
+        self.dataset = dataset
+        self.faults = faults
+        self.lock = threading.Lock()
+        self.requests: Counter = Counter()
+
+
+class FakeAPI:
+    """
+    Serve `dataset` on localhost from a background thread, as a context
+    manager. `port=0` picks a free port. `faults` can be changed while the
+    server runs.
+    """
+
+    def __init__(
+        self,
+        dataset: Dataset,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        faults: Optional[Faults] = None,
+    ):
+        self.server = _Server((host, port), dataset, faults or Faults())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> Counter:
+        """
+        Requests received, by method and path.
+        """
+        return self.server.requests
+
+    @property
+    def faults(self) -> Faults:
+        return self.server.faults
+
+    @faults.setter
+    def faults(self, faults: Faults) -> None:
+        self.server.faults = faults
+
+    def start(self) -> "FakeAPI":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "FakeAPI":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=3333, show_default=True)
+@click.option("--wallets", type=int, default=5, show_default=True)
+@click.option("--transactions", type=int, default=50, show_default=True)
+@click.option("--portfolios", type=int, default=3, show_default=True)
+@click.option("--years", type=int, default=2, show_default=True)
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option("--latency", type=float, default=0, help="Seconds per request.")
+@click.option("--jitter", type=float, default=0, help="Seconds, +/- on latency.")
+@click.option("--bandwidth", type=float, help="Bytes per second.")
+@click.option("--error-rate", type=float, default=0, help="Fraction of requests.")
+def main(
+    host,
+    port,
+    wallets,
+    transactions,
+    portfolios,
+    years,
+    seed,
+    latency,
+    jitter,
+    bandwidth,
+    error_rate,
+):
+    """
+    Serve a synthetic Wellets account until interrupted.
+    """
+    dataset = generate(wallets, transactions, portfolios, years, seed)
+    faults = Faults(latency, jitter, bandwidth, error_rate, seed=seed)
+
+    with FakeAPI(dataset, host, port, faults) as server:
+        click.echo(f"Serving on {server.url}, use WELLETS_API_URL={server.url}")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
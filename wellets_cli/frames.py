@@ -0,0 +1,138 @@
+"""
+Account data as Arrow tables or pandas DataFrames.
+
+Tables are built column by column straight from the JSON bodies returned by
+the API (or the local klines cache), without creating a model per row. pandas
+frames are converted from the Arrow tables, which is zero-copy for numeric
+columns without nulls.
+
+pyarrow (and pandas, for DataFrames) are optional dependencies:
+
+    from wellets_cli import frames
+
+    df = frames.transactions(headers, wallet_id=wallet_id).to_pandas()
+"""
+
+import json
+from typing import Iterable, List, Optional
+
+import wellets_cli.api as api
+import wellets_cli.cache as cache
+from wellets_cli.export import COLUMNS, Columns
+
+KLINES_COLUMNS: Columns = [
+    ("open_time", "timestamp"),
+    ("open_price", "float"),
+    ("high_price", "float"),
+    ("low_price", "float"),
+    ("close_price", "float"),
+    ("volume", "float"),
+]
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError(
+            "wellets_cli.frames requires pyarrow, install it with "
+            "`pip install wellets_cli[parquet]`"
+        )
+    return pa
+
+
+def table(rows: List[dict], columns: Columns, **constants):
+    """
+    Build an Arrow table with `columns` from JSON `rows`, one pass per column.
+    `constants` fill columns missing from the rows (e.g. a parent id).
+    """
+    pa = _pyarrow()
+
+    types = {
+        "string": pa.string(),
+        "float": pa.float64(),
+        "int": pa.int64(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+
+    arrays = []
+    for name, kind in columns:
+        if name in constants:
+            values = [constants[name]] * len(rows)
+        else:
+            values = [row.get(name) for row in rows]
+
+        if kind == "timestamp":
+            # ISO strings are parsed by Arrow, not in Python
+            arrays.append(pa.array(values, pa.string()).cast(types[kind]))
+        else:
+            arrays.append(pa.array(values, types[kind]))
+
+    return pa.Table.from_arrays(arrays, names=[name for name, _ in columns])
+
+
+def _concat(tables: Iterable, columns: Columns):
+    pa = _pyarrow()
+    tables = list(tables)
+    return pa.concat_tables(tables) if tables else table([], columns)
+
+
+def wallets(headers: dict):
+    rows = json.loads(api.get_json("/wallets", headers=headers))["wallets"]
+    return table(rows, COLUMNS["wallets"])
+
+
+def transactions(headers: dict, wallet_id: Optional[str] = None, page_size: int = 1000):
+    """
+    All transactions (of `wallet_id`, if given), one table chunk per page.
+    """
+
+    def pages():
+        page = 1
+        while True:
+            params = {"limit": page_size, "page": page}
+            if wallet_id:
+                params["wallet_id"] = wallet_id
+
+            body = api.get_json("/transactions/", headers=headers, params=params)
+            rows = json.loads(body)["transactions"]
+
+            yield table(rows, COLUMNS["transactions"])
+
+            if len(rows) < page_size:
+                return
+            page += 1
+
+    return _concat(pages(), COLUMNS["transactions"])
+
+
+def asset_entries(headers: dict):
+    assets = json.loads(api.get_json("/assets", headers=headers))
+    columns = COLUMNS["asset_entries"]
+
+    return _concat(
+        (
+            table(a["entries"], columns, asset_id=a["id"], currency_id=a["currency_id"])
+            for a in assets
+        ),
+        columns,
+    )
+
+
+def klines(
+    currency_id: str, start_time: str, end_time: str, headers: dict, interval="1d"
+):
+    """
+    Klines of a currency from the local cache (fetching what is missing).
+    Dates are `yyyy-mm-dd` strings.
+    """
+    rows = cache.get_currency_history_json(
+        {
+            "currency_id": currency_id,
+            "interval": interval,
+            "start_time": start_time,
+            "end_time": end_time,
+        },
+        headers=headers,
+    )
+    return table(rows, KLINES_COLUMNS)
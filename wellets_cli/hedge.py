@@ -0,0 +1,168 @@
+"""
+Hedged GET requests.
+
+With WELLETS_HEDGE set, a GET that has not been answered by the 95th
+percentile latency of its endpoint is sent a second time, and whichever
+response arrives first is used. The latencies of the last requests of each
+endpoint (its path, ids replaced) are kept in the state directory, so the
+deadlines carry over from one command to the next; an endpoint is hedged
+once it has `MIN_SAMPLES` of them. At most one extra request is sent, and
+only for the slowest ~5% of requests. The deadline runs from when the request
+is actually sent, so requests queued behind a busy pool are not hedged.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from wellets_cli.config import settings
+
+PERCENTILE = 0.95
+SAMPLES = 200  # latencies kept per endpoint
+MIN_SAMPLES = 20
+MIN_DEADLINE = 0.05  # seconds, below this a duplicate is not worth it
+
+_ID = re.compile(r"/([0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|\d+)(?=/|$)")
+
+
+def endpoint(url: str) -> str:
+    """
+    Path of `url` with ids replaced, e.g. `/wallets/{id}`.
+    """
+    return _ID.sub("/{id}", urlsplit(url).path.rstrip("/") or "/")
+
+
+class LatencyStats:
+    """
+    Latencies of the last requests by endpoint, saved as JSON at exit.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._samples: Optional[Dict[str, List[float]]] = None
+
+    def _load(self) -> Dict[str, List[float]]:
+        if self._samples is None:
+            try:
+                with open(self.path) as f:
+                    self._samples = json.load(f)
+            except (OSError, ValueError):
+                self._samples = {}
+            atexit.register(self.save)
+        return self._samples
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._load().setdefault(endpoint, [])
+            samples.append(round(seconds, 4))
+            del samples[:-SAMPLES]
+
+    def deadline(self, endpoint: str) -> Optional[float]:
+        """
+        The p95 latency of `endpoint`, None while it has too few samples.
+        """
+        with self._lock:
+            samples = sorted(self._load().get(endpoint, []))
+
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return max(samples[int(PERCENTILE * (len(samples) - 1))], MIN_DEADLINE)
+
+    def save(self) -> None:
+        with self._lock:
+            if self._samples is None:
+                return
+            content = json.dumps(self._samples)
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(content)
+            tmp.replace(self.path)
+        except OSError:
+            pass  # stats are an optimization, never fail a command on them
+
+
+_lock = threading.Lock()
+_stats: Dict[Path, LatencyStats] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def latency_stats() -> LatencyStats:
+    path = settings.state_dir / "latency.json"
+    with _lock:
+        if path not in _stats:
+            _stats[path] = LatencyStats(path)
+        return _stats[path]
+
+
+def _submit(fn: Callable) -> Future:
+    global _executor
+
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+    # run in a copy of the caller's context, for tracing
+    return _executor.submit(contextvars.copy_context().run, fn)
+
+
+def _discard(future: Future) -> None:
+    if future.exception() is None:
+        future.result().close()
+
+
+def send(
+    send: Callable[..., requests.Response], method: str, url: str, **kwargs
+) -> requests.Response:
+    """
+    Send a request with `send`, and once more if it is not answered by the
+    deadline of its endpoint, returning the first response.
+    """
+    stats, key = latency_stats(), endpoint(url)
+    deadline = stats.deadline(key)
+
+    started = threading.Event()
+
+    def attempt() -> requests.Response:
+        start = time.perf_counter()
+        started.set()
+        response = send(method, url, **kwargs)
+        response.content  # a response is in once its body is
+        stats.record(key, time.perf_counter() - start)
+        return response
+
+    if deadline is None:
+        return attempt()
+
+    primary = _submit(attempt)
+    # time the primary from when it is sent, not while it waits for a worker
+    # (which a hedge would have to wait for as well)
+    started.wait()
+    done, _ = wait([primary], timeout=deadline)
+    if done:
+        return primary.result()
+
+    futures = [primary, _submit(attempt)]
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in futures:
+                    if other is not future:
+                        other.add_done_callback(_discard)
+                return future.result()
+
+    return primary.result()  # both failed, raise the first error
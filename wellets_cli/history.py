@@ -0,0 +1,336 @@
+"""
+Local balance history engine.
+
+Balance curves are rebuilt on the client from signed movements (wallet
+transactions, asset entries): movements are bucketed on a time index and the
+buckets are accumulated with a cumulative sum, so any range and interval costs
+a single pass over the movements instead of a request per view.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+import wellets_cli.api as api
+import wellets_cli.cache as cache
+from wellets_cli.interval import parse_interval
+from wellets_cli.model import Asset, Currency, KLines, Transaction, Wallet
+
+
+class Curve(NamedTuple):
+    timestamp: np.ndarray  # datetime64[s], UTC
+    balance: np.ndarray
+
+
+class Movements(NamedTuple):
+    keys: List[str]  # one key per series
+    timestamp: np.ndarray  # datetime64[s], UTC
+    value: np.ndarray
+    series: np.ndarray  # position in `keys` of each movement
+    initial: np.ndarray  # opening balance of each series
+
+
+def to_utc(dt: datetime) -> datetime:
+    """
+    Convert `dt` to a naive UTC datetime. Naive datetimes are local time.
+    """
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def to_datetime64(dts: Iterable[datetime]) -> np.ndarray:
+    return np.array([to_utc(dt) for dt in dts], dtype="datetime64[s]")
+
+
+def time_index(start: datetime, end: datetime, interval: str) -> np.ndarray:
+    """
+    Return the sampling points `start, start + interval, ...` up to `end`.
+    """
+    delta = parse_interval(interval)
+    start, end = to_utc(start), to_utc(end)
+
+    if end < start:
+        raise ValueError("End date should not precede start date")
+
+    if not delta.years and not delta.months:
+        step = timedelta(
+            days=delta.days,
+            hours=delta.hours,
+            minutes=delta.minutes,
+            seconds=delta.seconds,
+        )
+        return np.arange(
+            np.datetime64(start, "s"),
+            np.datetime64(end, "s") + 1,
+            np.timedelta64(step),
+        ).astype("datetime64[s]")
+
+    # calendar intervals have a variable length, so they are expanded stepwise
+    index = []
+    i = 0
+    while start + i * delta <= end:
+        index.append(start + i * delta)
+        i += 1
+
+    return np.array(index, dtype="datetime64[s]")
+
+
+def bucket_totals(
+    timestamp: np.ndarray,
+    value: np.ndarray,
+    series: np.ndarray,
+    n_series: int,
+    index: np.ndarray,
+) -> np.ndarray:
+    """
+    Return a `(n_series, len(index))` matrix with the sum of the movements of
+    each series falling in each bucket of `index`.
+
+    A movement at time `t` is assigned to the first index point `>= t`
+    (movements before the index fall in the first bucket, movements after it
+    are dropped). All series are binned with a single `bincount`.
+    """
+    n = len(index)
+
+    bucket = np.searchsorted(index, timestamp, side="left")
+    flat = np.asarray(series, dtype=np.intp) * (n + 1) + bucket
+    totals = np.bincount(flat, weights=value, minlength=n_series * (n + 1))
+
+    return totals.reshape(n_series, n + 1)[:, :n]
+
+
+def cumulative_balances(
+    timestamp: np.ndarray,
+    value: np.ndarray,
+    series: np.ndarray,
+    n_series: int,
+    index: np.ndarray,
+    initial: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Return a `(n_series, len(index))` matrix with the balance of each series
+    at each point of `index` given signed movements: bucket totals
+    accumulated along the time axis.
+    """
+    totals = bucket_totals(timestamp, value, series, n_series, index)
+    balances = np.cumsum(totals, axis=1)
+
+    if initial is not None:
+        balances += np.asarray(initial, dtype=float)[:, None]
+
+    return balances
+
+
+def cumulative_balance(
+    timestamp: np.ndarray,
+    value: np.ndarray,
+    index: np.ndarray,
+    initial: float = 0.0,
+) -> np.ndarray:
+    """
+    Return the balance at each point of `index` given signed movements.
+    """
+    series = np.zeros(len(timestamp), dtype=np.intp)
+    return cumulative_balances(
+        timestamp, value, series, 1, index, initial=np.array([initial])
+    )[0]
+
+
+def wallet_history(
+    transactions: List[Transaction],
+    index: np.ndarray,
+    balance: Optional[float] = None,
+) -> Curve:
+    """
+    Rebuild a wallet balance curve on `index` from its transactions.
+
+    When the current wallet `balance` is given the curve is anchored to it,
+    so that manual balance edits (which create no transaction) are accounted
+    as an opening balance.
+    """
+    timestamp = to_datetime64(t.created_at for t in transactions)
+    value = np.array([t.value for t in transactions], dtype=float)
+
+    initial = 0.0 if balance is None else balance - value.sum()
+
+    return Curve(index, cumulative_balance(timestamp, value, index, initial))
+
+
+def asset_movements(assets: List[Asset]) -> Movements:
+    """
+    Collect the entries of `assets` as movements, one series per asset.
+
+    As for wallets, each series is anchored to the current asset balance.
+    """
+    entries = [(i, e) for i, a in enumerate(assets) for e in a.entries]
+
+    timestamp = to_datetime64(e.created_at for _, e in entries)
+    value = np.array([e.value for _, e in entries], dtype=float)
+    series = np.array([i for i, _ in entries], dtype=np.intp)
+
+    total = np.bincount(series, weights=value, minlength=len(assets))
+    initial = np.array([a.balance for a in assets], dtype=float) - total
+
+    return Movements([a.id for a in assets], timestamp, value, series, initial)
+
+
+def wallet_movements(
+    wallets: List[Wallet], transactions: List[Transaction]
+) -> Movements:
+    """
+    Collect the transactions of `wallets` as movements, one series per
+    currency (keys are currency ids): the value of a set of wallets only
+    depends on the amount held in each currency.
+    """
+    currency_ids = sorted({w.currency_id for w in wallets})
+    currency_pos = {c: i for i, c in enumerate(currency_ids)}
+    wallet_pos = {w.id: currency_pos[w.currency_id] for w in wallets}
+
+    transactions = [t for t in transactions if t.wallet_id in wallet_pos]
+
+    timestamp = to_datetime64(t.created_at for t in transactions)
+    value = np.array([t.value for t in transactions], dtype=float)
+    series = np.array([wallet_pos[t.wallet_id] for t in transactions], dtype=np.intp)
+
+    n_currencies = len(currency_ids)
+    total = np.bincount(series, weights=value, minlength=n_currencies)
+    initial = (
+        np.bincount(
+            np.array([currency_pos[w.currency_id] for w in wallets], dtype=np.intp),
+            weights=np.array([w.balance for w in wallets], dtype=float),
+            minlength=n_currencies,
+        )
+        - total
+    )
+
+    return Movements(currency_ids, timestamp, value, series, initial)
+
+
+def movements_balances(movements: Movements, index: np.ndarray) -> np.ndarray:
+    return cumulative_balances(
+        movements.timestamp,
+        movements.value,
+        movements.series,
+        len(movements.keys),
+        index,
+        initial=movements.initial,
+    )
+
+
+def asset_history(assets: List[Asset], index: np.ndarray) -> np.ndarray:
+    """
+    Rebuild the balance curves of all `assets` on `index` from their entries.
+
+    Returns a `(len(assets), len(index))` matrix.
+    """
+    return movements_balances(asset_movements(assets), index)
+
+
+def nearest(timestamp: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """
+    Return, for each point of `index`, the position of the nearest value in
+    the sorted, non-empty `timestamp` array (binary search on both sides).
+    """
+    right = np.clip(
+        np.searchsorted(timestamp, index, side="left"), 0, len(timestamp) - 1
+    )
+    left = np.clip(right - 1, 0, len(timestamp) - 1)
+
+    closer_left = np.abs(index - timestamp[left]) <= np.abs(timestamp[right] - index)
+    return np.where(closer_left, left, right)
+
+
+def price_history(klines: List[KLines], index: np.ndarray) -> np.ndarray:
+    """
+    Return the dollar price on `index` from `klines`, using the close price of
+    the candle nearest to each point.
+    """
+    if len(klines) == 0:
+        return np.full(len(index), np.nan)
+
+    open_time = to_datetime64(k.open_time for k in klines)
+    close_price = np.array([k.close_price for k in klines], dtype=float)
+
+    order = np.argsort(open_time, kind="stable")
+    open_time, close_price = open_time[order], close_price[order]
+
+    return close_price[nearest(open_time, index)]
+
+
+def currency_price_history(
+    currency: Currency, index: np.ndarray, headers: dict, interval: str = "1d"
+) -> np.ndarray:
+    """
+    Return the dollar price of `currency` on `index` from the cached klines,
+    falling back to the current dollar rate where no history is available.
+    """
+    if currency.acronym == "USD":
+        return np.ones(len(index))
+
+    klines = cache.get_currency_history(
+        {
+            "currency_id": currency.id,
+            "interval": interval,
+            "start_time": index[0].astype(datetime),
+            "end_time": index[-1].astype(datetime),
+        },
+        headers=headers,
+    )
+
+    price = price_history(klines, index)
+    return np.where(np.isnan(price), 1 / currency.dollar_rate, price)
+
+
+def value_history(
+    balance: np.ndarray, price: np.ndarray, base_price: np.ndarray
+) -> np.ndarray:
+    """
+    Convert balances into the base currency given both dollar prices on the
+    same index. Broadcasts over leading dimensions of `balance`.
+    """
+    return balance * price / base_price
+
+
+def currencies_price_history(
+    currencies: List[Currency], index: np.ndarray, headers: dict, interval: str = "1d"
+) -> np.ndarray:
+    """
+    Return a `(len(currencies), len(index))` matrix of dollar prices.
+    """
+    return np.array(
+        [currency_price_history(c, index, headers, interval) for c in currencies]
+    ).reshape(len(currencies), len(index))
+
+
+def get_wallets_transactions(
+    wallets: List[Wallet], headers: dict, max_workers: int = 8
+) -> List[Transaction]:
+    """
+    Fetch the transactions of all `wallets`, a few wallets at a time.
+    """
+
+    def fetch(wallet: Wallet) -> List[Transaction]:
+        return list(api.iter_transactions({"wallet_id": wallet.id}, headers=headers))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return [t for ts in executor.map(fetch, wallets) for t in ts]
+
+
+def wallets_value_history(
+    wallets: List[Wallet],
+    transactions: List[Transaction],
+    index: np.ndarray,
+    prices: Dict[str, np.ndarray],
+    base_price: np.ndarray,
+) -> Curve:
+    """
+    Rebuild the total value of `wallets` on `index` in the base currency,
+    given the dollar `prices` of each currency id.
+    """
+    movements = wallet_movements(wallets, transactions)
+
+    balances = movements_balances(movements, index)
+    price = np.array([prices[c] for c in movements.keys]).reshape(len(balances), -1)
+
+    return Curve(index, value_history(balances, price, base_price).sum(axis=0))
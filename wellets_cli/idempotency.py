@@ -0,0 +1,115 @@
+"""
+Idempotency keys and journal for write calls.
+
+A write carrying an idempotency key is sent with an `Idempotency-Key` header
+and, once confirmed, its response is appended to a local journal (one per API
+and account). Replaying
+the same logical operation (same key) returns the journaled response instead
+of posting again, so bulk and retried writes never double-post.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from wellets_cli.auth import get_account
+from wellets_cli.config import settings
+
+HEADER = "Idempotency-Key"
+
+
+def idempotency_key(operation: str, *parts) -> str:
+    """
+    Deterministic key of a logical operation, e.g.
+    `idempotency_key("revert", transaction_id)`.
+    """
+    payload = json.dumps([operation, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class Journal:
+    """
+    Append-only journal of the responses of confirmed writes, by key.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, dict]] = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path.exists():
+                with open(self.path) as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue  # torn write of an interrupted run
+                        self._entries[entry["key"]] = entry["response"]
+        return self._entries
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._load().get(key)
+
+    def record(self, key: str, response: dict) -> None:
+        with self._lock:
+            self._load()[key] = response
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                entry = {
+                    "key": key,
+                    "at": datetime.now(timezone.utc).isoformat(),
+                    "response": response,
+                }
+                f.write(json.dumps(entry, default=str) + "\n")
+
+
+_journal: Optional[Journal] = None
+
+
+def get_journal(headers: dict) -> Journal:
+    """
+    Journal of the account the request `headers` authenticate, on the
+    configured API.
+    """
+    global _journal
+    token = headers.get("Authorization", "").removeprefix("Bearer ") or None
+    path = settings.account_state_dir(get_account(token)) / "journal.jsonl"
+    if _journal is None or _journal.path != path:
+        _journal = Journal(path)
+    return _journal
+
+
+def idempotent(
+    key: Optional[str], headers: dict, write: Callable[[dict], dict]
+) -> dict:
+    """
+    Run `write` (taking the request headers and returning the response body)
+    unless `key` has already been confirmed. Writes without a key always run.
+
+    Replayed runs (WELLETS_REPLAY) leave the journal alone: their responses
+    were never sent, and the recording run journaled its own keys.
+    """
+    if key is None:
+        return write(headers)
+
+    if settings.replay_path is not None:
+        return write({**headers, HEADER: key})
+
+    journal = get_journal(headers)
+
+    response = journal.get(key)
+    if response is not None:
+        return response
+
+    response = write({**headers, HEADER: key})
+    journal.record(key, response)
+
+    return response
@@ -0,0 +1,246 @@
+"""
+Bulk transaction import.
+
+Rows are streamed from a CSV or JSON Lines file, validated a batch at a time
+with the same validators as the interactive prompts and posted over a bounded
+pool of workers. Each posted row is appended to a checkpoint file, so an
+interrupted import resumes where it stopped.
+"""
+
+import csv
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from InquirerPy.validator import ValidationError
+from prompt_toolkit.document import Document
+
+from wellets_cli.model import Currency, Wallet
+from wellets_cli.validator import (
+    DateValidator,
+    EmptyInputValidator,
+    number_validator,
+    uuid_validator,
+)
+
+FORMATS = ["csv", "jsonl"]
+DATE_FMT = "%Y-%m-%d %H:%M"
+
+
+class InvalidRow(str):
+    """
+    A row that could not be read, as its error.
+    """
+
+
+Row = Tuple[int, Union[dict, InvalidRow]]  # line number, raw fields
+
+
+def detect_format(path: Path) -> str:
+    return "jsonl" if path.suffix.lower() in (".jsonl", ".ndjson") else "csv"
+
+
+def read_rows(path: Path, fmt: str) -> Iterator[Row]:
+    """
+    Stream the rows of `path`, numbered by line.
+    """
+    with open(path, newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for i, line in enumerate(f, start=1):
+                if line.strip():
+                    yield i, _parse_json_row(line)
+
+
+def _parse_json_row(line: str) -> Union[dict, InvalidRow]:
+    try:
+        row = json.loads(line)
+    except ValueError as e:
+        return InvalidRow(f"invalid JSON: {e}")
+    if not isinstance(row, dict):
+        return InvalidRow("invalid JSON: expected an object")
+    return row
+
+
+def count_rows(path: Path, fmt: str) -> int:
+    with open(path) as f:
+        n = sum(1 for line in f if line.strip())
+    return n - 1 if fmt == "csv" else n
+
+
+def batched(rows: Iterable[Row], n: int) -> Iterator[List[Row]]:
+    it = iter(rows)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
+class Checkpoint:
+    """
+    Append-only record of the rows already imported.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done: Set[int] = set()
+
+        if path.exists():
+            with open(path) as f:
+                self.done = {int(line) for line in f if line.strip()}
+
+        self._file = open(path, "a")
+
+    def mark(self, line: int) -> None:
+        self.done.add(line)
+        self._file.write(f"{line}\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _check(validator, text: str) -> Optional[str]:
+    if callable(validator):
+        outcome = validator(text)
+        return None if outcome is True else outcome
+    try:
+        validator.validate(Document(text))
+        return None
+    except ValidationError as e:
+        return str(e.message)
+
+
+class RowValidator:
+    """
+    Validate raw rows and turn them into transaction payloads.
+    """
+
+    def __init__(self, wallets: List[Wallet], currencies: List[Currency]):
+        self.wallets = {w.id: w for w in wallets}
+        self.aliases = {w.alias: w for w in wallets}
+        self.currencies = {c.id: c for c in currencies}
+        self.date_validator = DateValidator(date_fmt=DATE_FMT)
+
+    def _wallet(self, row: dict) -> Tuple[Optional[Wallet], Optional[str]]:
+        wallet_id = str(row.get("wallet_id") or "")
+        if wallet_id:
+            error = _check(uuid_validator, wallet_id)
+            if error:
+                return None, f"wallet_id: {error}"
+            if wallet_id not in self.wallets:
+                return None, f"wallet_id: unknown wallet '{wallet_id}'"
+            return self.wallets[wallet_id], None
+
+        alias = str(row.get("wallet") or row.get("wallet_alias") or "")
+        if alias not in self.aliases:
+            return None, f"wallet: unknown wallet '{alias}'"
+        return self.aliases[alias], None
+
+    def __call__(self, row: dict) -> Tuple[Optional[dict], Optional[str]]:
+        wallet, error = self._wallet(row)
+        if wallet is None:
+            return None, error
+
+        value = str(row.get("value", ""))
+        dollar_rate = str(row.get("dollar_rate") or "")
+        description = str(row.get("description") or "")
+        created_at = str(row.get("created_at") or "")
+
+        checks = [
+            ("value", EmptyInputValidator(), value),
+            ("value", number_validator, value),
+            ("description", EmptyInputValidator(), description),
+            ("created_at", EmptyInputValidator(), created_at),
+            ("created_at", self.date_validator, created_at),
+        ]
+        if dollar_rate:
+            checks.append(("dollar_rate", number_validator, dollar_rate))
+
+        for field, validator, text in checks:
+            error = _check(validator, text)
+            if error:
+                return None, f"{field}: {error}"
+
+        if dollar_rate:
+            rate = float(dollar_rate)
+        else:
+            rate = self.currencies[wallet.currency_id].dollar_rate
+
+        return {
+            "wallet_id": wallet.id,
+            "value": float(value),
+            "dollar_rate": rate,
+            "description": description,
+            "created_at": created_at,
+        }, None
+
+
+def import_rows(
+    rows: Iterable[Row],
+    validate: Callable[[dict], Tuple[Optional[dict], Optional[str]]],
+    post: Callable[[int, dict], None],
+    checkpoint: Optional[Checkpoint] = None,
+    batch_size: int = 100,
+    workers: int = 4,
+    on_row: Callable[[], None] = lambda: None,
+) -> Dict[int, str]:
+    """
+    Validate and post `rows` (with their line) a batch at a time. Rows in the
+    checkpoint are skipped, the others are marked once posted.
+
+    Returns the error of each failed row (validation or API), by line.
+    """
+    errors: Dict[int, str] = {}
+    done = set(checkpoint.done) if checkpoint else set()
+    lock = threading.Lock()
+
+    def post_row(line: int, data: dict) -> None:
+        try:
+            post(line, data)
+        except Exception as e:
+            with lock:
+                errors[line] = str(e)
+                on_row()
+        else:
+            with lock:
+                if checkpoint:
+                    checkpoint.mark(line)
+                on_row()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch in batched(rows, batch_size):
+            valid = []
+            for line, row in batch:
+                if line in done:
+                    on_row()
+                    continue
+                if isinstance(row, InvalidRow):
+                    errors[line] = str(row)
+                    on_row()
+                    continue
+                data, error = validate(row)
+                if error:
+                    errors[line] = error
+                    on_row()
+                else:
+                    valid.append((line, data))
+
+            # wait for the batch, so memory is bounded by the batch size
+            list(executor.map(lambda x: post_row(*x), valid))
+
+    return dict(sorted(errors.items()))
@@ -0,0 +1,33 @@
+"""
+History intervals.
+
+Kept apart from `wellets_cli.history` so that validating or listing intervals
+does not import numpy and the API client.
+"""
+
+from dateutil.relativedelta import relativedelta
+
+from wellets_cli.util import parse_duration
+
+INTERVALS = ["1h", "4h", "1d", "1w", "1M", "1y"]
+
+
+def parse_interval(interval: str) -> relativedelta:
+    """
+    Parse an interval string (e.g. '1d', '6h', '1M') into a relativedelta.
+    """
+    delta = relativedelta(**parse_duration(interval))
+
+    if delta == relativedelta():
+        raise ValueError(f"Interval '{interval}' should not be empty")
+
+    return delta
+
+
+def kline_interval(interval: str) -> str:
+    """
+    Return the klines interval to sample prices for a history `interval`.
+    """
+    delta = parse_interval(interval)
+    intraday = not (delta.years or delta.months or delta.days)
+    return "1h" if intraday else "1d"
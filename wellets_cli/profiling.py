@@ -0,0 +1,69 @@
+"""
+CPU and memory profiling of a command.
+
+`cpu` runs the command under cProfile and reports the functions with the
+highest cumulative time; `mem` runs it under tracemalloc and reports the
+lines holding the most memory at exit, with the peak. Either can also be
+saved (a `.prof` file for pstats/snakeviz, or a tracemalloc snapshot).
+"""
+
+import cProfile
+import io
+import pstats
+import tracemalloc
+from typing import Optional
+
+MODES = ["cpu", "mem"]
+
+
+class Profiler:
+    def __init__(self, mode: str, limit: int = 25, output: Optional[str] = None):
+        self.mode = mode
+        self.limit = limit
+        self.output = output
+        self.profile = cProfile.Profile()
+
+    def start(self) -> None:
+        if self.mode == "cpu":
+            self.profile.enable()
+        else:
+            tracemalloc.start(25)
+
+    def stop(self) -> str:
+        """
+        Stop profiling and return the report (saving the output, if any).
+        """
+        if self.mode == "cpu":
+            self.profile.disable()
+            return self._cpu_report()
+
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return self._mem_report(snapshot, peak)
+
+    def _cpu_report(self) -> str:
+        if self.output:
+            self.profile.dump_stats(self.output)
+
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(self.limit)
+        return out.getvalue()
+
+    def _mem_report(self, snapshot: tracemalloc.Snapshot, peak: int) -> str:
+        if self.output:
+            snapshot.dump(self.output)
+
+        snapshot = snapshot.filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ]
+        )
+        stats = snapshot.statistics("lineno")
+        total = sum(s.size for s in stats)
+
+        lines = [f"Peak {peak / 2**20:.1f} MiB, {total / 2**20:.1f} MiB at exit"]
+        lines += [str(s) for s in stats[: self.limit]]
+        return "\n".join(lines) + "\n"
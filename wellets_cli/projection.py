@@ -0,0 +1,180 @@
+"""
+Monte Carlo projection of a portfolio value.
+
+Future per-currency returns are drawn jointly (preserving correlations)
+either by bootstrapping historical periods or from a multivariate normal fit
+of historical log returns. Paths are simulated in fixed-size batches, each
+batch folding its values into fixed-size log-spaced histograms at the
+reporting checkpoints, so memory does not grow with the number of paths.
+Batches are independent and can be spread over a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+MODELS = ["bootstrap", "normal"]
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# value bins relative to the initial value, ~0.5% wide
+BINS = np.geomspace(1e-4, 1e4, 4001)
+
+
+class Projection(NamedTuple):
+    checkpoints: np.ndarray  # step of each checkpoint
+    percentiles: np.ndarray  # (n_checkpoints, len(PERCENTILES))
+    mean: np.ndarray  # (n_checkpoints,)
+    p_above: np.ndarray  # probability of ending a checkpoint above target
+    p_hit: np.ndarray  # probability of touching target up to a checkpoint
+
+
+class _Batch(NamedTuple):
+    initial: np.ndarray
+    returns: np.ndarray
+    model: str
+    steps: int
+    checkpoints: np.ndarray
+    paths: int
+    target: Optional[float]
+    seed: np.random.SeedSequence
+
+
+class _BatchResult(NamedTuple):
+    counts: np.ndarray  # (n_checkpoints, n_bins)
+    total: np.ndarray  # (n_checkpoints,)
+    above: np.ndarray  # (n_checkpoints,)
+    hit: np.ndarray  # (n_checkpoints,)
+
+
+def _sampler(returns: np.ndarray, model: str, rng: np.random.Generator):
+    if model == "bootstrap":
+
+        def sample_bootstrap(n: int) -> np.ndarray:
+            return returns[rng.integers(0, len(returns), size=n)]
+
+        return sample_bootstrap
+
+    if model == "normal":
+        log_returns = np.log1p(returns)
+        mean = log_returns.mean(axis=0)
+        cov = np.atleast_2d(np.cov(log_returns, rowvar=False))
+        chol = np.linalg.cholesky(cov + 1e-12 * np.eye(len(cov)))
+
+        def sample_normal(n: int) -> np.ndarray:
+            z = rng.standard_normal((n, len(mean)))
+            return np.expm1(mean + z @ chol.T)
+
+        return sample_normal
+
+    raise ValueError(f"Unknown model '{model}', expected one of {MODELS}")
+
+
+def _simulate_batch(batch: _Batch) -> _BatchResult:
+    rng = np.random.default_rng(batch.seed)
+    sample = _sampler(batch.returns, batch.model, rng)
+
+    v0 = batch.initial.sum()
+    edges = v0 * BINS
+    n_checkpoints = len(batch.checkpoints)
+
+    counts = np.zeros((n_checkpoints, len(edges) - 1), dtype=np.int64)
+    total = np.zeros(n_checkpoints)
+    above = np.zeros(n_checkpoints, dtype=np.int64)
+    hit = np.zeros(n_checkpoints, dtype=np.int64)
+
+    value = np.tile(batch.initial, (batch.paths, 1))
+    touched = np.zeros(batch.paths, dtype=bool)
+    k = 0
+
+    for step in range(1, batch.steps + 1):
+        value *= 1 + sample(batch.paths)
+        portfolio = value.sum(axis=1)
+
+        if batch.target is not None:
+            touched |= portfolio >= batch.target
+
+        if k < n_checkpoints and step == batch.checkpoints[k]:
+            clipped = np.clip(portfolio, edges[0], edges[-1])
+            counts[k] = np.histogram(clipped, bins=edges)[0]
+            total[k] = portfolio.sum()
+            if batch.target is not None:
+                above[k] = np.count_nonzero(portfolio >= batch.target)
+                hit[k] = np.count_nonzero(touched)
+            k += 1
+
+    return _BatchResult(counts, total, above, hit)
+
+
+def _histogram_percentiles(
+    counts: np.ndarray, edges: np.ndarray, q: Sequence[float]
+) -> np.ndarray:
+    """
+    Percentiles of each row of binned `counts` (geometric bin midpoints).
+    """
+    cdf = np.cumsum(counts, axis=1)
+    n = cdf[:, -1:]
+    midpoints = np.sqrt(edges[:-1] * edges[1:])
+
+    rank = np.asarray(q, dtype=float)[None, :] / 100 * n
+    pos = np.array([np.searchsorted(row, r) for row, r in zip(cdf, rank)])
+
+    return midpoints[np.clip(pos, 0, len(midpoints) - 1)]
+
+
+def project(
+    initial: np.ndarray,
+    returns: np.ndarray,
+    steps: int,
+    checkpoints: Sequence[int],
+    paths: int,
+    model: str = "bootstrap",
+    target: Optional[float] = None,
+    seed: Optional[int] = None,
+    batch_size: int = 10_000,
+    workers: int = 1,
+) -> Projection:
+    """
+    Simulate `paths` futures of a portfolio holding `initial` values (one per
+    currency, in the base currency) for `steps` periods.
+
+    `returns` is a `(n_periods, n_currencies)` matrix of historical period
+    returns in the base currency. Results are reported at `checkpoints`
+    (step numbers) and do not depend on `workers` for a given `seed`.
+    """
+    initial = np.asarray(initial, dtype=float)
+    returns = np.asarray(returns, dtype=float).reshape(-1, len(initial))
+    checkpoint_steps: np.ndarray = np.asarray(sorted(set(checkpoints)), dtype=int)
+
+    if len(returns) == 0:
+        raise ValueError("No historical returns to sample from")
+
+    sizes = [batch_size] * (paths // batch_size)
+    if paths % batch_size:
+        sizes.append(paths % batch_size)
+
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    batches = [
+        _Batch(initial, returns, model, steps, checkpoint_steps, size, target, s)
+        for size, s in zip(sizes, seeds)
+    ]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results: List[_BatchResult] = list(executor.map(_simulate_batch, batches))
+    else:
+        results = [_simulate_batch(b) for b in batches]
+
+    counts: np.ndarray = np.sum([r.counts for r in results], axis=0)
+    edges = initial.sum() * BINS
+
+    def mean(rows: List[np.ndarray]) -> np.ndarray:
+        return np.sum(rows, axis=0) / paths
+
+    return Projection(
+        checkpoints=checkpoint_steps,
+        percentiles=_histogram_percentiles(counts, edges, PERCENTILES),
+        mean=mean([r.total for r in results]),
+        p_above=mean([r.above for r in results]),
+        p_hit=mean([r.hit for r in results]),
+    )
@@ -0,0 +1,132 @@
+"""
+Retry policy and circuit breaker of the API transport.
+
+Idempotent requests (GET, PUT, DELETE) are retried on connection errors and
+5xx responses with jittered exponential backoff. Writes carrying an
+`Idempotency-Key` are retried the same way only when the API is known to
+deduplicate them (`server_dedup`, WELLETS_SERVER_DEDUP): otherwise a write
+committed before a 502 or a reset would be posted twice. A 429 or 503
+carrying `Retry-After` is retried after the time the server asks for, whatever
+the method, as the request was rejected rather than processed. Once a host has
+failed `threshold` times in a row, the breaker opens and requests to it fail
+fast with `CircuitOpen` for `cooldown` seconds, after which a single trial
+request decides whether it closes again.
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+
+from wellets_cli.idempotency import HEADER
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+# statuses worth another attempt of an idempotent request
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class CircuitOpen(requests.ConnectionError):
+    """
+    The API host failed repeatedly, requests are not sent until the cooldown
+    ends.
+    """
+
+
+@dataclass
+class RetryPolicy:
+    retries: int = 3
+    backoff: float = 0.5  # seconds, doubled on each attempt
+    max_backoff: float = 8
+    max_retry_after: float = 30  # longer waits are left to the caller
+    server_dedup: bool = False  # the API deduplicates writes by Idempotency-Key
+
+    def is_idempotent(self, method: str, headers: Optional[dict]) -> bool:
+        if method in IDEMPOTENT_METHODS:
+            return True
+        return self.server_dedup and HEADER in (headers or {})
+
+    def delay(self, attempt: int) -> float:
+        """
+        Full jitter backoff before retry number `attempt` (from 0).
+        """
+        return random.uniform(0, min(self.backoff * 2**attempt, self.max_backoff))
+
+    def retry_after(self, response: requests.Response) -> Optional[float]:
+        """
+        Seconds to wait as asked by a 429 or 503, None if not asked or if
+        longer than `max_retry_after`.
+        """
+        if response.status_code not in (429, 503):
+            return None
+
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+
+        seconds = max(seconds, 0)
+        return seconds if seconds <= self.max_retry_after else None
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = 5, cooldown: float = 30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures: Dict[str, int] = {}
+        self._opened: Dict[str, float] = {}
+        self._trial: Dict[str, bool] = {}
+
+    def before(self, host: str) -> None:
+        """
+        Raise `CircuitOpen` if requests to `host` should not be sent.
+        """
+        with self._lock:
+            opened = self._opened.get(host)
+            if opened is None:
+                return
+
+            remaining = opened + self.cooldown - time.monotonic()
+            if remaining > 0 or self._trial.get(host):
+                raise CircuitOpen(
+                    f"{host} is unavailable, retrying in {max(remaining, 0):.0f}s"
+                )
+            self._trial[host] = True  # half-open: let this one through
+
+    def success(self, host: str) -> None:
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened.pop(host, None)
+            self._trial.pop(host, None)
+
+    def failure(self, host: str) -> None:
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._trial.pop(host, False) or self._failures[host] >= self.threshold:
+                self._opened[host] = time.monotonic()
+
+    def release(self, host: str) -> None:
+        """
+        End a trial request that neither succeeded nor failed (e.g. it raised
+        an unrelated error), so that the next request can be the trial.
+        """
+        with self._lock:
+            self._trial.pop(host, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures.clear()
+            self._opened.clear()
+            self._trial.clear()
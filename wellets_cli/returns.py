@@ -0,0 +1,258 @@
+"""
+Performance engine: time-weighted and money-weighted returns.
+
+Both are computed from movements (see `wellets_cli.history`) valued in the
+base currency on the valuation points where cash flows happen:
+
+- the time-weighted return (TWR) chain-links the growth of each period
+  between two cash flows, so it measures the investment regardless of when
+  money was added or withdrawn;
+- the money-weighted return (XIRR) is the annual rate zeroing the net
+  present value of all cash flows plus the final value.
+"""
+
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from wellets_cli.history import (
+    Movements,
+    bucket_totals,
+    currencies_price_history,
+    movements_balances,
+    to_utc,
+)
+from wellets_cli.model import Currency
+from wellets_cli.util import pp
+
+DAYS_PER_YEAR = 365.25
+
+
+class Returns(NamedTuple):
+    start: datetime
+    end: datetime
+    start_value: float
+    end_value: float
+    net_flow: float
+    twr: float
+    twr_annualized: float
+    irr: float  # annualized money-weighted return (XIRR)
+
+
+def period_returns(value: np.ndarray, flow: np.ndarray) -> np.ndarray:
+    """
+    Return the growth rate of each period between valuation points, net of
+    the cash flows. Works along the last axis.
+
+    `value` is the value at each point after the cash flows of that point,
+    `flow` the net external cash flow (contributions positive) at each point.
+    Periods starting from a zero value have a zero return.
+    """
+    start = value[..., :-1]
+    before = value[..., 1:] - flow[..., 1:]
+
+    valid = start != 0
+    return np.where(valid, before / np.where(valid, start, 1), 1.0) - 1
+
+
+def time_weighted_return(value: np.ndarray, flow: np.ndarray) -> float:
+    """
+    Chain-link the period returns between valuation points.
+    """
+    return float(np.prod(1 + period_returns(value, flow)) - 1)
+
+
+def xnpv(rate: np.ndarray, cash: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """
+    Net present value of `cash` flows at `years` for each of `rate`.
+    """
+    rate = np.atleast_1d(np.asarray(rate, dtype=float))
+    return (cash * (1 + rate[:, None]) ** -years).sum(axis=1)
+
+
+def _bisect_xirr(
+    cash: np.ndarray, years: np.ndarray, tol: float, maxiter: int
+) -> float:
+    # bracket a root on a logarithmic grid of growth factors (-99.9% .. +99900%)
+    rate = np.geomspace(1e-3, 1e3, 600) - 1
+    npv = xnpv(rate, cash, years)
+
+    change = np.flatnonzero(np.sign(npv[:-1]) * np.sign(npv[1:]) < 0)
+    if len(change) == 0:
+        return float("nan")
+
+    lo, hi = rate[change[0]], rate[change[0] + 1]
+    npv_lo = npv[change[0]]
+
+    for _ in range(maxiter):
+        mid = (lo + hi) / 2
+        npv_mid = xnpv(mid, cash, years)[0]
+        if np.sign(npv_mid) == np.sign(npv_lo):
+            lo, npv_lo = mid, npv_mid
+        else:
+            hi = mid
+        if hi - lo < tol:
+            break
+
+    return float((lo + hi) / 2)
+
+
+def xirr(
+    cash: np.ndarray,
+    years: np.ndarray,
+    guesses: Sequence[float] = (-0.9, -0.5, -0.1, 0.0, 0.1, 0.5, 1.0, 5.0),
+    tol: float = 1e-10,
+    maxiter: int = 100,
+) -> float:
+    """
+    Annual rate zeroing the net present value of `cash` flows at `years`.
+
+    Newton's method runs on all `guesses` at once; the converged root closest
+    to zero is returned. When no guess converges the root is bracketed on a
+    grid and refined by bisection. Returns NaN when flows do not change sign.
+    """
+    cash = np.asarray(cash, dtype=float)
+    years = np.asarray(years, dtype=float)
+
+    if not ((cash > 0).any() and (cash < 0).any()):
+        return float("nan")
+
+    rate = np.array(guesses, dtype=float)
+
+    with np.errstate(all="ignore"):
+        for _ in range(maxiter):
+            discount = (1 + rate[:, None]) ** -years
+            npv = (cash * discount).sum(axis=1)
+            dnpv = (-years * cash * discount / (1 + rate[:, None])).sum(axis=1)
+
+            step = npv / dnpv
+            rate = np.maximum(rate - step, -1 + 1e-9)
+
+            active = np.isfinite(step) & (np.abs(step) > tol)
+            if not active.any():
+                break
+
+        npv = xnpv(rate, cash, years)
+
+    scale = np.abs(cash).sum()
+    converged = np.isfinite(rate) & np.isfinite(npv) & (np.abs(npv) <= 1e-8 * scale)
+
+    if converged.any():
+        roots = rate[converged]
+        return float(roots[np.argmin(np.abs(roots))])
+
+    with np.errstate(all="ignore"):
+        return _bisect_xirr(cash, years, tol, maxiter)
+
+
+def irr(cash: np.ndarray) -> float:
+    """
+    Rate of return per period of evenly spaced `cash` flows.
+    """
+    return xirr(cash, np.arange(len(cash), dtype=float))
+
+
+def valuation_points(
+    timestamp: np.ndarray, start: datetime, end: datetime
+) -> np.ndarray:
+    """
+    Return `start`, `end` and every movement time in between, sorted.
+    """
+    start64 = np.datetime64(to_utc(start), "s")
+    end64 = np.datetime64(to_utc(end), "s")
+
+    inner = timestamp[(timestamp > start64) & (timestamp < end64)]
+    return np.unique(np.concatenate([[start64], inner, [end64]]))
+
+
+def movements_returns(
+    movements: Movements,
+    points: np.ndarray,
+    prices: np.ndarray,
+    base_price: np.ndarray,
+) -> Returns:
+    """
+    Compute the returns of `movements` valued on `points` with the dollar
+    `prices` of each series and the dollar `base_price`.
+
+    Movements up to the first point make up the opening value, the following
+    ones are external cash flows.
+    """
+    n_series = len(movements.keys)
+
+    balances = movements_balances(movements, points)
+    units = bucket_totals(
+        movements.timestamp, movements.value, movements.series, n_series, points
+    )
+
+    value = (balances * prices / base_price).sum(axis=0)
+    flow = (units * prices / base_price).sum(axis=0)
+    flow[0] = 0.0
+
+    years = (points - points[0]) / np.timedelta64(1, "D") / DAYS_PER_YEAR
+
+    cash = -flow
+    cash[0] -= value[0]
+    cash[-1] += value[-1]
+
+    twr = time_weighted_return(value, flow)
+    twr_annualized = (1 + twr) ** (1 / years[-1]) - 1 if years[-1] >= 1 else np.nan
+
+    return Returns(
+        start=points[0].astype(datetime),
+        end=points[-1].astype(datetime),
+        start_value=float(value[0]),
+        end_value=float(value[-1]),
+        net_flow=float(flow.sum()),
+        twr=twr,
+        twr_annualized=float(twr_annualized),
+        irr=xirr(cash, years),
+    )
+
+
+def compute_returns(
+    movements: Movements,
+    currencies: List[Currency],
+    base_currency: Currency,
+    headers: dict,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Returns:
+    """
+    Compute the returns of `movements` (one currency per series) in the base
+    currency, from `start` (default: first movement) to `end` (default: now).
+    """
+    if start is None:
+        start = (
+            movements.timestamp.min().astype(datetime).replace(tzinfo=timezone.utc)
+            if len(movements.timestamp)
+            else datetime.now(timezone.utc)
+        )
+    end = end or datetime.now(timezone.utc)
+
+    points = valuation_points(movements.timestamp, start, end)
+
+    prices = currencies_price_history(currencies, points, headers)
+    base_price = currencies_price_history([base_currency], points, headers)[0]
+
+    return movements_returns(movements, points, prices, base_price)
+
+
+def returns_rows(returns: Returns, currency: Currency) -> List[dict]:
+    def pp_rate(x: float) -> str:
+        return "-" if np.isnan(x) else pp(x, percent=True, with_symbol=True)
+
+    return [
+        {"key": "start", "value": returns.start.strftime("%Y-%m-%d %H:%M")},
+        {"key": "end", "value": returns.end.strftime("%Y-%m-%d %H:%M")},
+        {
+            "key": "start_value",
+            "value": f"{currency.acronym} {pp(returns.start_value)}",
+        },
+        {"key": "end_value", "value": f"{currency.acronym} {pp(returns.end_value)}"},
+        {"key": "net_flow", "value": f"{currency.acronym} {pp(returns.net_flow)}"},
+        {"key": "twr", "value": pp_rate(returns.twr)},
+        {"key": "twr_annualized", "value": pp_rate(returns.twr_annualized)},
+        {"key": "irr", "value": pp_rate(returns.irr)},
+    ]
@@ -0,0 +1,236 @@
+"""
+Risk metrics over return series.
+
+Every metric works along the last axis, so a `(n_series, n_periods)` matrix
+of returns (e.g. all assets) is measured in a single pass.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from wellets_cli.returns import DAYS_PER_YEAR, period_returns
+from wellets_cli.util import pp
+
+
+def periods_per_year(index: np.ndarray) -> float:
+    """
+    Number of periods of `index` (average spacing) in a year.
+    """
+    step = np.diff(index).mean() / np.timedelta64(1, "D")
+    return DAYS_PER_YEAR / step
+
+
+def price_returns(price: np.ndarray, base_price: np.ndarray) -> np.ndarray:
+    """
+    Period returns of dollar `price` series expressed in the base currency.
+    """
+    value = price / base_price
+    return period_returns(value, np.zeros_like(value))
+
+
+def volatility(r: np.ndarray, ppy: float) -> np.ndarray:
+    return np.std(r, axis=-1, ddof=1) * np.sqrt(ppy)
+
+
+def max_drawdown(r: np.ndarray) -> np.ndarray:
+    wealth = np.cumprod(1 + r, axis=-1)
+    peak = np.maximum.accumulate(np.maximum(wealth, 1), axis=-1)
+    return (wealth / peak - 1).min(axis=-1)
+
+
+def sharpe_ratio(r: np.ndarray, ppy: float, risk_free: float = 0.0) -> np.ndarray:
+    excess = r - risk_free / ppy
+    with np.errstate(all="ignore"):
+        return excess.mean(axis=-1) / np.std(r, axis=-1, ddof=1) * np.sqrt(ppy)
+
+
+def sortino_ratio(r: np.ndarray, ppy: float, risk_free: float = 0.0) -> np.ndarray:
+    excess = r - risk_free / ppy
+    downside = np.sqrt((np.minimum(excess, 0) ** 2).mean(axis=-1))
+    with np.errstate(all="ignore"):
+        return excess.mean(axis=-1) / downside * np.sqrt(ppy)
+
+
+def beta(r: np.ndarray, benchmark: np.ndarray) -> np.ndarray:
+    b = benchmark - benchmark.mean()
+    with np.errstate(all="ignore"):
+        return ((r - r.mean(axis=-1, keepdims=True)) * b).sum(axis=-1) / (b**2).sum()
+
+
+def rolling_beta(r: np.ndarray, benchmark: np.ndarray, window: int) -> np.ndarray:
+    """
+    Beta over each trailing `window` of periods, from windowed sums of
+    cumulative sums (no per-window recomputation).
+    """
+
+    def windowed(x: np.ndarray) -> np.ndarray:
+        c = np.cumsum(x, axis=-1)
+        c = np.concatenate([np.zeros(c.shape[:-1] + (1,)), c], axis=-1)
+        return c[..., window:] - c[..., :-window]
+
+    sx, sb = windowed(r), windowed(benchmark)
+    sxb, sbb = windowed(r * benchmark), windowed(benchmark**2)
+
+    with np.errstate(all="ignore"):
+        return (sxb - sx * sb / window) / (sbb - sb**2 / window)
+
+
+def rolling_covariance(r: np.ndarray, window: int) -> np.ndarray:
+    """
+    Covariance matrix of the `(n_series, n_periods)` returns over each
+    trailing `window` of periods, as a `(n_windows, n_series, n_series)` array.
+
+    Windowed sums are taken from cumulative sums of the returns and of their
+    outer products, so each window update costs O(n_series²).
+    """
+    x = (r - r.mean(axis=-1, keepdims=True)).T  # demeaned for precision
+
+    def windowed(c: np.ndarray) -> np.ndarray:
+        c = np.concatenate([np.zeros((1,) + c.shape[1:]), np.cumsum(c, axis=0)])
+        return c[window:] - c[:-window]
+
+    sx = windowed(x)
+    sxx = windowed(x[:, :, None] * x[:, None, :])
+
+    return (sxx - sx[:, :, None] * sx[:, None, :] / window) / (window - 1)
+
+
+def covariance_to_correlation(cov: np.ndarray) -> np.ndarray:
+    std = np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+    with np.errstate(all="ignore"):
+        return cov / (std[..., :, None] * std[..., None, :])
+
+
+def risk_metrics(
+    r: np.ndarray,
+    ppy: float,
+    benchmark: Optional[np.ndarray] = None,
+    window: int = 30,
+    risk_free: float = 0.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Compute all risk metrics of the returns `r` (periods on the last axis).
+    """
+    metrics = {
+        "volatility": volatility(r, ppy),
+        "max_drawdown": max_drawdown(r),
+        "sharpe": sharpe_ratio(r, ppy, risk_free),
+        "sortino": sortino_ratio(r, ppy, risk_free),
+    }
+
+    if benchmark is not None:
+        metrics["beta"] = beta(r, benchmark)
+        if r.shape[-1] >= window:
+            metrics["rolling_beta"] = rolling_beta(r, benchmark, window)
+
+    return metrics
+
+
+def _nan_to_none(x: float) -> Optional[float]:
+    return None if np.isnan(x) else float(x)
+
+
+def risk_rows(
+    labels: List[str], metrics: Dict[str, np.ndarray], benchmark: Optional[str]
+) -> List[dict]:
+    def pp_ratio(x: float, **kwargs) -> str:
+        return "-" if np.isnan(x) else pp(x, **kwargs)
+
+    rows = []
+    for i, label in enumerate(labels):
+        row = {
+            "name": label,
+            "volatility (%)": pp_ratio(metrics["volatility"][i], percent=True),
+            "max_drawdown (%)": pp_ratio(metrics["max_drawdown"][i], percent=True),
+            "sharpe": pp_ratio(metrics["sharpe"][i]),
+            "sortino": pp_ratio(metrics["sortino"][i]),
+        }
+        if "beta" in metrics:
+            row[f"beta\n({benchmark})"] = pp_ratio(metrics["beta"][i])
+        if "rolling_beta" in metrics:
+            row[f"rolling_beta\n({benchmark}, last)"] = pp_ratio(
+                metrics["rolling_beta"][i][-1]
+            )
+        rows.append(row)
+
+    return rows
+
+
+def risk_json(
+    labels: List[str],
+    metrics: Dict[str, np.ndarray],
+    index: np.ndarray,
+    benchmark: Optional[str],
+    window: int,
+) -> str:
+    """
+    Serialize the metrics of each series, with the rolling beta timestamped
+    on the end of each window.
+    """
+    timestamp = index[1:].astype(datetime)
+
+    data = []
+    for i, label in enumerate(labels):
+        item: dict = {
+            "name": label,
+            "volatility": _nan_to_none(metrics["volatility"][i]),
+            "max_drawdown": _nan_to_none(metrics["max_drawdown"][i]),
+            "sharpe": _nan_to_none(metrics["sharpe"][i]),
+            "sortino": _nan_to_none(metrics["sortino"][i]),
+        }
+        if "beta" in metrics:
+            item["benchmark"] = benchmark
+            item["beta"] = _nan_to_none(metrics["beta"][i])
+        if "rolling_beta" in metrics:
+            item["rolling_beta"] = [
+                {"timestamp": t.isoformat(), "beta": _nan_to_none(b)}
+                for t, b in zip(timestamp[window - 1 :], metrics["rolling_beta"][i])
+            ]
+        data.append(item)
+
+    return json.dumps(data, indent=2)
+
+
+def correlation_rows(labels: List[str], corr: np.ndarray) -> List[dict]:
+    def pp_corr(x: float) -> str:
+        return "-" if np.isnan(x) else pp(x)
+
+    return [
+        {"name": label, **{other: pp_corr(c) for other, c in zip(labels, row)}}
+        for label, row in zip(labels, corr)
+    ]
+
+
+def correlation_json(
+    labels: List[str],
+    index: np.ndarray,
+    cov: np.ndarray,
+    corr: np.ndarray,
+    window: int,
+) -> str:
+    """
+    Serialize the rolling covariance and correlation matrices, timestamped on
+    the end of each window.
+    """
+    timestamp = index[window:].astype(datetime)
+
+    def matrix(m: np.ndarray) -> List[List[Optional[float]]]:
+        return [[_nan_to_none(x) for x in row] for row in m]
+
+    data = {
+        "names": labels,
+        "window": window,
+        "matrices": [
+            {
+                "timestamp": t.isoformat(),
+                "covariance": matrix(c),
+                "correlation": matrix(rho),
+            }
+            for t, c, rho in zip(timestamp, cov, corr)
+        ],
+    }
+
+    return json.dumps(data, indent=2)
@@ -0,0 +1,130 @@
+"""
+Local accumulation schedule.
+
+An accumulation plan is fully determined by its `planned_start`, `every` and
+`planned_entries`: the schedule is expanded locally and reconciled against
+the entries already made, so the next entry and the progress of every plan
+come from a single `/accumulations` fetch.
+
+As on the server, `quote` is the amount of each entry in US dollars, converted
+to units of the asset at the current dollar rate of its currency: entries and
+targets are in asset units.
+"""
+
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional
+
+from dateutil.relativedelta import relativedelta
+
+from wellets_cli.model import Accumulation, Duration, NextAccumulationEntry
+from wellets_cli.util import pp
+
+
+class Status(NamedTuple):
+    made: int  # entries made
+    due: int  # scheduled entries due by now
+    current: float  # asset units accumulated
+    target: float  # asset units planned by the end of the plan
+    next_date: Optional[datetime]  # None when the plan is complete
+    last_date: Optional[datetime]
+
+
+def duration_delta(duration: Duration) -> relativedelta:
+    return relativedelta(
+        years=duration.years or 0,
+        months=duration.months or 0,
+        weeks=duration.weeks or 0,
+        days=duration.days or 0,
+        hours=duration.hours or 0,
+        minutes=duration.minutes or 0,
+        seconds=duration.seconds or 0,
+    )
+
+
+def schedule(accumulation: Accumulation) -> List[datetime]:
+    """
+    Expand the plan into the date of each of its entries.
+    """
+    delta = duration_delta(accumulation.every)
+
+    if delta == relativedelta():
+        return [accumulation.planned_start]
+
+    # multiply instead of accumulating, so month ends do not drift
+    return [
+        accumulation.planned_start + i * delta
+        for i in range(accumulation.planned_entries)
+    ]
+
+
+def _aware(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.astimezone()
+
+
+def status(
+    accumulation: Accumulation, dollar_rate: float, now: Optional[datetime] = None
+) -> Status:
+    """
+    Reconcile the schedule against the entries made so far, `dollar_rate`
+    being the dollar rate of the asset currency.
+
+    Entries fill the schedule in order, whatever their date: the next entry
+    is the first scheduled one not yet made.
+    """
+    now = _aware(now or datetime.now(timezone.utc))
+    dates = schedule(accumulation)
+    made = len(accumulation.entries)
+
+    return Status(
+        made=made,
+        due=sum(1 for d in dates if _aware(d) <= now),
+        current=sum(e.value for e in accumulation.entries),
+        target=accumulation.quote * accumulation.planned_entries * dollar_rate,
+        next_date=dates[made] if made < len(dates) else None,
+        last_date=max((e.created_at for e in accumulation.entries), default=None),
+    )
+
+
+def next_entry(
+    accumulation: Accumulation, dollar_rate: float
+) -> Optional[NextAccumulationEntry]:
+    """
+    Return the next entry of the plan, or None when the plan is complete.
+
+    The amount catches up with the plan: it is the quote of every entry up to
+    the next one, net of the amount accumulated so far.
+    """
+    s = status(accumulation, dollar_rate)
+
+    if s.next_date is None:
+        return None
+
+    entry = s.made + 1
+    target = accumulation.quote * entry * dollar_rate
+
+    return NextAccumulationEntry(
+        entry=entry,
+        amount=max(target - s.current, 0.0),
+        current=s.current,
+        target=target,
+        date=s.next_date,
+    )
+
+
+def status_row(
+    accumulation: Accumulation, dollar_rate: float, now: Optional[datetime] = None
+) -> dict:
+    s = status(accumulation, dollar_rate, now)
+    planned = accumulation.planned_entries
+
+    return {
+        "id": accumulation.id,
+        "alias": accumulation.alias,
+        "entries": f"{s.made}/{planned}",
+        "progress (%)": pp(s.current / s.target if s.target else 0, percent=True),
+        "current": pp(s.current, decimals=8, fixed=False),
+        "target": pp(s.target, decimals=8, fixed=False),
+        "behind": max(s.due - s.made, 0),
+        "last_entry": s.last_date.strftime("%Y-%m-%d") if s.last_date else "-",
+        "next_entry": s.next_date.strftime("%Y-%m-%d %H:%M") if s.next_date else "-",
+    }
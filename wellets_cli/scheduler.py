@@ -0,0 +1,235 @@
+"""
+Long-running accumulation scheduler.
+
+Upcoming entries of all accumulations are kept in a heap ordered by due time.
+The scheduler sleeps until the earliest one is due, re-reads the accumulations
+(the server is the source of truth for entries already made) and posts it.
+
+The last entry posted per accumulation, and the entry being posted, are
+persisted so that a restart neither double-posts (an entry still pending is
+only retried when the server did not record it) nor misses entries (overdue
+entries are posted as soon as the scheduler starts).
+
+Before posting, the entry computed locally is checked against the next entry
+of the server: an entry they disagree on (number, or amount beyond
+`AMOUNT_TOLERANCE`, as dollar rates move between reads) is not posted.
+
+An entry that cannot be posted (the server does not show the previous entry
+yet, disagrees on it, or the API fails) is put back with an exponential
+backoff, so that it does not hold up the other accumulations.
+"""
+
+import heapq
+import json
+import math
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from wellets_cli.api import APIError
+from wellets_cli.model import Accumulation, NextAccumulationEntry
+from wellets_cli.schedule import next_entry, schedule
+
+AMOUNT_TOLERANCE = 0.01  # relative
+
+
+def _timestamp(dt: datetime) -> float:
+    return dt.replace(tzinfo=dt.tzinfo or timezone.utc).timestamp()
+
+
+class SchedulerState:
+    def __init__(self, path: Path):
+        self.path = path
+        self.posted: Dict[str, int] = {}
+        self.pending: Optional[Tuple[str, int]] = None
+
+        if path.exists():
+            with open(path) as f:
+                data = json.load(f)
+            self.posted = data.get("posted", {})
+            self.pending = tuple(data["pending"]) if data.get("pending") else None
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"posted": self.posted, "pending": self.pending}, f)
+        tmp.replace(self.path)
+
+
+class Scheduler:
+    def __init__(
+        self,
+        fetch: Callable[[], List[Accumulation]],
+        post: Callable[[Accumulation, NextAccumulationEntry], None],
+        state: SchedulerState,
+        dollar_rate: Callable[[Accumulation], float],
+        remote: Callable[[Accumulation], Optional[NextAccumulationEntry]],
+        poll: float = 3600,
+        retry: float = 60,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        log: Callable[[str], None] = lambda message: None,
+    ):
+        self.fetch = fetch
+        self.post = post
+        self.state = state
+        self.dollar_rate = dollar_rate
+        self.remote = remote
+        self.poll = poll
+        self.retry = retry
+        self.clock = clock
+        self.sleep = sleep
+        self.log = log
+        self.heap: List[Tuple[float, str, int]] = []
+        self.accumulations: Dict[str, Accumulation] = {}
+        # accumulations backing off: consecutive failures, not before when
+        self.failures: Dict[str, int] = {}
+        self.deferred: Dict[str, float] = {}
+
+    def refresh(self) -> None:
+        """
+        Re-read the accumulations and rebuild the heap of their next entries.
+        """
+        self.accumulations = {a.id: a for a in self.fetch()}
+
+        if self.state.pending:
+            accumulation_id, entry = self.state.pending
+            accumulation = self.accumulations.get(accumulation_id)
+            if accumulation and len(accumulation.entries) >= entry:
+                self._mark_posted(accumulation_id, entry)
+            self.state.pending = None
+            self.state.save()
+
+        self.heap = []
+        for accumulation in self.accumulations.values():
+            made = len(accumulation.entries)
+            # the server may lag behind the entries just posted
+            entry = max(made, self.state.posted.get(accumulation.id, 0)) + 1
+            self._push(accumulation, entry)
+        heapq.heapify(self.heap)
+
+    def _push(self, accumulation: Accumulation, entry: int) -> None:
+        dates = schedule(accumulation)
+        if entry <= len(dates):
+            due = _timestamp(dates[entry - 1])
+            due = max(due, self.deferred.get(accumulation.id, due))
+            heapq.heappush(self.heap, (due, accumulation.id, entry))
+
+    def _mark_posted(self, accumulation_id: str, entry: int) -> None:
+        posted = self.state.posted.get(accumulation_id, 0)
+        self.state.posted[accumulation_id] = max(posted, entry)
+
+    def _defer(self, accumulation: Accumulation, entry: int, reason: str) -> None:
+        """
+        Put the entry at the head of the heap back with a backoff.
+        """
+        failures = self.failures.get(accumulation.id, 0) + 1
+        delay = min(self.retry * 2 ** (failures - 1), self.poll)
+        self.failures[accumulation.id] = failures
+        self.deferred[accumulation.id] = self.clock() + delay
+
+        self.log(
+            f"{accumulation.alias} entry #{entry}: {reason}, retry in {delay:.0f}s"
+        )
+
+        heapq.heappop(self.heap)
+        self._push(accumulation, entry)
+
+    def step(self) -> bool:
+        """
+        Post the earliest entry if it is due, otherwise sleep towards it.
+        Returns whether an entry was posted.
+        """
+        if not self.heap:
+            self.sleep(self.poll)
+            self.refresh()
+            return False
+
+        wait = self.heap[0][0] - self.clock()
+
+        if wait > 0:
+            # wake up at least every `poll` seconds to pick up new plans
+            self.sleep(min(wait, self.poll))
+            if wait > self.poll:
+                self.refresh()
+            return False
+
+        # re-read entries right before posting, they may have been added
+        # by hand or by another scheduler
+        self.refresh()
+
+        if not self.heap or self.heap[0][0] > self.clock():
+            return False
+
+        _, accumulation_id, entry_number = self.heap[0]
+        accumulation = self.accumulations[accumulation_id]
+        entry = next_entry(accumulation, self.dollar_rate(accumulation))
+
+        if entry is None or entry.entry != entry_number:
+            # the server does not show our last entry yet (or it was deleted)
+            reason = f"the server is at entry #{entry.entry if entry else 'none'}"
+            self._defer(accumulation, entry_number, reason)
+            return False
+
+        try:
+            remote = self.remote(accumulation)
+        except (APIError, requests.RequestException) as e:
+            self._defer(accumulation, entry_number, f"cannot check it ({e})")
+            return False
+
+        if (
+            remote is None
+            or remote.entry != entry.entry
+            or not math.isclose(remote.amount, entry.amount, rel_tol=AMOUNT_TOLERANCE)
+        ):
+            expected = f"{remote.amount} for #{remote.entry}" if remote else "none"
+            reason = f"amount {entry.amount} but the server expects {expected}"
+            self._defer(accumulation, entry_number, reason)
+            return False
+
+        self.state.pending = (accumulation_id, entry.entry)
+        self.state.save()
+
+        try:
+            self.post(accumulation, entry)
+        except (APIError, requests.RequestException) as e:
+            # left pending: the next refresh checks whether it was recorded
+            self._defer(accumulation, entry_number, f"failed ({e})")
+            return False
+
+        self._mark_posted(accumulation_id, entry.entry)
+        self.state.pending = None
+        self.state.save()
+        self.failures.pop(accumulation_id, None)
+        self.deferred.pop(accumulation_id, None)
+
+        heapq.heappop(self.heap)
+        self._push(accumulation, entry.entry + 1)
+
+        return True
+
+    def run(self, once: bool = False) -> None:
+        """
+        Run forever, or for a single pass over the entries due at start when
+        `once` is set (entries that fail are left for the next run).
+        """
+        self.refresh()
+        start = self.clock()
+
+        while True:
+            if once and (not self.heap or self.heap[0][0] > start):
+                return
+
+            try:
+                self.step()
+            except (APIError, requests.RequestException) as e:
+                if once:
+                    raise
+                # reading the accumulations failed, keep going
+                self.log(f"Cannot read accumulations ({e}), retrying")
+                self.sleep(self.retry)
@@ -0,0 +1,165 @@
+"""
+Interactive shell running cli commands in one process.
+
+The process keeps the HTTP session and a short-lived cache of GET responses
+(currencies, settings, wallets...) between commands. Tab completion covers
+commands, options and the ids of wallets, assets and portfolios, shown with
+their names.
+"""
+
+import shlex
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import click
+from prompt_toolkit import PromptSession
+from prompt_toolkit.completion import Completer, Completion, ThreadedCompleter
+from prompt_toolkit.history import FileHistory
+from prompt_toolkit.input import Input
+from prompt_toolkit.output import Output
+
+import wellets_cli.api as api
+import wellets_cli.transport as transport
+from wellets_cli.auth import get_auth_token
+from wellets_cli.config import settings
+from wellets_cli.util import make_headers
+
+EXIT_COMMANDS = ("exit", "quit")
+
+Names = List[Tuple[str, str]]  # id, name
+
+
+def wallet_names(headers: dict) -> Names:
+    return [(w.id, w.alias) for w in api.get_wallets(headers)]
+
+
+def asset_names(headers: dict) -> Names:
+    return [(a.id, a.currency.acronym) for a in api.get_assets(headers)]
+
+
+def portfolio_names(headers: dict) -> Names:
+    portfolios = api.get_portfolios(params={"show_all": True}, headers=headers)
+    return [(p.id, p.alias) for p in portfolios]
+
+
+# option name suffix -> names of the ids it takes
+ID_OPTIONS: Dict[str, Callable[[dict], Names]] = {
+    "wallet-id": wallet_names,
+    "asset-id": asset_names,
+    "portfolio-id": portfolio_names,
+    "parent-id": portfolio_names,
+}
+
+
+def _id_names(option: str) -> Optional[Callable[[dict], Names]]:
+    for suffix, names in ID_OPTIONS.items():
+        if option.endswith(suffix):
+            return names
+    return None
+
+
+class CommandCompleter(Completer):
+    def __init__(self, group: click.Group):
+        self.group = group
+
+    def _resolve(self, words: Iterable[str]) -> click.Command:
+        command: click.Command = self.group
+        for word in words:
+            if isinstance(command, click.Group) and word in command.commands:
+                command = command.commands[word]
+        return command
+
+    def _ids(self, option: str, incomplete: str) -> Iterable[Completion]:
+        names = _id_names(option)
+        if names is None:
+            return
+
+        try:
+            choices = names(make_headers(get_auth_token()))
+        except Exception:
+            return  # not logged in, offline...
+
+        for id, name in choices:
+            if id.startswith(incomplete) or name.startswith(incomplete):
+                yield Completion(id, -len(incomplete), display_meta=name)
+
+    def get_completions(self, document, complete_event):
+        text = document.text_before_cursor
+        words = text.split()
+        incomplete = "" if not words or text[-1].isspace() else words.pop()
+
+        command = self._resolve(words)
+
+        if words and words[-1].startswith("--"):
+            yield from self._ids(words[-1], incomplete)
+            return
+
+        if incomplete.startswith("-"):
+            options = [
+                o
+                for p in command.params
+                if not getattr(p, "hidden", False)
+                for o in p.opts
+            ]
+        elif isinstance(command, click.Group):
+            options = list(command.commands)
+        else:
+            return
+
+        for option in sorted(options):
+            if option.startswith(incomplete):
+                yield Completion(option, -len(incomplete))
+
+
+def repl(
+    group: click.Group,
+    invoke: Callable[[List[str]], int],
+    input: Optional[Input] = None,
+    output: Optional[Output] = None,
+) -> None:
+    """
+    Read commands and run them with `invoke` until exit or EOF. A failing
+    command, or one interrupted with Ctrl-C, does not end the shell.
+    """
+    settings.state_dir.mkdir(parents=True, exist_ok=True)
+
+    session: PromptSession[str] = PromptSession(
+        history=FileHistory(str(settings.state_dir / "shell_history")),
+        completer=ThreadedCompleter(CommandCompleter(group)),
+        complete_while_typing=False,
+        input=input,
+        output=output,
+    )
+
+    while True:
+        try:
+            line = session.prompt("wellets> ")
+        except KeyboardInterrupt:
+            continue
+        except EOFError:
+            break
+
+        try:
+            args = shlex.split(line)
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            continue
+
+        if not args:
+            continue
+        if args[0] in EXIT_COMMANDS:
+            break
+        if args[0] == "refresh":
+            transport.clear_cache()
+            continue
+        if args[0] == "help":
+            args = args[1:] + ["--help"]
+        if args[0] == "shell":
+            click.echo("Already in the shell", err=True)
+            continue
+
+        try:
+            invoke(args)
+        except KeyboardInterrupt:
+            click.echo("Aborted!", err=True)
+        except Exception as e:
+            click.echo(f"Error: {e}", err=True)
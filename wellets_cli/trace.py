@@ -0,0 +1,359 @@
+"""
+Tracing of API calls.
+
+While enabled, every `wellets_cli.api` function call is recorded together
+with the HTTP requests it sends (method, path, status, bytes and the
+connect, TLS, server and transfer timings), the JSON decoding time and the
+model validation time (the rest of the call). Cached responses send no
+request. The trace is reported as a waterfall table or as Chrome trace-event
+JSON (chrome://tracing, Perfetto).
+
+DNS resolution is timed as part of connect, as urllib3 resolves and connects
+in one step.
+"""
+
+import functools
+import inspect
+import json
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+import urllib3.connection
+from tabulate import tabulate
+
+import wellets_cli.api as api
+import wellets_cli.transport as transport
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    start: float
+    status: Optional[int] = None
+    bytes: int = 0
+    connect: float = 0
+    tls: float = 0
+    server: float = 0
+    transfer: float = 0
+    end: float = 0
+
+
+@dataclass
+class Call:
+    name: str
+    thread: int
+    start: float
+    end: float = 0
+    json: float = 0
+    requests: List[Request] = field(default_factory=list)
+
+    @property
+    def network(self) -> float:
+        return sum(r.end - r.start for r in self.requests)
+
+    @property
+    def validation(self) -> float:
+        return max(self.end - self.start - self.network - self.json, 0)
+
+
+class Tracer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.calls: List[Call] = []
+        self.lock = threading.Lock()
+
+    def current(self) -> Optional[Call]:
+        return _call.get()
+
+
+_tracer: Optional[Tracer] = None
+
+# call and request in progress, context variables so that requests sent from
+# other threads in a copy of the caller's context (e.g. hedged requests) are
+# traced as part of its call
+_call: ContextVar[Optional[Call]] = ContextVar("call", default=None)
+_request: ContextVar[Optional[Request]] = ContextVar("request", default=None)
+_patches: list = []
+
+
+def _patch(obj, name, wrapper) -> None:
+    original = getattr(obj, name)
+    _patches.append((obj, name, original))
+    setattr(obj, name, wrapper(original))
+
+
+def _trace_api(f):
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        tracer = _tracer
+        if tracer is None or tracer.current() is not None:
+            return f(*args, **kwargs)  # nested calls belong to the outer one
+
+        call = Call(f.__name__, threading.get_ident(), time.perf_counter())
+        token = _call.set(call)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            call.end = time.perf_counter()
+            _call.reset(token)
+            with tracer.lock:
+                tracer.calls.append(call)
+
+    return wrapper
+
+
+def _trace_send(send):
+    def wrapper(method, url, **kwargs):
+        call = _tracer.current() if _tracer else None
+        if call is None:
+            return send(method, url, **kwargs)
+
+        r = Request(method, urlsplit(url).path, time.perf_counter())
+        call.requests.append(r)
+        token = _request.set(r)
+
+        try:
+            kwargs["stream"] = True  # to time the transfer apart
+            response = send(method, url, **kwargs)
+            r.server = time.perf_counter() - r.start - r.connect - r.tls
+            transfer = time.perf_counter()
+            r.bytes = len(response.content)
+            r.transfer = time.perf_counter() - transfer
+            r.status = response.status_code
+            return response
+        finally:
+            r.end = time.perf_counter()
+            _request.reset(token)
+
+    return wrapper
+
+
+def _trace_json(json_):
+    def wrapper(self, **kwargs):
+        call = _tracer.current() if _tracer else None
+        t = time.perf_counter()
+        try:
+            return json_(self, **kwargs)
+        finally:
+            if call is not None:
+                call.json += time.perf_counter() - t
+
+    return wrapper
+
+
+def _trace_connect(attr):
+    def trace(connect):
+        def wrapper(self, *args, **kwargs):
+            r = _request.get() if _tracer else None
+            if r is None:
+                return connect(self, *args, **kwargs)
+
+            t, connected = time.perf_counter(), r.connect
+            try:
+                return connect(self, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - t
+                if attr == "connect":
+                    r.connect += elapsed
+                else:  # TLS handshake: the whole connect but the socket
+                    r.tls += elapsed - (r.connect - connected)
+
+        return wrapper
+
+    return trace
+
+
+def enable() -> Tracer:
+    """
+    Start tracing API calls.
+    """
+    global _tracer
+
+    disable()
+    _tracer = Tracer()
+
+    for name, f in list(vars(api).items()):
+        if (
+            inspect.isfunction(f)
+            and f.__module__ == api.__name__
+            and not inspect.isgeneratorfunction(f)  # traced per page
+            and name != "base_url"
+        ):
+            _patch(api, name, _trace_api)
+
+    _patch(transport, "_send", _trace_send)
+    _patch(requests.Response, "json", _trace_json)
+    _patch(urllib3.connection.HTTPConnection, "_new_conn", _trace_connect("connect"))
+    _patch(urllib3.connection.HTTPSConnection, "connect", _trace_connect("tls"))
+
+    return _tracer
+
+
+def disable() -> Optional[Tracer]:
+    """
+    Stop tracing, returning the finished trace (if any).
+    """
+    global _tracer
+
+    while _patches:
+        obj, name, original = _patches.pop()
+        setattr(obj, name, original)
+
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.end = time.perf_counter()
+        with tracer.lock:
+            for call in tracer.calls:
+                for r in call.requests:
+                    r.end = r.end or tracer.end  # abandoned hedge, still in flight
+    return tracer
+
+
+# columns of the waterfall, the last one holds the bar
+COLUMNS = (
+    "start",
+    "call",
+    "request",
+    "status",
+    "bytes",
+    "connect",
+    "tls",
+    "server",
+    "transfer",
+    "json",
+    "validate",
+    "total",
+    "",
+)
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}"
+
+
+def _bar(start: float, end: float, total: float, width: int) -> str:
+    offset = round(start / total * width) if total else 0
+    length = max(round((end - start) / total * width), 1) if total else 1
+    return " " * offset + "█" * length
+
+
+def waterfall(tracer: Tracer, width: int = 30) -> str:
+    """
+    Waterfall table of the API calls, with a breakdown of the total time.
+    """
+    total = tracer.end - tracer.start
+    calls = sorted(tracer.calls, key=lambda c: c.start)
+
+    rows: List[Dict[str, object]] = []
+    for call in calls:
+        # timings of the call itself, shown on its first row
+        first: Dict[str, object] = {
+            "start": _ms(call.start - tracer.start),
+            "call": call.name,
+            "json": _ms(call.json),
+            "validate": _ms(call.validation),
+            "total": _ms(call.end - call.start),
+            "": _bar(call.start - tracer.start, call.end - tracer.start, total, width),
+        }
+
+        if not call.requests:
+            rows.append({**dict.fromkeys(COLUMNS, ""), **first, "request": "(cached)"})
+            continue
+
+        for i, r in enumerate(call.requests):
+            rows.append(
+                {
+                    **dict.fromkeys(COLUMNS, ""),
+                    **(first if i == 0 else {}),
+                    "request": f"{r.method} {r.path}",
+                    "status": r.status,
+                    "bytes": r.bytes,
+                    "connect": _ms(r.connect),
+                    "tls": _ms(r.tls),
+                    "server": _ms(r.server),
+                    "transfer": _ms(r.transfer),
+                }
+            )
+
+    network = sum(c.network for c in calls)
+    decoding = sum(c.json for c in calls)
+    validation = sum(c.validation for c in calls)
+    api_time = sum(c.end - c.start for c in calls)
+
+    summary = [
+        ["total", _ms(total)],
+        ["api calls", f"{_ms(api_time)} ({len(calls)} calls)"],
+        ["api network", _ms(network)],
+        ["api json", _ms(decoding)],
+        ["api validate", _ms(validation)],
+        ["other (compute, charts)", _ms(max(total - api_time, 0))],
+    ]
+
+    table = tabulate(rows, headers="keys", disable_numparse=True) if rows else ""
+    note = "times in ms; calls on concurrent threads overlap"
+    return "\n\n".join(filter(None, [table, tabulate(summary), note]))
+
+
+def chrome_trace(tracer: Tracer) -> dict:
+    """
+    Trace-event JSON of the API calls (complete events, in microseconds).
+    """
+
+    def event(name, cat, start, duration, tid, **args):
+        return {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round((start - tracer.start) * 1e6),
+            "dur": round(duration * 1e6),
+            "pid": 1,
+            "tid": tid,
+            "args": args,
+        }
+
+    events = [event("command", "cli", tracer.start, tracer.end - tracer.start, 0)]
+
+    for call in tracer.calls:
+        events.append(
+            event(
+                call.name,
+                "api",
+                call.start,
+                call.end - call.start,
+                call.thread,
+                json_ms=call.json * 1000,
+                validate_ms=call.validation * 1000,
+            )
+        )
+        for r in call.requests:
+            events.append(
+                event(
+                    f"{r.method} {r.path}",
+                    "http",
+                    r.start,
+                    r.end - r.start,
+                    call.thread,
+                    status=r.status,
+                    bytes=r.bytes,
+                )
+            )
+            t = r.start
+            for phase in ("connect", "tls", "server", "transfer"):
+                duration = getattr(r, phase)
+                if duration > 0:
+                    events.append(event(phase, "http", t, duration, call.thread))
+                t += duration
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(tracer: Tracer, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(chrome_trace(tracer), f)
@@ -0,0 +1,224 @@
+"""
+HTTP transport shared by all API calls.
+
+Requests go through a single `requests.Session`, so connections are kept
+alive across calls (and across commands, in the daemon). Long-lived processes
+can also enable a short-lived cache of GET responses, cleared by any write.
+Traffic can be recorded to, or replayed from, a cassette (see
+`wellets_cli.cassette`). Failed requests are retried, and a failing host is
+cut off, as set by `wellets_cli.retry`. Slow GETs can be hedged (see
+`wellets_cli.hedge`).
+"""
+
+import threading
+import time
+from dataclasses import replace
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import wellets_cli.cassette as cassette
+import wellets_cli.hedge as hedge
+from wellets_cli.config import settings
+from wellets_cli.retry import RETRY_STATUSES, CircuitBreaker, RetryPolicy
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_wrote = False
+
+_cache_ttl: Optional[float] = None
+_cache: Dict[Tuple, Tuple[float, requests.Response]] = {}
+_key_locks: Dict[Tuple, threading.Lock] = {}
+
+_policy = RetryPolicy()
+_breaker = CircuitBreaker()
+
+
+def get_session() -> requests.Session:
+    global _session
+
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def enable_cache(ttl: Optional[float]) -> Optional[float]:
+    """
+    Cache successful GET responses for `ttl` seconds (None disables the
+    cache). Returns the previous TTL.
+    """
+    global _cache_ttl
+    previous, _cache_ttl = _cache_ttl, ttl
+    return previous
+
+
+def set_retry_policy(policy: RetryPolicy) -> RetryPolicy:
+    """
+    Use `policy` for the next requests. Returns the previous policy.
+    """
+    global _policy
+    previous, _policy = _policy, policy
+    return previous
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
+        _key_locks.clear()
+
+
+def _cache_key(url: str, kwargs: dict) -> Tuple:
+    params = kwargs.get("params") or {}
+    headers = kwargs.get("headers") or {}
+    return (
+        url,
+        tuple(sorted((k, str(v)) for k, v in params.items())),
+        headers.get("Authorization"),
+    )
+
+
+def _send(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Send a request over the network, or answer it from the replayed cassette.
+    """
+    player = cassette.player()
+    if player is not None:
+        return player.replay(cassette.request_key(method, url, kwargs), url)
+
+    recorder = cassette.recorder()
+    if recorder is None:
+        return get_session().request(method, url, **kwargs)
+
+    start = time.perf_counter()
+    response = get_session().request(method, url, **kwargs)
+    response.content  # read the body within the elapsed time
+    elapsed = time.perf_counter() - start
+    recorder.record(cassette.request_key(method, url, kwargs), response, elapsed)
+    return response
+
+
+def _send_hedged(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Send a request, hedging it if enabled. Recorded and replayed traffic is
+    never hedged, to keep cassettes one response per request.
+    """
+    if (
+        method == "GET"
+        and settings.hedge
+        and settings.record_path is None
+        and settings.replay_path is None
+    ):
+        return hedge.send(_send, method, url, **kwargs)
+    return _send(method, url, **kwargs)
+
+
+def _send_with_retry(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Send a request, retrying it as allowed by the retry policy and failing
+    fast while the circuit breaker of its host is open.
+    """
+    policy, host = _policy, urlsplit(url).netloc
+    if settings.server_dedup:
+        policy = replace(policy, server_dedup=True)
+    idempotent = policy.is_idempotent(method, kwargs.get("headers"))
+    retries = settings.retries if settings.retries is not None else policy.retries
+
+    attempt = 0
+    while True:
+        _breaker.before(host)
+
+        try:
+            response = _send_hedged(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            _breaker.failure(host)
+            if not idempotent or attempt >= retries:
+                raise
+            time.sleep(policy.delay(attempt))
+            attempt += 1
+            continue
+        except BaseException:
+            _breaker.release(host)
+            raise
+
+        if response.status_code >= 500:
+            _breaker.failure(host)
+        else:
+            _breaker.success(host)
+
+        wait = policy.retry_after(response)
+        if wait is None and idempotent and response.status_code in RETRY_STATUSES:
+            wait = policy.delay(attempt)
+        if wait is None or attempt >= retries:
+            return response
+
+        response.close()
+        time.sleep(wait)
+        attempt += 1
+
+
+def wrote() -> bool:
+    """
+    Whether a request other than a GET was sent by this process.
+    """
+    return _wrote
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    global _wrote
+
+    if method != "GET":
+        _wrote = True
+
+    if _cache_ttl is None:
+        return _send_with_retry(method, url, **kwargs)
+
+    if method != "GET":
+        clear_cache()
+        return _send_with_retry(method, url, **kwargs)
+
+    key = _cache_key(url, kwargs)
+
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    # concurrent identical GETs wait for the first one instead of refetching
+    with key_lock:
+        now = time.monotonic()
+        with _lock:
+            cached = _cache.get(key)
+        if cached and now - cached[0] < _cache_ttl:
+            return cached[1]
+
+        response = _send_with_retry(method, url, **kwargs)
+
+        if response.ok:
+            with _lock:
+                _cache[key] = (now, response)
+
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+
+def patch(url: str, **kwargs) -> requests.Response:
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url: str, **kwargs) -> requests.Response:
+    return request("DELETE", url, **kwargs)
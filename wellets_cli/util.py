@@ -4,8 +4,7 @@ from typing import List, Optional, TypeVar
 
 from dateutil.relativedelta import relativedelta
 
-import wellets_cli.api as api
-from wellets_cli.model import Duration
+from wellets_cli.model import Duration, Portfolio, Wallet
 
 
 class Resource:
@@ -38,6 +37,26 @@ def get_currency_by_acronym(
     return currency[0]
 
 
+def get_portfolio_wallets(
+    portfolios: List[Portfolio], portfolio_id: str
+) -> List[Wallet]:
+    """
+    Return the wallets of a portfolio and of all its descendants.
+    """
+    subtree = {portfolio_id}
+    frontier = [portfolio_id]
+
+    while frontier:
+        parent_id = frontier.pop()
+        for p in portfolios:
+            if p.parent_id == parent_id and p.id not in subtree:
+                subtree.add(p.id)
+                frontier.append(p.id)
+
+    wallets = {w.id: w for p in portfolios if p.id in subtree for w in p.wallets}
+    return list(wallets.values())
+
+
 def make_headers(auth_token: Optional[str]) -> dict:
     if auth_token is None:
         return {}
@@ -85,6 +104,7 @@ def format_duration(duration: Duration) -> str:
     out = ""
     out += f"{duration.years}y " if duration.years else ""
     out += f"{duration.months}M " if duration.months else ""
+    out += f"{duration.weeks}w " if duration.weeks else ""
     out += f"{duration.days}d " if duration.days else ""
     out += f"{duration.hours}h " if duration.hours else ""
     out += f"{duration.minutes}m " if duration.minutes else ""
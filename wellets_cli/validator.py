@@ -1,9 +1,11 @@
 import uuid
 from datetime import datetime
-from typing import Any, Callable, List, Optional, Union
+from typing import Any, Callable, List, Optional, Tuple, Union
 
+import click
 from InquirerPy.validator import ValidationError, Validator
 
+from wellets_cli.interval import parse_interval
 from wellets_cli.util import parse_duration
 
 Validator2 = Callable[[str], Union[str, bool]]
@@ -15,6 +17,7 @@ def validate(validator: Validator2, value: Any):
         outcome = validator(value)
         if outcome != True:
             raise ValueError(outcome)
+    return value
 
 
 def percent_validator(val: str):
@@ -52,6 +55,27 @@ def uuid_validator(val: str):
         return "Should be a UUID"
 
 
+def interval_validator(val: str):
+    try:
+        parse_interval(val)
+        return True
+    except ValueError:
+        return "Should be an interval, e.g. '1h', '1d', '1w', '1M'"
+
+
+def validate_interval(ctx, param, value: Union[None, str, Tuple[str, ...]]):
+    """
+    Click callback validating an interval option (also `multiple=True`).
+    """
+    validator = (
+        each_validator(interval_validator) if param.multiple else interval_validator
+    )
+    try:
+        return validate(validator, value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
 def each_validator(validator: Validator2):
     def wrapper(vals: List[str]):
         for val in vals: